@@ -0,0 +1,74 @@
+"""Micro-benchmark for DuckDuckGo result parsing against saved HTML fixtures.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_duckduckgo_parser [--iterations 500] [--max-results 5]
+
+Compares the original full-tree BeautifulSoup walk with each installed
+DuckDuckGoResultParser backend and checks they all extract the same results.
+"""
+import argparse
+import glob
+import os
+import timeit
+from bs4 import BeautifulSoup
+from src.web_search_agent import DuckDuckGoResultParser, _available_backends
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "duckduckgo_*.html")
+
+
+def full_tree_parse(html: bytes, max_results: int):
+    soup = BeautifulSoup(html, 'html.parser')
+    results = []
+    for link in soup.find_all('a', class_='result__a', limit=max_results):
+        title = link.text.strip()
+        url = link.get('href', '')
+        snippet = ""
+        result_div = link.find_parent('div', class_='result')
+        if result_div:
+            snippet_elem = result_div.find('a', class_='result__snippet')
+            if snippet_elem:
+                snippet = snippet_elem.text.strip()
+        if title and url:
+            results.append({
+                "title": title,
+                "description": snippet[:300] if snippet else "",
+                "url": url,
+                "source": "Web Search"
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--max-results', type=int, default=5)
+    args = parser.parse_args()
+
+    fixtures = sorted(glob.glob(FIXTURES))
+    pages = []
+    for path in fixtures:
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+
+    candidates = {"full-tree html.parser (baseline)": lambda html: full_tree_parse(html, args.max_results)}
+    for backend in _available_backends():
+        engine = DuckDuckGoResultParser(backend)
+        candidates[f"DuckDuckGoResultParser[{backend}]"] = lambda html, engine=engine: engine.parse(html, args.max_results)
+
+    expected = [full_tree_parse(html, args.max_results) for html in pages]
+    print(f"{len(pages)} fixture(s), {args.iterations} iterations, max_results={args.max_results}\n")
+    baseline = None
+    for name, parse in candidates.items():
+        if [parse(html) for html in pages] != expected:
+            print(f"{name:45s} MISMATCH with baseline output")
+            continue
+        seconds = timeit.timeit(lambda: [parse(html) for html in pages], number=args.iterations)
+        per_page_us = seconds / (args.iterations * len(pages)) * 1e6
+        baseline = baseline or per_page_us
+        print(f"{name:45s} {per_page_us:9.1f} us/page  ({baseline / per_page_us:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
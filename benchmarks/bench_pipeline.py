@@ -0,0 +1,284 @@
+"""End-to-end latency, throughput and memory of the research pipeline, fully offline.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline [--companies 20] [--concurrency 4] [--operations research,stream-research,followup,plan]
+
+Source HTTP calls (Wikipedia, NewsAPI, LinkedIn, DuckDuckGo) are answered from the
+recordings in benchmarks/fixtures/recorded with their recorded latency, and the
+OpenAI client talks to a local fake server with a configurable time to first token
+and token rate. The fake server flags --conflict-rate of the conflict checks, so
+the --conflict-mode path that resolves them is measured too; the recorded sources
+agree, so the conflict prefilter lets every check through unless
+--prefilter-threshold says otherwise. Every operation runs
+once per Wikipedia backend in --wikipedia-backends, the default page backend
+included. Save a run with --json and gate a later one on it with --compare:
+the process exits with status 1 when p95 latency or throughput regresses by more
+than --tolerance.
+
+--record DIR re-records the source fixtures from the live services instead (needs
+network access and real API keys).
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.replay import DEFAULT_RECORDINGS, Recordings, install_wikipedia_replay, recording_transport, replay_async_transport, replay_transport
+
+
+OPERATIONS = ("research", "stream-research", "followup", "plan")
+FOLLOWUP_QUESTION = "What are their main products?"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    # nearest rank
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, wall: float) -> Dict[str, float]:
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'throughput_per_s': round(len(latencies) / wall, 2) if wall else 0.0
+    }
+
+
+def build_agent(args, wikipedia_backend: str):
+    from src.conflict_filter import ConflictPrefilter
+    from src.research_agent import CompanyResearchAgent
+    recordings = Recordings(args.recordings)
+    # keep retries and breakers out of the measurement: recordings never fail
+    return CompanyResearchAgent(
+        use_cache=False,
+        wikipedia_backend=wikipedia_backend,
+        conflict_mode=args.conflict_mode,
+        conflict_prefilter=ConflictPrefilter(threshold=args.prefilter_threshold),
+        transport=replay_transport(recordings, args.network_scale),
+        async_transport=replay_async_transport(recordings, args.network_scale)
+    )
+
+
+def previous_context(company: str) -> List[Dict]:
+    return [{
+        'company_name': company,
+        'response': f"{company} is a multinational technology company that designs consumer electronics and software."
+    }]
+
+
+def make_operation(agent, generator, name: str, first_chunks: List[float]) -> Callable[[str], bool]:
+    if name == "research":
+        return lambda company: agent.research_company(company).get('success', False)
+    if name == "stream-research":
+        def stream(company: str) -> bool:
+            started = time.perf_counter()
+            research = agent.stream_research_company(company)
+            for _ in research:
+                if started is not None:
+                    first_chunks.append(time.perf_counter() - started)
+                    started = None
+            return bool(research.result and research.result.get('success', False))
+        return stream
+    if name == "followup":
+        return lambda company: agent.handle_followup(FOLLOWUP_QUESTION, previous_context(company)).get('success', False)
+
+    def plan(company: str) -> bool:
+        context = previous_context(company)[0]['response']
+        plan = generator.generate_plan(company, context)
+        return bool(plan.sections.get('company_overview'))
+    return plan
+
+
+def run_threaded(operation: Callable[[str], bool], companies: List[str], concurrency: int) -> Dict[str, float]:
+    latencies, errors = [], 0
+
+    def timed(company):
+        started = time.perf_counter()
+        try:
+            ok = operation(company)
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for ok, elapsed in pool.map(timed, companies):
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_async_research(agent, companies: List[str], concurrency: int) -> Dict[str, float]:
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, errors = [], 0
+
+        async def timed(company):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    ok = (await agent.aresearch_company(company)).get('success', False)
+                except Exception:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(timed(company) for company in companies))
+        wall = time.perf_counter() - started
+        await agent.aclose()
+        return summarize(latencies, errors, wall)
+
+    return asyncio.run(main())
+
+
+def compare(results: Dict[str, Dict], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)['operations']
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['throughput_per_s'] < before['throughput_per_s'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_per_s']}/s -> {current['throughput_per_s']}/s")
+    return regressions
+
+
+def record(args, companies: List[str]):
+    from src.research_agent import CompanyResearchAgent
+    transport, adapter = recording_transport(args.record)
+    agent = CompanyResearchAgent(use_cache=False, wikipedia_backend="summary", transport=transport)
+    for company in companies:
+        agent.research_company(company)
+    adapter.write_manifest()
+    print(f"Recorded {', '.join(sorted(adapter.recorded)) or 'nothing'} into {args.record}")
+
+
+def main():
+    from src.research_agent import CONFLICT_MODES
+    from src.wikipedia_agent import WIKIPEDIA_BACKENDS
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--companies', type=int, default=20, help="number of queries per operation")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--operations', default=",".join(OPERATIONS), help=f"comma separated, from: {', '.join(OPERATIONS)}, async-research")
+    parser.add_argument('--wikipedia-backends', default=",".join(WIKIPEDIA_BACKENDS), help=f"comma separated, from: {', '.join(WIKIPEDIA_BACKENDS)}")
+    parser.add_argument('--conflict-rate', type=float, default=0.25, help="share of conflict checks the fake OpenAI server flags")
+    parser.add_argument('--conflict-mode', choices=CONFLICT_MODES, default="serial")
+    parser.add_argument('--prefilter-threshold', type=float, default=0.0, help="conflict prefilter threshold (0 = every check reaches the fake server)")
+    parser.add_argument('--llm-latency-ms', type=float, default=300.0, help="fake OpenAI time to first token")
+    parser.add_argument('--tokens-per-second', type=float, default=0.0, help="fake OpenAI generation rate (0 = instant)")
+    parser.add_argument('--network-scale', type=float, default=1.0, help="multiplier on recorded source latencies (0 = none)")
+    parser.add_argument('--recordings', default=DEFAULT_RECORDINGS)
+    parser.add_argument('--tracemalloc', action='store_true', help="report peak Python heap usage (slows the run)")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--compare', help="baseline results file from an earlier --json run")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed regression for --compare (0.2 = 20%%)")
+    parser.add_argument('--record', metavar="DIR", help="record fresh source fixtures into DIR instead of benchmarking")
+    args = parser.parse_args()
+
+    from src.company_index import CompanyIndex
+    names = [record.name for record in CompanyIndex.load().records.values()]
+    companies = [names[i % len(names)] for i in range(args.companies)]
+
+    if args.record:
+        record(args, companies)
+        return
+
+    operations = [name.strip() for name in args.operations.split(",") if name.strip()]
+    for name in operations:
+        if name not in OPERATIONS + ("async-research",):
+            raise ValueError(f"Unknown operation '{name}'. Choose from: {', '.join(OPERATIONS)}, async-research")
+    backends = [name.strip() for name in args.wikipedia_backends.split(",") if name.strip()]
+    for name in backends:
+        if name not in WIKIPEDIA_BACKENDS:
+            raise ValueError(f"Unknown Wikipedia backend '{name}'. Choose from: {', '.join(WIKIPEDIA_BACKENDS)}")
+    if "page" in backends and not install_wikipedia_replay(Recordings(args.recordings), args.network_scale):
+        raise ValueError(f"No Wikipedia recording in {args.recordings} for the page backend")
+
+    server = FakeOpenAIServer(ttft_ms=args.llm_latency_ms, tokens_per_second=args.tokens_per_second, conflict_rate=args.conflict_rate)
+    os.environ["OPENAI_BASE_URL"] = server.start()
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+    os.environ.setdefault("NEWS_API_KEY", "replay")
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    from src.account_plan import AccountPlanGenerator
+    results = {}
+    try:
+        print(f"{len(companies)} queries per operation, concurrency {args.concurrency}, "
+              f"LLM TTFT {args.llm_latency_ms:.0f}ms, network scale {args.network_scale}, "
+              f"conflict rate {args.conflict_rate} ({args.conflict_mode})")
+        print(f"{'operation':<28}{'reqs':>6}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+        for backend in backends:
+            agent = build_agent(args, backend)
+            generator = AccountPlanGenerator(agent.client, model=agent.model)
+            for name in operations:
+                first_chunks = []
+                if name == "async-research":
+                    stats = run_async_research(agent, companies, args.concurrency)
+                else:
+                    stats = run_threaded(make_operation(agent, generator, name, first_chunks), companies, args.concurrency)
+                if first_chunks:
+                    stats['first_chunk_p50_ms'] = round(percentile(first_chunks, 50) * 1000, 1)
+                    stats['first_chunk_p95_ms'] = round(percentile(first_chunks, 95) * 1000, 1)
+                label = f"{name} [{backend}]"
+                results[label] = stats
+                print(f"{label:<28}{stats['requests']:>6}{stats['errors']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+                      f"{stats['p99_ms']:>10}{stats['throughput_per_s']:>9}")
+                if first_chunks:
+                    print(f"{'  first chunk':<28}{'':>14}{stats['first_chunk_p50_ms']:>10}{stats['first_chunk_p95_ms']:>10}")
+            agent.close()
+    finally:
+        server.stop()
+
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    memory = {'max_rss_mb': round(max_rss, 1)}
+    if args.tracemalloc:
+        memory['python_heap_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+    print("memory: " + ", ".join(f"{key} {value}" for key, value in memory.items()))
+    print(f"fake OpenAI requests: {server.requests} ({server.conflict_checks} conflict checks)")
+
+    report = {
+        'config': {key: getattr(args, key) for key in ('companies', 'concurrency', 'llm_latency_ms', 'tokens_per_second', 'network_scale', 'conflict_rate', 'conflict_mode', 'prefilter_threshold')},
+        'operations': results,
+        'memory': memory
+    }
+    if args.json:
+        with open(args.json, 'w', encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print("Regressions against " + args.compare + ":")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Precision/recall of the local conflict pre-filter on labeled source snippets.
+
+Run from the repository root:
+
+    python -m benchmarks.eval_conflict_prefilter [--threshold 0.1]
+
+Each fixture case holds the snippets the LLM conflict check would see and whether
+they really conflict. A case counts as flagged when the pre-filter would escalate
+it to the LLM; "LLM calls" is the share of cases that still reach the model.
+"""
+import argparse
+import json
+import os
+import time
+from src.conflict_filter import ConflictPrefilter, DEFAULT_THRESHOLD
+
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "conflict_cases.json")
+SWEEP = (0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5)
+
+
+def evaluate(scores, labels, threshold):
+    flagged = [score >= threshold for score in scores]
+    true_positives = sum(1 for flag, label in zip(flagged, labels) if flag and label)
+    precision = true_positives / sum(flagged) if any(flagged) else 1.0
+    recall = true_positives / sum(labels) if any(labels) else 1.0
+    return precision, recall, sum(flagged) / len(labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--verbose', action='store_true', help="print the score of every case")
+    args = parser.parse_args()
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        cases = json.load(f)
+    prefilter = ConflictPrefilter(threshold=args.threshold)
+
+    started = time.perf_counter()
+    scores = [prefilter.score(case["sources"]) for case in cases]
+    per_case_ms = (time.perf_counter() - started) / len(cases) * 1000
+    labels = [case["conflict"] for case in cases]
+
+    if args.verbose:
+        for case, score in zip(cases, scores):
+            print(f"{score:6.3f}  {'conflict' if case['conflict'] else 'ok':8s}  {case['name']}")
+        print()
+
+    print(f"{len(cases)} cases ({sum(labels)} conflicts), {per_case_ms:.2f} ms/case\n")
+    print(f"{'threshold':>9s}  {'precision':>9s}  {'recall':>6s}  {'LLM calls':>9s}")
+    for threshold in sorted(set(SWEEP) | {args.threshold}):
+        precision, recall, escalated = evaluate(scores, labels, threshold)
+        marker = "  <- selected" if threshold == args.threshold else ""
+        print(f"{threshold:9.2f}  {precision:9.2f}  {recall:6.2f}  {escalated:9.0%}{marker}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Local stand-in for the OpenAI chat completions endpoint, for offline benchmarks.
+
+Answers POST /v1/chat/completions with canned text after a configurable delay:
+time to first token plus the completion length at a fixed token rate. Streaming
+requests get server-sent event chunks and a final usage chunk, like the real API.
+Conflict checks are answered CONFLICT for a configurable share of source pairs,
+spread evenly over the run: the replayed sources are the same for every company,
+so the prompt alone cannot pick which pairs disagree.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+PLAN_SECTIONS = (
+    "Company Overview", "Business Model", "Key Products & Services", "Market Position",
+    "Financial Highlights", "Opportunities", "Challenges", "Recommendations", "Next Steps"
+)
+FILLER = (
+    "The company designs consumer electronics, software and online services, and sells them "
+    "through its own retail stores and partners worldwide. Recent coverage focuses on new "
+    "product launches, quarterly results and its push into services revenue."
+)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, (len(text) + 3) // 4)
+
+
+def reply_for(messages: List[Dict[str, str]], response_format: Optional[Dict] = None, conflict: bool = False) -> str:
+    system = (messages[0].get("content") or "") if messages else ""
+    if response_format and response_format.get("type") == "json_schema":
+        properties = response_format["json_schema"]["schema"].get("properties", {})
+        return json.dumps({name: FILLER for name in properties})
+    if "NO_CONFLICT" in system:
+        if conflict:
+            return "CONFLICT: The sources disagree on the founding year and headquarters."
+        return "NO_CONFLICT"
+    if "one section of an account plan" in system:
+        return FILLER
+    if "account plan" in system.lower():
+        return "\n\n".join(f"## {section}\n{FILLER}" for section in PLAN_SECTIONS)
+    return f"{FILLER}\n\n{FILLER}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        server = self.server
+        messages = request.get("messages", [])
+        conflict = False
+        if messages and "NO_CONFLICT" in (messages[0].get("content") or ""):
+            with server.stats_lock:
+                checks = server.conflict_checks
+                server.conflict_checks += 1
+            # flags conflict_rate of the checks, e.g. every fourth one at 0.25
+            conflict = int((checks + 1) * server.conflict_rate) > int(checks * server.conflict_rate)
+        content = reply_for(messages, request.get("response_format"), conflict)
+        prompt_tokens = sum(_estimate_tokens(message.get("content") or "") for message in messages)
+        completion_tokens = _estimate_tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "gpt-4o-mini")
+        with server.stats_lock:
+            server.requests += 1
+
+        time.sleep(server.ttft)
+        generation = completion_tokens / server.tokens_per_second if server.tokens_per_second else 0.0
+        if request.get("stream"):
+            self._stream(completion_id, model, content, usage, generation)
+            return
+
+        time.sleep(generation)
+        body = json.dumps({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, completion_id: str, model: str, content: str, usage: Dict[str, int], generation: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        words = content.split(" ")
+        delay = generation / len(words)
+
+        def send(choices, **extra):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model, "choices": choices, **extra}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        for i, word in enumerate(words):
+            send([{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}])
+            time.sleep(delay)
+        send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        send([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeOpenAIServer:
+
+    def __init__(self, ttft_ms: float = 300.0, tokens_per_second: float = 0.0, conflict_rate: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.ttft = ttft_ms / 1000.0
+        self.httpd.tokens_per_second = tokens_per_second
+        self.httpd.conflict_rate = conflict_rate
+        self.httpd.stats_lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.conflict_checks = 0
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    @property
+    def conflict_checks(self) -> int:
+        return self.httpd.conflict_checks
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
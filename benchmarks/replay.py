@@ -0,0 +1,227 @@
+"""Replay recorded HTTP responses for the source agents, and record new ones.
+
+A recording directory holds a manifest.json listing, per upstream, the host and
+path prefix it answers, the response status, content type, body file and the
+latency observed when it was recorded. Replay matches on host and path prefix
+only, so one recording serves every company name.
+
+The default Wikipedia backend goes through the wikipedia package, which calls
+requests.get itself and asks for search hits, page info and extracts in separate
+queries; install_wikipedia_replay answers those from the same recorded search.
+"""
+import asyncio
+import json
+import os
+import time
+import urllib.parse
+import warnings
+from typing import Dict, List, Optional
+import httpx
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from src.transport import HttpTransport, AsyncHttpTransport
+
+
+DEFAULT_RECORDINGS = os.path.join(os.path.dirname(__file__), "fixtures", "recorded")
+SOURCE_HOSTS = {
+    "en.wikipedia.org": "wikipedia",
+    "newsapi.org": "news",
+    "www.linkedin.com": "linkedin",
+    "html.duckduckgo.com": "web"
+}
+
+
+class Recording:
+
+    def __init__(self, directory: str, source: str, host: str, path: str, status: int, content_type: str, body: str, latency_ms: float = 0.0):
+        self.source = source
+        self.host = host
+        self.path = path
+        self.status = status
+        self.content_type = content_type
+        self.latency = latency_ms / 1000.0
+        with open(os.path.join(directory, body), 'rb') as f:
+            self.body = f.read()
+
+
+class Recordings:
+
+    def __init__(self, directory: str = DEFAULT_RECORDINGS):
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.entries = [Recording(directory, **entry) for entry in manifest["recordings"]]
+
+    def match(self, url: str) -> Optional[Recording]:
+        parsed = urllib.parse.urlsplit(url)
+        for entry in self.entries:
+            if parsed.hostname == entry.host and parsed.path.startswith(entry.path):
+                return entry
+        return None
+
+
+class ReplayAdapter(BaseAdapter):
+
+    def __init__(self, recordings: Recordings, latency_scale: float = 1.0):
+        super().__init__()
+        self.recordings = recordings
+        self.latency_scale = latency_scale
+        self.misses: List[str] = []
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        recording = self.recordings.match(request.url)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        if recording is None:
+            self.misses.append(request.url)
+            response.status_code = 404
+            response.reason = "Not Recorded"
+            response._content = b""
+            return response
+
+        if recording.latency and self.latency_scale:
+            time.sleep(recording.latency * self.latency_scale)
+        response.status_code = recording.status
+        response.reason = "OK" if recording.status == 200 else ""
+        response.headers = CaseInsensitiveDict({"Content-Type": recording.content_type})
+        response.encoding = "utf-8"
+        response._content = recording.body
+        return response
+
+    def close(self):
+        pass
+
+
+def replay_transport(recordings: Recordings, latency_scale: float = 1.0, **kwargs) -> HttpTransport:
+    transport = HttpTransport(**kwargs)
+    adapter = ReplayAdapter(recordings, latency_scale)
+    transport.session.mount("https://", adapter)
+    transport.session.mount("http://", adapter)
+    return transport
+
+
+class WikipediaPageAdapter(BaseAdapter):
+    # Answers the list=search, prop=info|pageprops, prop=revisions and prop=extracts
+    # queries of the wikipedia package from a recorded generator=search response.
+
+    def __init__(self, recording: Recording, latency_scale: float = 1.0):
+        super().__init__()
+        self.recording = recording
+        self.latency_scale = latency_scale
+        self.pages = json.loads(recording.body)["query"]["pages"]
+        self.by_title = {page["title"]: page for page in self.pages}
+        self.by_id = {str(page["pageid"]): page for page in self.pages}
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(request.url).query, keep_blank_values=True))
+        if self.recording.latency and self.latency_scale:
+            time.sleep(self.recording.latency * self.latency_scale)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict({"Content-Type": self.recording.content_type})
+        response.encoding = "utf-8"
+        response._content = json.dumps(self._answer(params)).encode("utf-8")
+        return response
+
+    def _answer(self, params: Dict[str, str]) -> Dict:
+        if params.get("list") == "search":
+            # page() looks every hit up again with a one-result search, which must find the same page
+            limit = int(params.get("srlimit") or 10)
+            pages = sorted(self.pages, key=lambda page: page["title"] != params.get("srsearch"))
+            return {"query": {"search": [{"title": page["title"]} for page in pages[:limit]]}}
+
+        page = self.by_id.get(params.get("pageids", "")) or self.by_title.get(params.get("titles", ""))
+        if page is None:
+            return {"query": {"pages": {"-1": {"title": params.get("titles", ""), "missing": ""}}}}
+        pageid = str(page["pageid"])
+        prop = params.get("prop")
+        if prop == "extracts":
+            return {"query": {"pages": {pageid: {"pageid": page["pageid"], "title": page["title"], "extract": page.get("extract", "")}}}}
+        if prop == "revisions":
+            # a disambiguation page lists the other recorded titles
+            items = "".join(f"<li><a>{other['title']}</a></li>" for other in self.pages if "pageprops" not in other)
+            return {"query": {"pages": {pageid: {"revisions": [{"*": f"<ul>{items}</ul>"}]}}}}
+        info = {key: page[key] for key in ("pageid", "ns", "title", "fullurl") if key in page}
+        if "pageprops" in page:
+            info["pageprops"] = page["pageprops"]
+        return {"query": {"pages": {pageid: info}}}
+
+    def close(self):
+        pass
+
+
+def install_wikipedia_replay(recordings: Recordings, latency_scale: float = 1.0) -> bool:
+    # the wikipedia package calls requests.get, so its module reference is swapped for a session
+    import wikipedia.wikipedia
+    # its disambiguation parsing builds BeautifulSoup without naming a parser
+    warnings.filterwarnings("ignore", message="No parser was explicitly specified")
+    recording = recordings.match(wikipedia.wikipedia.API_URL)
+    if recording is None:
+        return False
+    session = requests.Session()
+    session.mount("https://", WikipediaPageAdapter(recording, latency_scale))
+    session.mount("http://", WikipediaPageAdapter(recording, latency_scale))
+    wikipedia.wikipedia.requests = session
+    return True
+
+
+def replay_async_transport(recordings: Recordings, latency_scale: float = 1.0, **kwargs) -> AsyncHttpTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        recording = recordings.match(str(request.url))
+        if recording is None:
+            return httpx.Response(404)
+        if recording.latency and latency_scale:
+            await asyncio.sleep(recording.latency * latency_scale)
+        return httpx.Response(recording.status, headers={"Content-Type": recording.content_type}, content=recording.body)
+
+    return AsyncHttpTransport(http_transport=httpx.MockTransport(handler), **kwargs)
+
+
+class RecordingAdapter(HTTPAdapter):
+    # Passes requests through to the network and saves the first response from
+    # each known upstream, for use as replay fixtures.
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.recorded: Dict[str, Dict[str, object]] = {}
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        parsed = urllib.parse.urlsplit(request.url)
+        source = SOURCE_HOSTS.get(parsed.hostname)
+        if source and source not in self.recorded and response.status_code == 200:
+            extension = "json" if "json" in response.headers.get("Content-Type", "") else "html"
+            body = f"{source}_recorded.{extension}"
+            with open(os.path.join(self.directory, body), 'wb') as f:
+                f.write(response.content)
+            path = parsed.path
+            if source == "linkedin":
+                path = "/company/"
+            self.recorded[source] = {
+                "source": source,
+                "host": parsed.hostname,
+                "path": path,
+                "status": response.status_code,
+                "content_type": response.headers.get("Content-Type", ""),
+                "body": body,
+                "latency_ms": round(response.elapsed.total_seconds() * 1000)
+            }
+        return response
+
+    def write_manifest(self):
+        with open(os.path.join(self.directory, "manifest.json"), 'w', encoding="utf-8") as f:
+            json.dump({"recordings": list(self.recorded.values())}, f, indent=1)
+
+
+def recording_transport(directory: str) -> tuple:
+    os.makedirs(directory, exist_ok=True)
+    transport = HttpTransport()
+    adapter = RecordingAdapter(directory)
+    transport.session.mount("https://", adapter)
+    transport.session.mount("http://", adapter)
+    return transport, adapter
@@ -1,5 +1,5 @@
 from .research_agent import CompanyResearchAgent
-from .wikipedia_agent import WikipediaAgent
+from .wikipedia_agent import WikipediaAgent, WikipediaSummaryAgent
 from .news_agent import NewsAgent
 from .linkedin_agent import LinkedInAgent
 from .web_search_agent import WebSearchAgent
@@ -8,6 +8,7 @@ from .account_plan import AccountPlan, AccountPlanGenerator
 __all__ = [
     'CompanyResearchAgent', 
     'WikipediaAgent',
+    'WikipediaSummaryAgent',
     'NewsAgent',
     'LinkedInAgent',
     'WebSearchAgent',
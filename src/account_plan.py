@@ -1,5 +1,114 @@
-from typing import Dict, List, Optional
+import html
+import json
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, TextIO
 from datetime import datetime
+from openai import BadRequestError
+from .dedup import canonicalize_url
+
+
+SECTION_TITLES = {
+    "company_overview": "Company Overview",
+    "business_model": "Business Model",
+    "key_products_services": "Key Products & Services",
+    "market_position": "Market Position",
+    "financial_highlights": "Financial Highlights",
+    "opportunities": "Opportunities",
+    "challenges": "Challenges",
+    "recommendations": "Recommendations",
+    "next_steps": "Next Steps"
+}
+PLAN_SECTION_MODES = ("single", "parallel")
+PLAN_FORMATS = ("markdown", "json", "html")
+# sections written from the research alone run concurrently; these wait for the
+# sections they build on and are refreshed when one of those is edited
+SECTION_DEPENDENCIES = {
+    "recommendations": ("opportunities", "challenges"),
+    "next_steps": ("recommendations",)
+}
+SECTION_GUIDANCE = {
+    "company_overview": "what the company does, where it operates, its size and history",
+    "business_model": "how the company makes money: customers, revenue streams and channels",
+    "key_products_services": "its main products and services",
+    "market_position": "its market share, main competitors and what sets it apart",
+    "financial_highlights": "revenue, profitability, growth and other figures from the research",
+    "opportunities": "where there is room to grow the relationship or help the company grow",
+    "challenges": "risks, headwinds and obstacles the company or the account faces",
+    "recommendations": "concrete recommendations for this account that follow from the opportunities and challenges",
+    "next_steps": "specific, ordered actions that carry out the recommendations"
+}
+# header spellings models use for each section, lower case with single spaces
+SECTION_ALIASES = {
+    "company overview": "company_overview",
+    "overview": "company_overview",
+    "business model": "business_model",
+    "key products & services": "key_products_services",
+    "key products and services": "key_products_services",
+    "products & services": "key_products_services",
+    "products and services": "key_products_services",
+    "key products": "key_products_services",
+    "products": "key_products_services",
+    "market position": "market_position",
+    "financial highlights": "financial_highlights",
+    "financials": "financial_highlights",
+    "financial overview": "financial_highlights",
+    "financial": "financial_highlights",
+    "opportunities": "opportunities",
+    "challenges": "challenges",
+    "recommendations": "recommendations",
+    "next steps": "next_steps"
+}
+PLAN_RESPONSE_SCHEMA = {
+    "name": "account_plan",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {key: {"type": "string", "description": title} for key, title in SECTION_TITLES.items()},
+        "required": list(SECTION_TITLES),
+        "additionalProperties": False
+    }
+}
+
+
+def downstream_sections(section: str) -> List[str]:
+    # every section that depends on this one, directly or through another section,
+    # in plan order
+    affected = {section}
+    changed = True
+    while changed:
+        changed = False
+        for key, dependencies in SECTION_DEPENDENCIES.items():
+            if key not in affected and affected.intersection(dependencies):
+                affected.add(key)
+                changed = True
+    return [key for key in SECTION_TITLES if key in affected and key != section]
+
+
+def _section_for_title(title: str) -> str:
+    # an exact alias first, then an alias the header starts with ("Financial Performance")
+    title = " ".join(title.lower().split())
+    if title in SECTION_ALIASES:
+        return SECTION_ALIASES[title]
+    return SECTION_ALIASES[next(alias for alias in PREFIX_ALIASES if title.startswith(alias + " "))]
+
+
+# aliases that also start a longer header ("Financial Performance", "Financial Summary")
+PREFIX_ALIASES = ("financial",)
+# a header is a whole line naming a section, optionally as a markdown heading, a bold
+# bullet, numbered and/or bold in any of the usual orders ("## **1. Overview**",
+# "- **Opportunities**"); "Opportunities: ..." also counts, with the rest of the line as content
+_HEADER_RE = re.compile(
+    r"^[ \t]*(?:#{1,6}[ \t]*)?(?:[-*•][ \t]+(?=\*\*|__))?(?:\*\*|__)?[ \t]*(?:\d{1,2}[.)][ \t]*)?(?:\*\*|__)?[ \t]*"
+    r"(?P<title>" + "|".join(
+        re.escape(alias).replace(r"\ ", r"[ \t]+") + (r"(?:[ \t]+[a-z&]+){0,2}" if alias in PREFIX_ALIASES else "")
+        for alias in sorted(SECTION_ALIASES, key=len, reverse=True)
+    ) + r")"
+    r"[ \t]*(?:\*\*|__)?[ \t]*(?::[ \t]*(?:\*\*|__)?[ \t]*(?P<rest>.*?))?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE
+)
+_BULLET_RE = re.compile(r"^(?:[-*•]|\d{1,2}[.)])\s+")
 
 
 class AccountPlan:
@@ -20,11 +129,25 @@ class AccountPlan:
             "next_steps": ""
         }
         self.sources = []
+        self.research_context = ""
+        # rendered Markdown per section, kept with the content it was rendered from so
+        # a direct write to self.sections is noticed too
+        self._section_blocks: Dict[str, tuple] = {}
+        # the formatted source lines and listed URLs, each with the sources they were built
+        # from, so a direct change to self.sources is noticed too
+        self._source_lines: List[str] = []
+        self._source_lines_key: tuple = ()
+        self._source_urls = set()
+        self._source_urls_key: tuple = ()
+        self._markdown: Optional[str] = None
+        self._markdown_key: Optional[tuple] = None
     
     def update_section(self, section_name: str, content: str) -> bool:
         if section_name in self.sections:
             self.sections[section_name] = content
             self.updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._section_blocks.pop(section_name, None)
+            self._markdown = None
             return True
         return False
     
@@ -32,46 +155,157 @@ class AccountPlan:
         return self.sections.get(section_name)
     
     def add_source(self, source: Dict[str, str]):
+        # a page already listed, under any spelling of its URL, is skipped
+        url = canonicalize_url(source.get('url'))
+        if url:
+            if url in self._listed_urls():
+                return
+            self._source_urls.add(url)
         self.sources.append(source)
+        self._source_urls_key = self._sources_key()
+        self._markdown = None
     
-    def to_markdown(self) -> str:
-        md = f"# Account Plan: {self.company_name}\n\n"
-        md += f"*Created: {self.created_at}*\n\n"
+    def _listed_urls(self) -> set:
+        key = self._sources_key()
+        if key != self._source_urls_key:
+            self._source_urls = {canonicalize_url(source.get('url')) for source in self.sources} - {""}
+            self._source_urls_key = key
+        return self._source_urls
+    
+    def _sources_key(self) -> tuple:
+        return tuple((id(source), source.get('title'), source.get('url')) for source in self.sources)
+    
+    def _markdown_parts(self) -> Iterator[str]:
+        yield f"# Account Plan: {self.company_name}\n\n*Created: {self.created_at}*\n\n"
         
-        section_titles = {
-            "company_overview": "Company Overview",
-            "business_model": "Business Model",
-            "key_products_services": "Key Products & Services",
-            "market_position": "Market Position",
-            "financial_highlights": "Financial Highlights",
-            "opportunities": "Opportunities",
-            "challenges": "Challenges",
-            "recommendations": "Recommendations",
-            "next_steps": "Next Steps"
-        }
+        for section_key, section_title in SECTION_TITLES.items():
+            content = self.sections.get(section_key, "")
+            if not content:
+                continue
+            cached = self._section_blocks.get(section_key)
+            if cached is None or cached[0] is not content:
+                cached = (content, f"## {section_title}\n\n{content}\n\n")
+                self._section_blocks[section_key] = cached
+            yield cached[1]
         
-        for section_key, section_title in section_titles.items():
+        if self.sources:
+            # appended sources only format their own lines; any other change starts over
+            key = self._sources_key()
+            if key[:len(self._source_lines_key)] != self._source_lines_key:
+                self._source_lines = []
+            for i in range(len(self._source_lines), len(self.sources)):
+                self._source_lines.append(f"{i + 1}. {self.sources[i].get('title', 'Unknown')}\n")
+            self._source_lines_key = key
+            yield "## Sources\n\n"
+            yield from self._source_lines
+            yield "\n"
+    
+    def _render_key(self) -> tuple:
+        # compared element by element, unchanged section strings match on identity
+        return tuple(self.sections.values()), self._sources_key()
+    
+    def to_markdown(self) -> str:
+        key = self._render_key()
+        if self._markdown is None or self._markdown_key != key:
+            self._markdown = "".join(self._markdown_parts())
+            self._markdown_key = key
+        return self._markdown
+    
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'company_name': self.company_name,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'sections': dict(self.sections),
+            'sources': [{'title': source.get('title', 'Unknown'), 'url': source.get('url', '')} for source in self.sources]
+        }
+    
+    def write(self, fp: TextIO, format: str = "markdown"):
+        writers = {
+            "markdown": self.write_markdown,
+            "json": self.write_json,
+            "html": self.write_html
+        }
+        if format not in writers:
+            raise ValueError(f"Unknown plan format '{format}'. Choose from: {', '.join(PLAN_FORMATS)}")
+        writers[format](fp)
+    
+    def write_markdown(self, fp: TextIO):
+        if self._markdown is not None and self._markdown_key == self._render_key():
+            fp.write(self._markdown)
+            return
+        for part in self._markdown_parts():
+            fp.write(part)
+    
+    def write_json(self, fp: TextIO):
+        # written field by field so a large plan is never held twice in memory
+        data = self.to_dict()
+        fp.write("{")
+        for i, (key, value) in enumerate(data.items()):
+            fp.write(f"{', ' if i else ''}{json.dumps(key)}: ")
+            json.dump(value, fp, ensure_ascii=False)
+        fp.write("}\n")
+    
+    def write_html(self, fp: TextIO):
+        fp.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Account Plan: {html.escape(self.company_name)}</title></head><body>\n")
+        fp.write(f"<h1>Account Plan: {html.escape(self.company_name)}</h1>\n<p><em>Created: {self.created_at}</em></p>\n")
+        for section_key, section_title in SECTION_TITLES.items():
             content = self.sections.get(section_key, "")
             if content:
-                md += f"## {section_title}\n\n{content}\n\n"
-        
+                fp.write(f"<h2>{html.escape(section_title)}</h2>\n")
+                _write_html_blocks(fp, content)
         if self.sources:
-            md += "## Sources\n\n"
-            for i, source in enumerate(self.sources, 1):
-                md += f"{i}. {source.get('title', 'Unknown')}\n"
-            md += "\n"
-        
-        return md
+            fp.write("<h2>Sources</h2>\n<ol>\n")
+            for source in self.sources:
+                title = html.escape(source.get('title', 'Unknown'))
+                url = source.get('url')
+                fp.write(f"<li><a href=\"{html.escape(url)}\">{title}</a></li>\n" if url else f"<li>{title}</li>\n")
+            fp.write("</ol>\n")
+        fp.write("</body></html>\n")
+
+
+def _rejects_response_format(error: BadRequestError) -> bool:
+    # a 400 about the request itself (context length, bad messages) is not a reason
+    # to give up on structured output
+    text = f"{error.param or ''} {error.message or ''}".lower()
+    return "response_format" in text or "json_schema" in text
+
+
+def _write_html_blocks(fp: TextIO, content: str):
+    # paragraphs and "-"/"*" bullet lists; anything else is escaped text
+    for block in re.split(r"\n\s*\n", content):
+        lines = [line.strip() for line in block.strip().splitlines() if line.strip()]
+        if not lines:
+            continue
+        if all(_BULLET_RE.match(line) for line in lines):
+            fp.write("<ul>\n")
+            for line in lines:
+                fp.write(f"<li>{html.escape(_BULLET_RE.sub('', line, count=1))}</li>\n")
+            fp.write("</ul>\n")
+        else:
+            fp.write("<p>" + "<br>\n".join(html.escape(line) for line in lines) + "</p>\n")
 
 
 class AccountPlanGenerator:
     
-    def __init__(self, openai_client):
+    def __init__(self, openai_client, model: Optional[str] = None, structured_output: Optional[bool] = None, section_mode: Optional[str] = None, max_workers: int = len(SECTION_TITLES)):
         self.client = openai_client
+        self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        if structured_output is None:
+            structured_output = os.getenv("PLAN_STRUCTURED_OUTPUT", "on").lower() != "off"
+        self.structured_output = structured_output
+        self.section_mode = section_mode or os.getenv("PLAN_SECTION_MODE", "single")
+        if self.section_mode not in PLAN_SECTION_MODES:
+            raise ValueError(f"Unknown plan section mode '{self.section_mode}'. Choose from: {', '.join(PLAN_SECTION_MODES)}")
+        self.max_workers = max_workers
     
     def generate_plan(self, company_name: str, research_context: str, 
                      conflicts: List[str] = None) -> AccountPlan:
         plan = AccountPlan(company_name)
+        plan.research_context = research_context
+        if self.section_mode == "parallel":
+            self.generate_sections(plan, list(SECTION_TITLES), conflicts)
+            return plan
         
         system_prompt = """You are creating an account plan. Analyze the research and create sections:
 1. Company Overview
@@ -92,13 +326,20 @@ Be clear and factual. If info is missing, say so."""
 
 Generate all sections based on the available information."""
         
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
         try:
+            if self.structured_output:
+                sections = self._generate_structured(messages)
+                if sections is not None:
+                    plan.sections.update(sections)
+                    return plan
+            
             response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                model=self.model,
+                messages=messages,
                 temperature=0.7,
                 max_tokens=2000
             )
@@ -110,42 +351,107 @@ Generate all sections based on the available information."""
             print(f"Error: {e}")
             return plan
     
-    def _parse_plan_content(self, plan: AccountPlan, content: str):
-        lines = content.split('\n')
-        current_section = None
-        current_content = []
+    def generate_sections(self, plan: AccountPlan, sections: List[str], conflicts: List[str] = None) -> List[str]:
+        # One call per section, issued as soon as the sections it depends on are done,
+        # so the plan takes as long as its slowest chain rather than one long completion.
+        # Sections not in the list are taken as they currently stand in the plan.
+        pending = [key for key in SECTION_TITLES if key in sections]
+        running = {}
+        done = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                in_progress = set(pending) | set(running.values())
+                for key in list(pending):
+                    if not in_progress.intersection(SECTION_DEPENDENCIES.get(key, ())):
+                        pending.remove(key)
+                        upstream = {dependency: plan.sections[dependency] for dependency in SECTION_DEPENDENCIES.get(key, ())}
+                        running[executor.submit(self._generate_section, plan, key, upstream, conflicts)] = key
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key = running.pop(future)
+                    content = future.result()
+                    if content:
+                        plan.update_section(key, content)
+                        done.append(key)
+        return done
+    
+    def regenerate_downstream(self, plan: AccountPlan, edited_section: str, conflicts: List[str] = None) -> List[str]:
+        return self.generate_sections(plan, downstream_sections(edited_section), conflicts)
+    
+    def _generate_section(self, plan: AccountPlan, section: str, upstream: Dict[str, str], conflicts: List[str] = None) -> str:
+        title = SECTION_TITLES[section]
+        user_prompt = f"Company: {plan.company_name}\n\nResearch:\n{plan.research_context}\n\n"
+        for dependency, content in upstream.items():
+            user_prompt += f"{SECTION_TITLES[dependency]} (already in the plan):\n{content or '(empty)'}\n\n"
+        if conflicts:
+            user_prompt += "The sources disagree on: " + "; ".join(conflicts) + "\n\n"
+        user_prompt += f"Write the {title} section: {SECTION_GUIDANCE[section]}."
         
-        section_map = {
-            "company overview": "company_overview",
-            "business model": "business_model",
-            "products": "key_products_services",
-            "market position": "market_position",
-            "financial": "financial_highlights",
-            "opportunities": "opportunities",
-            "challenges": "challenges",
-            "recommendations": "recommendations",
-            "next steps": "next_steps"
-        }
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "You are writing one section of an account plan. Be clear and factual. If info is missing, say so. Reply with the section content only, without a heading."},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.7,
+                max_tokens=500
+            )
+        except Exception as e:
+            print(f"Error generating {title}: {e}")
+            return ""
         
-        for line in lines:
-            line_lower = line.lower().strip()
-            is_section = False
-            
-            for key, section_key in section_map.items():
-                if key in line_lower and (line.startswith('#') or line_lower.startswith(key)):
-                    if current_section and current_content:
-                        plan.sections[current_section] = '\n'.join(current_content).strip()
-                    current_section = section_key
-                    current_content = []
-                    is_section = True
-                    break
-            
-            if not is_section and current_section:
-                if line.strip():
-                    current_content.append(line)
+        content = (response.choices[0].message.content or "").strip()
+        header = _HEADER_RE.match(content)
+        # drop a heading repeated by the model, keep anything after "Title:"
+        if header:
+            content = ((header.group('rest') or "") + content[header.end():]).strip()
+        return content
+    
+    def _generate_structured(self, messages: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        # None means "use the plain text path instead"
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=2000,
+                response_format={"type": "json_schema", "json_schema": PLAN_RESPONSE_SCHEMA}
+            )
+        except BadRequestError as e:
+            if not _rejects_response_format(e):
+                raise
+            # the model doesn't support structured output; don't ask again
+            self.structured_output = False
+            return None
         
-        if current_section and current_content:
-            plan.sections[current_section] = '\n'.join(current_content).strip()
+        try:
+            data = json.loads(response.choices[0].message.content or "")
+        except ValueError:
+            # cut off by max_tokens
+            return None
+        if not isinstance(data, dict):
+            return None
+        return {key: str(data.get(key) or "").strip() for key in SECTION_TITLES}
+    
+    def _parse_plan_content(self, plan: AccountPlan, content: str):
+        # one pass over the header lines; each section runs until the next header
+        headers = list(_HEADER_RE.finditer(content))
+        current = None
+        for header, following in zip(headers, headers[1:] + [None]):
+            end = following.start() if following else len(content)
+            text = ((header.group('rest') or "") + content[header.end():end]).strip()
+            section_key = _section_for_title(header.group('title'))
+            if not plan.sections[section_key]:
+                plan.sections[section_key] = text
+                current = section_key
+            elif current is not None:
+                # a line like "Products: iPhone, Mac" inside a section already written
+                # belongs to the section it sits in, label and all
+                if header.group('rest'):
+                    text = (header.group(0).strip() + content[header.end():end]).strip()
+                if text:
+                    plan.sections[current] = "\n".join(part for part in (plan.sections[current], text) if part)
         
         if not any(plan.sections.values()):
             plan.sections["company_overview"] = content
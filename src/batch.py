@@ -0,0 +1,204 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Set
+from .account_plan import AccountPlanGenerator, PLAN_FORMATS
+from .models import to_jsonable
+
+
+def read_companies(path: str) -> List[str]:
+    companies = []
+    if path.lower().endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if isinstance(record, str):
+                    companies.append(record)
+                else:
+                    companies.append(record.get("company") or record.get("name") or "")
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        if rows:
+            header = [column.strip().lower() for column in rows[0]]
+            column = 0
+            for name in ("company", "company_name", "name"):
+                if name in header:
+                    column = header.index(name)
+                    break
+            else:
+                # no recognised header: treat the first row as data
+                companies.append(rows[0][0] if rows[0] else "")
+            companies.extend(row[column] for row in rows[1:] if len(row) > column)
+
+    seen = set()
+    unique = []
+    for company in companies:
+        company = " ".join(company.split())
+        if company and company.lower() not in seen:
+            seen.add(company.lower())
+            unique.append(company)
+    return unique
+
+
+class RateLimiter:
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class BatchRunner:
+
+    def __init__(self, agent, output_dir: str, concurrency: int = 4, rate_per_minute: Optional[float] = None, generate_plans: bool = False, plan_format: str = "markdown"):
+        if plan_format not in PLAN_FORMATS:
+            raise ValueError(f"Unknown plan format '{plan_format}'. Choose from: {', '.join(PLAN_FORMATS)}")
+        self.agent = agent
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(rate_per_minute) if rate_per_minute else None
+        self.generate_plans = generate_plans
+        self.plan_format = plan_format
+        # shared by the workers, so a structured output fallback applies to the whole batch
+        self.plan_generator = AccountPlanGenerator(agent.client, model=agent.model) if generate_plans else None
+        self.results_path = os.path.join(output_dir, "results.jsonl")
+        self.checkpoint_path = os.path.join(output_dir, "checkpoint.txt")
+        self._write_lock = threading.Lock()
+
+    def completed(self) -> Set[str]:
+        if not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def run(self, companies: List[str]) -> Dict[str, Any]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        done = self.completed()
+        pending = [company for company in companies if company.lower() not in done]
+        skipped = len(companies) - len(pending)
+        self._compact_results({company.lower() for company in pending})
+        if skipped:
+            print(f"Resuming: {skipped} companies already done, {len(pending)} to go")
+
+        succeeded = 0
+        failed = 0
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self._process, company): company for company in pending}
+            for future in as_completed(futures):
+                company = futures[future]
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    self._write_record({'company': company, 'success': False, 'error': str(e)})
+                    ok = False
+                if ok:
+                    succeeded += 1
+                else:
+                    failed += 1
+                elapsed = time.monotonic() - started
+                rate = (succeeded + failed) / elapsed * 60 if elapsed else 0.0
+                print(f"[{succeeded + failed}/{len(pending)}] {company}: {'ok' if ok else 'failed'} ({rate:.1f} companies/min)")
+
+        # the agent's background pool; it is recreated if the agent is used again
+        self.agent.close()
+        elapsed = time.monotonic() - started
+        return {
+            'total': len(companies),
+            'skipped': skipped,
+            'succeeded': succeeded,
+            'failed': failed,
+            'elapsed_seconds': elapsed,
+            'companies_per_minute': (succeeded + failed) / elapsed * 60 if elapsed else 0.0
+        }
+
+    def _process(self, company: str) -> bool:
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        result = self.agent.research_company(company, ask_user_callback=None)
+        record = {'company': company}
+        record.update(result)
+
+        plan = None
+        if result.get('success') and self.generate_plans:
+            plan = self.plan_generator.generate_plan(
+                company_name=result.get('company_name', company),
+                research_context=result.get('response', ''),
+                conflicts=result.get('conflicts', [])
+            )
+            for source in result.get('sources', []):
+                plan.add_source(source)
+            record['plan'] = plan.sections
+
+        self._write_record(record)
+        if not result.get('success'):
+            return False
+
+        with open(os.path.join(self.output_dir, f"{self._slug(company)}.md"), 'w', encoding="utf-8") as f:
+            f.write(f"# {result.get('company_name', company)}\n\n{result.get('response', '')}\n")
+            if plan and self.plan_format == "markdown":
+                f.write("\n")
+                plan.write_markdown(f)
+        if plan and self.plan_format != "markdown":
+            extension = "json" if self.plan_format == "json" else "html"
+            with open(os.path.join(self.output_dir, f"{self._slug(company)}_plan.{extension}"), 'w', encoding="utf-8") as f:
+                plan.write(f, self.plan_format)
+
+        # only successes are checkpointed, so failures are retried on the next run
+        with self._write_lock:
+            with open(self.checkpoint_path, 'a', encoding="utf-8") as f:
+                f.write(company.lower() + "\n")
+        return True
+
+    def _compact_results(self, pending: Set[str]):
+        # A record is written before its company is checkpointed, and failures are
+        # retried, so a rerun would append a second record for the same company. Keep
+        # one record per company and drop those about to be redone.
+        if not os.path.exists(self.results_path):
+            return
+        records = {}
+        with open(self.results_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    key = str(json.loads(line).get('company') or "").lower()
+                except ValueError:
+                    # a line cut short by the crash
+                    continue
+                if key not in pending:
+                    records.pop(key, None)
+                    records[key] = line if line.endswith("\n") else line + "\n"
+        temporary = self.results_path + ".tmp"
+        with open(temporary, 'w', encoding="utf-8") as f:
+            f.writelines(records.values())
+        os.replace(temporary, self.results_path)
+
+    def _write_record(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=to_jsonable)
+        with self._write_lock:
+            with open(self.results_path, 'a', encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _slug(self, company: str) -> str:
+        name = company.lower()
+        slug = re.sub(r'[^a-z0-9]+', '_', name).strip('_') or 'company'
+        if slug == name:
+            return slug
+        # "AT&T" and "AT T" both become at_t; the hash keeps their reports apart
+        return f"{slug}_{hashlib.sha1(name.encode('utf-8')).hexdigest()[:6]}"
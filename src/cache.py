@@ -0,0 +1,209 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+DEFAULT_TTLS = {
+    "wikipedia": 7 * 24 * 3600,
+    "news": 30 * 60,
+    "linkedin": 24 * 3600,
+    "web": 6 * 3600,
+    "llm": 24 * 3600
+}
+
+# how long a definitive "nothing there" (e.g. a LinkedIn slug that 404s) is remembered
+NEGATIVE_TTLS = {
+    "wikipedia": 3600,
+    "news": 10 * 60,
+    "linkedin": 6 * 3600,
+    "web": 15 * 60
+}
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "company_research_assistant", "responses.sqlite3")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class ResponseCache(ABC):
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None):
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.negative_ttls = dict(NEGATIVE_TTLS)
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._counters_lock = threading.Lock()
+
+    @abstractmethod
+    def _load(self, key: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def _store(self, key: str, value: str, expires_at: float):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    def make_key(self, namespace: str, query: str, **params) -> str:
+        key = f"{namespace}:{normalize_query(query)}"
+        if params:
+            key += "|" + "&".join(f"{name}={params[name]}" for name in sorted(params))
+        return key
+
+    def get(self, namespace: str, query: str, **params) -> Any:
+        raw = self._load(self.make_key(namespace, query, **params))
+        self._count(namespace, "hits" if raw is not None else "misses")
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, namespace: str, query: str, value: Any, ttl: Optional[float] = None, **params):
+        if ttl is None:
+            ttl = self.ttls.get(namespace, 3600)
+        self._store(self.make_key(namespace, query, **params), json.dumps(value), time.time() + ttl)
+
+    def remember_missing(self, namespace: str, query: str, **params):
+        # unlike a failed fetch, a confirmed miss is stored (briefly) as an empty result,
+        # which cached() then returns without fetching again
+        self.set(namespace, query, [], ttl=self.negative_ttls.get(namespace, 300), **params)
+
+    def cached(self, namespace: str, query: str, fetch: Callable[[], Any], **params) -> Any:
+        value = self.get(namespace, query, **params)
+        if value is not None:
+            return value
+        value = fetch()
+        # empty results are usually a failed or throttled fetch, not an answer worth keeping
+        if value:
+            self.set(namespace, query, value, **params)
+        return value
+
+    async def acached(self, namespace: str, query: str, fetch: Callable[[], Awaitable[Any]], **params) -> Any:
+        value = self.get(namespace, query, **params)
+        if value is not None:
+            return value
+        value = await fetch()
+        if value:
+            self.set(namespace, query, value, **params)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counters_lock:
+            by_source = {name: dict(counts) for name, counts in self._counters.items()}
+        hits = sum(counts["hits"] for counts in by_source.values())
+        misses = sum(counts["misses"] for counts in by_source.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "by_source": by_source
+        }
+
+    def _count(self, namespace: str, counter: str):
+        with self._counters_lock:
+            counts = self._counters.setdefault(namespace, {"hits": 0, "misses": 0})
+            counts[counter] += 1
+
+
+class MemoryResponseCache(ResponseCache):
+
+    def __init__(self, max_entries: int = 1024, ttls: Optional[Dict[str, float]] = None):
+        super().__init__(ttls)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _store(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteResponseCache(ResponseCache):
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 10000, ttls: Optional[Dict[str, float]] = None):
+        super().__init__(ttls)
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            self._conn.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+
+    def _load(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at < now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            return value
+
+    def _store(self, key: str, value: str, expires_at: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_default_cache() -> Optional[ResponseCache]:
+    path = os.getenv("RESEARCH_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if not path or path.lower() in ("off", "none"):
+        return None
+    try:
+        return SQLiteResponseCache(os.path.expanduser(path))
+    except (sqlite3.Error, OSError):
+        return MemoryResponseCache()
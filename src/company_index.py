@@ -0,0 +1,146 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional, Set
+
+
+BUNDLED_INDEX_PATH = os.path.join(os.path.dirname(__file__), "data", "companies.json")
+LEGAL_SUFFIXES = frozenset({
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "llc", "plc",
+    "ag", "sa", "se", "nv", "gmbh", "group"
+})
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+# a bare word is only read as a ticker when it looks like one ("AAPL", not "spot")
+MAX_TICKER_LENGTH = 5
+
+
+def normalize_company_name(name: str) -> str:
+    words = _NON_ALNUM_RE.sub(" ", name.lower().replace("&", " and ")).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words = words[:-1]
+    return " ".join(words)
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanyRecord:
+
+    def __init__(self, id: str, name: str, aliases: Optional[List[str]] = None, tickers: Optional[List[str]] = None, linkedin: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.aliases = aliases or []
+        self.tickers = tickers or []
+        self.linkedin = linkedin
+
+    @property
+    def short_name(self) -> str:
+        # what people call it, for search queries and display: "Apple", not "Apple Inc."
+        return min([self.name] + self.aliases[:1], key=len)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'aliases': self.aliases,
+            'tickers': self.tickers,
+            'linkedin': self.linkedin
+        }
+
+
+class CompanyMatch:
+    # name is how to refer to the company in answers: the index's own spelling of what
+    # was matched ("Google", not "Alphabet Inc."), or the record's short name for tickers.
+    # Searches use record.short_name so every alias shares one fetch; record.id is the
+    # stable key.
+
+    def __init__(self, record: CompanyRecord, score: float, matched: str, name: Optional[str] = None):
+        self.record = record
+        self.score = score
+        self.matched = matched
+        self.name = name or record.short_name
+
+
+class CompanyIndex:
+    # Resolves the many spellings of a company ("apple", "Apple Inc", "AAPL") to one
+    # canonical record: exact lookups on normalised names and tickers first, then a
+    # trigram index for typos and partial names.
+
+    def __init__(self, records: List[CompanyRecord], min_similarity: float = 0.7):
+        self.records = {}
+        self.min_similarity = min_similarity
+        self._by_key = {}
+        self._spellings = {}
+        self._by_ticker = {}
+        self._trigram_keys = {}
+        for record in records:
+            self.add(record)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None, **kwargs) -> 'CompanyIndex':
+        path = os.path.expanduser(path or os.getenv("COMPANY_INDEX_PATH") or BUNDLED_INDEX_PATH)
+        with open(path, encoding="utf-8") as f:
+            if path.lower().endswith(".jsonl"):
+                entries = [json.loads(line) for line in f if line.strip()]
+            else:
+                entries = json.load(f)
+        return cls([CompanyRecord(**entry) for entry in entries], **kwargs)
+
+    def add(self, record: CompanyRecord):
+        self.records[record.id] = record
+        for name in [record.name, record.id] + record.aliases:
+            key = normalize_company_name(name)
+            if not key:
+                continue
+            # the first record to claim a name keeps it
+            if self._by_key.setdefault(key, record.id) == record.id and name != record.id:
+                spelling = self._spellings.get(key)
+                if spelling is None or len(name) < len(spelling):
+                    self._spellings[key] = name
+            for trigram in _trigrams(key):
+                self._trigram_keys.setdefault(trigram, set()).add(key)
+        for ticker in record.tickers:
+            self._by_ticker.setdefault(ticker.upper(), record.id)
+
+    def get(self, company_id: str) -> Optional[CompanyRecord]:
+        return self.records.get(company_id)
+
+    def resolve(self, name: str) -> Optional[CompanyMatch]:
+        name = name.strip()
+        ticker = name.lstrip("$").upper()
+        if name.startswith("$") and ticker in self._by_ticker:
+            return CompanyMatch(self.records[self._by_ticker[ticker]], 1.0, ticker)
+
+        key = normalize_company_name(name)
+        if not key:
+            return None
+        if key in self._by_key:
+            return CompanyMatch(self.records[self._by_key[key]], 1.0, key, self._spellings.get(key))
+        if name.isupper() and len(name) <= MAX_TICKER_LENGTH and ticker in self._by_ticker:
+            return CompanyMatch(self.records[self._by_ticker[ticker]], 1.0, ticker)
+
+        trigrams = _trigrams(key)
+        shared = {}
+        for trigram in trigrams:
+            for candidate in self._trigram_keys.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        best_key, best_score = None, 0.0
+        for candidate, count in shared.items():
+            score = count / (len(trigrams) + len(_trigrams(candidate)) - count)
+            if score > best_score:
+                best_key, best_score = candidate, score
+        if best_key is None or best_score < self.min_similarity:
+            return None
+        return CompanyMatch(self.records[self._by_key[best_key]], best_score, best_key, self._spellings.get(best_key))
+
+    def canonical_id(self, name: str) -> str:
+        match = self.resolve(name)
+        if match:
+            return match.record.id
+        return normalize_company_name(name).replace(" ", "-") or name
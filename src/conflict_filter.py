@@ -0,0 +1,140 @@
+import os
+import re
+import zlib
+from typing import Dict, List, Optional
+import numpy as np
+
+
+DEFAULT_THRESHOLD = 0.1
+
+_SENTENCE_RE = re.compile(r"(?<!\bInc\.)(?<!\bLtd\.)(?<!\bCorp\.)(?<!\bCo\.)(?<!\b[A-Z]\.)(?<=[.!?;])\s+")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PROPER_RE = re.compile(r"\b[A-Z][A-Za-z&\-]+")
+_NUMBER_RE = re.compile(r"(\$)?\b(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\b\s*(%|percent|billion|million|thousand|bn|m)?", re.IGNORECASE)
+_NEGATIONS = frozenset({
+    "not", "no", "never", "none", "former", "formerly", "defunct", "dissolved", "bankrupt", "bankruptcy",
+    "acquired", "ceased", "closed", "discontinued", "shut", "merged"
+})
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it", "its",
+    "of", "on", "or", "that", "the", "their", "this", "to", "was", "were", "which", "with"
+})
+
+
+def extract_claims(text: str, min_words: int = 4) -> List[str]:
+    claims = []
+    for sentence in _SENTENCE_RE.split(text or ""):
+        sentence = sentence.strip()
+        if len(sentence.split()) >= min_words:
+            claims.append(sentence)
+    return claims
+
+
+def _numbers(claim: str) -> Dict[str, set]:
+    # grouped by kind so a founding year is never compared with a headcount
+    found = {}
+    for currency, value, unit in _NUMBER_RE.findall(claim):
+        value = value.replace(",", "")
+        unit = (unit or "").lower()
+        if unit in ("%", "percent"):
+            kind = "percent"
+        elif currency or unit:
+            kind = "amount"
+            value = f"{value}{unit[:1]}"
+        elif len(value) == 4 and value[:2] in ("18", "19", "20"):
+            kind = "year"
+        else:
+            kind = "count"
+        found.setdefault(kind, set()).add(value)
+    return found
+
+
+class HashedEmbedder:
+    # Feature-hashed bag of words and bigrams; no vocabulary or model to load, so
+    # it is cheap enough to run on every query.
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = [word for word in _TOKEN_RE.findall(text.lower()) if word not in _STOPWORDS]
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                columns.append(digest % self.dim)
+                signs.append(1.0 if digest & 0x80000000 else -1.0)
+
+        vectors = np.zeros((len(texts), self.dim))
+        np.add.at(vectors, (rows, columns), signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class ConflictPrefilter:
+    # Local screen run before the LLM conflict check. Claims from different sources
+    # that talk about the same thing (similar embeddings) but disagree on a number,
+    # a negation/status word or a named entity push the score up; only scores at or
+    # above the threshold are worth an LLM call.
+
+    def __init__(self, threshold: Optional[float] = None, topic_similarity: float = 0.2, embedder: Optional[HashedEmbedder] = None):
+        if threshold is None:
+            threshold = float(os.getenv("CONFLICT_PREFILTER_THRESHOLD", DEFAULT_THRESHOLD))
+        self.threshold = threshold
+        self.topic_similarity = topic_similarity
+        self.embedder = embedder or HashedEmbedder()
+
+    def should_escalate(self, texts_by_source: Dict[str, str]) -> bool:
+        return self.score(texts_by_source) >= self.threshold
+
+    def score(self, texts_by_source: Dict[str, str]) -> float:
+        claims = []
+        owners = []
+        for owner, text in enumerate(texts_by_source.values()):
+            for claim in extract_claims(text):
+                claims.append(claim)
+                owners.append(owner)
+        if len(set(owners)) < 2:
+            return 0.0
+
+        vectors = self.embedder.embed(claims)
+        similarity = vectors @ vectors.T
+        owners = np.array(owners)
+        candidates = np.triu((owners[:, None] != owners[None, :]) & (similarity >= self.topic_similarity), 1)
+
+        facts = [self._facts(claim) for claim in claims]
+        best = 0.0
+        for i, j in zip(*np.nonzero(candidates)):
+            best = max(best, float(similarity[i, j]) * self._disagreement(facts[i], facts[j]))
+        return best
+
+    def _facts(self, claim: str) -> Dict[str, object]:
+        words = set(_TOKEN_RE.findall(claim.lower()))
+        # the first word is capitalised anyway, so it says nothing about entities
+        proper = {match.lower() for match in _PROPER_RE.findall(claim.split(None, 1)[1] if " " in claim else "")}
+        return {
+            'words': words,
+            'numbers': _numbers(claim),
+            'negated': bool(words & _NEGATIONS),
+            'entities': proper
+        }
+
+    def _disagreement(self, first: Dict[str, object], second: Dict[str, object]) -> float:
+        disagreement = 0.0
+        for kind in first['numbers'].keys() & second['numbers'].keys():
+            ours, theirs = first['numbers'][kind], second['numbers'][kind]
+            if not ours & theirs:
+                disagreement = max(disagreement, 1.0)
+            elif ours != theirs:
+                disagreement = max(disagreement, 0.5)
+        if first['negated'] != second['negated']:
+            disagreement = max(disagreement, 0.7)
+        # each side names something the other never mentions, e.g. two different cities
+        if first['entities'] - second['words'] and second['entities'] - first['words']:
+            disagreement = max(disagreement, 0.5)
+        return disagreement
@@ -0,0 +1,277 @@
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DEFAULT_TOKEN_BUDGET = 2000
+SOURCE_ORDER = ("wikipedia", "news", "linkedin", "web")
+SECTION_HEADERS = {
+    "wikipedia": "=== WIKIPEDIA SOURCES ===",
+    "news": "=== NEWS SOURCES ===",
+    "linkedin": "=== LINKEDIN SOURCE ===",
+    "web": "=== WEB SEARCH RESULTS ==="
+}
+TITLE_LINES = {
+    "wikipedia": "Wikipedia Source {number}: {title}",
+    "news": "News Article {number}: {title}",
+    "linkedin": "Company: {title}",
+    "web": "Web Result {number}: {title}"
+}
+# how much a passage is worth before looking at the query; the first result of each
+# source counts most, so a query-less budget still keeps one passage per source
+SOURCE_PRIORS = {
+    "wikipedia": 1.0,
+    "news": 0.7,
+    "linkedin": 0.6,
+    "web": 0.5
+}
+RELEVANCE_WEIGHT = 0.6
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({
+    "a", "about", "an", "and", "any", "are", "as", "at", "be", "by", "company", "can", "details", "did", "do",
+    "does", "find", "for", "from", "how", "i", "in", "information", "is", "it", "its", "me", "of", "on", "or",
+    "research", "tell", "that", "the", "their", "they", "this", "to", "was", "what", "when", "where", "which",
+    "who", "why", "with", "you"
+})
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in _WORD_RE.findall(text.lower()) if len(word) > 1]
+
+
+class TokenCounter:
+    # Uses the model's tiktoken encoding when tiktoken is installed and the encoding
+    # can be loaded; otherwise falls back to the usual ~4 characters per token estimate.
+
+    def __init__(self, model: str = "gpt-4o-mini"):
+        self.encoding = None
+        try:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            self.encoding = None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.count(text) <= max_tokens:
+            return text
+        if max_tokens <= 1:
+            return ""
+        # one token is kept back for the ellipsis
+        if self.encoding is not None:
+            cut = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens - 1])
+        else:
+            cut = text[:(max_tokens - 1) * 4]
+        if " " in cut:
+            cut = cut[:cut.rfind(" ")]
+        return cut.rstrip(" ,;:-") + "…"
+
+
+class Passage:
+
+    def __init__(self, source: str, position: int, title: str, fields: List[Tuple[str, str]], body_label: str):
+        self.source = source
+        self.position = position
+        self.title = title
+        self.fields = fields
+        self.body_label = body_label
+
+    @property
+    def body(self) -> str:
+        for label, value in self.fields:
+            if label == self.body_label:
+                return value
+        return ""
+
+    @property
+    def text(self) -> str:
+        return " ".join([self.title] + [value for label, value in self.fields if label not in ("Source", "URL")])
+
+    def with_body(self, body: str) -> 'Passage':
+        fields = [(label, body if label == self.body_label else value) for label, value in self.fields]
+        return Passage(self.source, self.position, self.title, fields, self.body_label)
+
+    def render(self, number: int) -> List[str]:
+        lines = [TITLE_LINES[self.source].format(number=number, title=self.title)]
+        lines.extend(f"{label}: {value}" for label, value in self.fields)
+        lines.append("")
+        return lines
+
+
+class BuiltContext:
+
+    def __init__(self, text: str, total_tokens: int, tokens_by_source: Dict[str, int], budget: Optional[int] = None, dropped: int = 0, deduplicated: int = 0):
+        self.text = text
+        self.total_tokens = total_tokens
+        self.tokens_by_source = tokens_by_source
+        self.budget = budget
+        self.dropped = dropped
+        self.deduplicated = deduplicated
+
+    def usage(self) -> Dict[str, Any]:
+        return {
+            'total': self.total_tokens,
+            'budget': self.budget,
+            'by_source': dict(self.tokens_by_source),
+            'dropped': self.dropped,
+            'deduplicated': self.deduplicated
+        }
+
+
+class ContextBuilder:
+    # Assembles the source context for a prompt within a token budget: near-duplicate
+    # snippets are dropped, the rest are ranked against the query and the best ones
+    # are kept (truncating the last one that only partly fits).
+
+    def __init__(self, token_budget: Optional[int] = None, counter: Optional[TokenCounter] = None, model: str = "gpt-4o-mini", dedupe_threshold: float = 0.8, min_passage_tokens: int = 40, max_passage_share: float = 0.4):
+        if token_budget is None:
+            token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+        # a budget of 0 or less means no limit
+        self.token_budget = token_budget if token_budget > 0 else None
+        self.counter = counter or TokenCounter(model)
+        self.dedupe_threshold = dedupe_threshold
+        self.min_passage_tokens = min_passage_tokens
+        self.max_passage_share = max_passage_share
+
+    def build(self, query: str, wikipedia_sources: List[Dict[str, str]], news_sources: List[Dict[str, str]] = None, linkedin_source: Dict[str, str] = None, web_sources: List[Dict[str, str]] = None) -> BuiltContext:
+        passages = self._passages(wikipedia_sources, news_sources, linkedin_source, web_sources)
+        unique = self._dedupe(passages)
+        selected = self._fit(self._rank(query, unique))
+        return self._render(selected, dropped=len(unique) - len(selected), deduplicated=len(passages) - len(unique))
+
+    def render(self, wikipedia_sources: List[Dict[str, str]], news_sources: List[Dict[str, str]] = None, linkedin_source: Dict[str, str] = None, web_sources: List[Dict[str, str]] = None) -> BuiltContext:
+        # every passage, unranked and unbudgeted
+        return self._render(self._passages(wikipedia_sources, news_sources, linkedin_source, web_sources))
+
+    def _passages(self, wikipedia_sources, news_sources, linkedin_source, web_sources) -> List[Passage]:
+        passages = []
+        for i, source in enumerate(wikipedia_sources or []):
+            passages.append(Passage("wikipedia", i, source.get('title', 'Unknown'), [
+                ("Summary", source.get('summary', 'No summary available')),
+                ("URL", source.get('url', 'N/A'))
+            ], "Summary"))
+        for i, article in enumerate(news_sources or []):
+            fields = [
+                ("Source", article.get('source', 'Unknown')),
+                ("Description", article.get('description', 'No description'))
+            ]
+            if article.get('content'):
+                fields.append(("Content", article.get('content', '')))
+            fields.append(("URL", article.get('url', 'N/A')))
+            passages.append(Passage("news", i, article.get('title', 'Unknown'), fields, "Content" if article.get('content') else "Description"))
+        if linkedin_source:
+            passages.append(Passage("linkedin", 0, linkedin_source.get('title', 'Unknown'), [
+                ("Description", linkedin_source.get('description', 'No description')),
+                ("URL", linkedin_source.get('url', 'N/A'))
+            ], "Description"))
+        for i, result in enumerate(web_sources or []):
+            passages.append(Passage("web", i, result.get('title', 'Unknown'), [
+                ("Description", result.get('description', 'No description')),
+                ("URL", result.get('url', 'N/A'))
+            ], "Description"))
+        return passages
+
+    def _dedupe(self, passages: List[Passage]) -> List[Passage]:
+        # passages arrive in source priority order, so the copy from the more
+        # authoritative source is the one that survives
+        kept = []
+        kept_words = []
+        for passage in passages:
+            words = set(_words(passage.body))
+            duplicate = False
+            if words:
+                for other in kept_words:
+                    if other and len(words & other) / len(words | other) >= self.dedupe_threshold:
+                        duplicate = True
+                        break
+            if not duplicate:
+                kept.append(passage)
+                kept_words.append(words)
+        return kept
+
+    def _rank(self, query: str, passages: List[Passage]) -> List[Passage]:
+        terms = {word for word in _words(query or "") if word not in _STOPWORDS}
+        passage_words = [_words(passage.text) for passage in passages]
+        document_frequency = {term: sum(1 for words in passage_words if term in words) for term in terms}
+
+        scores = []
+        for words in passage_words:
+            score = 0.0
+            for term in terms:
+                frequency = words.count(term)
+                if frequency:
+                    idf = math.log((len(passages) + 1) / (document_frequency[term] + 0.5))
+                    score += idf * frequency / (frequency + 1.2)
+            scores.append(score)
+
+        best = max(scores, default=0.0) or 1.0
+        for i, passage in enumerate(passages):
+            prior = SOURCE_PRIORS[passage.source] / (1 + passage.position)
+            scores[i] = RELEVANCE_WEIGHT * scores[i] / best + (1 - RELEVANCE_WEIGHT) * prior
+
+        # ties keep the original source priority and in-source order
+        order = sorted(range(len(passages)), key=lambda i: (-scores[i], SOURCE_ORDER.index(passages[i].source), passages[i].position))
+        return [passages[i] for i in order]
+
+    def _fit(self, ranked: List[Passage]) -> List[Passage]:
+        if self.token_budget is None:
+            return ranked
+
+        remaining = self.token_budget
+        # no single long passage (typically a Wikipedia summary) may crowd out the rest
+        passage_limit = max(self.min_passage_tokens, int(self.token_budget * self.max_passage_share))
+        started = set()
+        selected = []
+        for passage in ranked:
+            header_cost = 0 if passage.source in started else self.counter.count(SECTION_HEADERS[passage.source] + "\n")
+            cost = header_cost + self._cost(passage)
+            allowed = min(remaining, header_cost + passage_limit)
+            if cost > allowed:
+                overhead = cost - self.counter.count(passage.body)
+                room = allowed - overhead
+                if room < self.min_passage_tokens:
+                    if selected:
+                        continue
+                    # the best passage always goes in, cut to what the budget has left
+                    room = min(remaining - overhead, self.min_passage_tokens)
+                    if room <= 0:
+                        continue
+                passage = passage.with_body(self.counter.truncate(passage.body, room))
+                cost = header_cost + self._cost(passage)
+                if cost > remaining:
+                    continue
+            selected.append(passage)
+            started.add(passage.source)
+            remaining -= cost
+        return selected
+
+    def _cost(self, passage: Passage) -> int:
+        return self.counter.count("\n".join(passage.render(passage.position + 1)) + "\n")
+
+    def _render(self, passages: List[Passage], dropped: int = 0, deduplicated: int = 0) -> BuiltContext:
+        sections = []
+        tokens_by_source = {}
+        for source in SOURCE_ORDER:
+            group = sorted((p for p in passages if p.source == source), key=lambda p: p.position)
+            if not group:
+                continue
+            lines = [SECTION_HEADERS[source]]
+            for number, passage in enumerate(group, 1):
+                lines.extend(passage.render(number))
+            section = "\n".join(lines)
+            sections.append(section)
+            tokens_by_source[source] = self.counter.count(section)
+
+        text = "\n".join(sections)
+        return BuiltContext(text, self.counter.count(text), tokens_by_source, self.token_budget, dropped, deduplicated)
@@ -0,0 +1,211 @@
+import os
+import re
+import urllib.parse
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+
+# query parameters that only track where a click came from
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src", "cmpid", "src", "trk", "_ga", "_hsenc", "_hsmi"
+})
+TRACKING_PREFIXES = ("utm_",)
+# host labels under which sites serve the same pages (www.apple.com, en.m.wikipedia.org)
+ALIAS_LABELS = frozenset({"www", "m", "mobile"})
+# second-level labels of country suffixes such as co.uk and com.au; without a full public
+# suffix list, a two-letter TLD after one of these is taken to be a two-label suffix
+SECOND_LEVEL_LABELS = frozenset({"ac", "co", "com", "edu", "gov", "ltd", "ne", "net", "or", "org", "plc"})
+REDIRECT_HOSTS = {
+    "duckduckgo.com": "uddg",
+    "html.duckduckgo.com": "uddg",
+    "lite.duckduckgo.com": "uddg",
+    "www.google.com": "q"
+}
+# where a source came from; a copy found by another agent never overwrites these
+PROVENANCE_FIELDS = frozenset({"source", "url"})
+# titles differ between sites ("Apple Inc. - Wikipedia"), so only the body is compared
+TEXT_FIELDS = ("description", "summary", "content")
+
+_SHINGLE_WORD_RE = re.compile(r"[a-z0-9]+")
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def unwrap_redirect(url: str) -> str:
+    # DuckDuckGo HTML results link to //duckduckgo.com/l/?uddg=<target>&rut=...
+    if not url:
+        return url
+    if url.startswith("//"):
+        url = "https:" + url
+    parts = urllib.parse.urlsplit(url)
+    param = REDIRECT_HOSTS.get(parts.hostname or "")
+    if param and parts.path in ("/l/", "/l", "/url"):
+        target = urllib.parse.parse_qs(parts.query).get(param)
+        if target and target[0]:
+            return target[0]
+    return url
+
+
+def registrable_labels(labels: List[str]) -> int:
+    # how many trailing labels make up the registrable domain: example.com, example.co.uk
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        return 3
+    return min(2, len(labels))
+
+
+def canonicalize_url(url: Optional[str]) -> str:
+    # The key two links to the same page share; only for comparison, never shown
+    if not url:
+        return ""
+    parts = urllib.parse.urlsplit(unwrap_redirect(url.strip()))
+    if not parts.hostname:
+        return url.strip()
+
+    labels = parts.hostname.rstrip(".").split(".")
+    # the registrable domain itself is never dropped (m.co.uk stays m.co.uk)
+    kept = registrable_labels(labels)
+    host = ".".join([label for label in labels[:-kept] if label not in ALIAS_LABELS] + labels[-kept:])
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = urllib.parse.quote(urllib.parse.unquote(parts.path), safe="/:@!$&'()*+,;=-._~")
+    path = re.sub(r"/{2,}", "/", path)
+    if path.endswith("/index.html") or path.endswith("/index.htm"):
+        path = path[:path.rfind("/") + 1]
+    path = path.rstrip("/") or "/"
+
+    query = sorted(
+        (key, value) for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    # http and https copies of a page are the same page; the fragment never reaches the server
+    return urllib.parse.urlunsplit(("https", host, path, urllib.parse.urlencode(query), ""))
+
+
+def source_text(source: Dict[str, Any]) -> str:
+    return " ".join(source.get(field) or "" for field in TEXT_FIELDS)
+
+
+class MinHasher:
+    # MinHash signatures over word shingles; the share of equal positions in two
+    # signatures estimates the Jaccard similarity of the shingle sets. Signatures are
+    # split into bands so near-duplicate candidates come from bucket lookups instead
+    # of comparing every pair.
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set:
+        words = _SHINGLE_WORD_RE.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) & _MERSENNE_PRIME for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        # (a * h + b) mod p for every permutation and shingle; values stay below 2**62
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+    def band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        return float(np.count_nonzero(first == second)) / len(first)
+
+
+class SourceDeduplicator:
+    # Merges copies of the same source across agents, e.g. a Wikipedia page that also
+    # comes back from DuckDuckGo behind a redirect link. Exact copies are found by
+    # canonical URL in a dict, copies of the same text under another URL by MinHash.
+    # Groups are passed in priority order, so the copy from the more authoritative
+    # source is kept; a same-URL copy also fills in fields the kept one left empty.
+
+    def __init__(self, near_duplicate_threshold: Optional[float] = None, min_shingles: int = 5, hasher: Optional[MinHasher] = None):
+        if near_duplicate_threshold is None:
+            setting = os.getenv("SOURCE_DEDUP_THRESHOLD", "0.8")
+            near_duplicate_threshold = None if setting.lower() == "off" else float(setting)
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.min_shingles = min_shingles
+        self.hasher = hasher or MinHasher()
+
+    def dedupe(self, groups: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        # groups maps a name to a list of sources, or a single source (linkedin);
+        # returns the same shape without duplicates and how many were merged
+        by_url: Dict[str, Dict[str, Any]] = {}
+        buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        signatures: List[np.ndarray] = []
+        owners: List[Dict[str, Any]] = []
+        merged = 0
+        result = {}
+
+        for name, group in groups.items():
+            single = not isinstance(group, list)
+            kept = []
+            for source in (([group] if group else []) if single else group):
+                source = self._unwrapped(source)
+                key = canonicalize_url(source.get('url'))
+                original = by_url.get(key) if key else None
+                if original is not None:
+                    self._merge(original, source)
+                    merged += 1
+                    continue
+                signature = None
+                if self.near_duplicate_threshold is not None:
+                    signature = self._signature(source)
+                    if signature is not None and self._near_duplicate(signature, buckets, signatures, owners) is not None:
+                        merged += 1
+                        continue
+
+                source = dict(source)
+                kept.append(source)
+                if key:
+                    by_url[key] = source
+                if signature is not None:
+                    for band_key in self.hasher.band_keys(signature):
+                        buckets.setdefault(band_key, []).append(len(signatures))
+                    signatures.append(signature)
+                    owners.append(source)
+            result[name] = (kept[0] if kept else None) if single else kept
+        return result, merged
+
+    def _unwrapped(self, source: Dict[str, Any]) -> Dict[str, Any]:
+        url = source.get('url')
+        target = unwrap_redirect(url) if url else url
+        return dict(source, url=target) if target != url else source
+
+    def _signature(self, source: Dict[str, Any]) -> Optional[np.ndarray]:
+        text = source_text(source)
+        # a one-line snippet has too few shingles for a meaningful estimate
+        if len(self.hasher.shingles(text)) < self.min_shingles:
+            return None
+        return self.hasher.signature(text)
+
+    def _near_duplicate(self, signature: np.ndarray, buckets, signatures, owners) -> Optional[Dict[str, Any]]:
+        candidates = set()
+        for band_key in self.hasher.band_keys(signature):
+            candidates.update(buckets.get(band_key, ()))
+        best, best_score = None, self.near_duplicate_threshold
+        for i in candidates:
+            score = self.hasher.similarity(signature, signatures[i])
+            if score >= best_score:
+                best, best_score = owners[i], score
+        return best
+
+    def _merge(self, original: Dict[str, Any], duplicate: Dict[str, Any]):
+        # only fields the kept source has but left empty, so a Wikipedia page doesn't pick
+        # up a search snippet as its description; provenance always stays its own
+        for key, value in duplicate.items():
+            if key not in PROVENANCE_FIELDS and key in original and value and not original[key]:
+                original[key] = value
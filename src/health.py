@@ -0,0 +1,129 @@
+import threading
+import time
+from typing import Any, Callable, Dict
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# statuses that mean the upstream is refusing or struggling, as opposed to a plain
+# "not found"; 999 is what LinkedIn answers when it blocks a client
+FAILURE_STATUSES = frozenset({403, 429, 999})
+# DuckDuckGo's HTML endpoint answers 202 with an empty page when it throttles
+SOURCE_FAILURE_STATUSES = {
+    "web": frozenset({202})
+}
+
+
+def is_failure_status(source: str, status_code: int) -> bool:
+    return status_code >= 500 or status_code in FAILURE_STATUSES or status_code in SOURCE_FAILURE_STATUSES.get(source, ())
+
+
+class SourceUnavailable(Exception):
+
+    def __init__(self, source: str):
+        super().__init__(f"{source} is temporarily skipped (circuit open)")
+        self.source = source
+
+
+class CircuitBreaker:
+    # closed: requests flow and consecutive failures are counted. open: requests are
+    # refused until the cool-down has passed. half_open: a single trial request is let
+    # through; success closes the breaker again, failure re-opens it.
+
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self.successes = 0
+        self.failures = 0
+        self.skipped = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.skipped += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._state = CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self._current_state() == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.trips += 1
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+
+    def release_trial(self):
+        # a request given up on before it finished; in half_open another trial may go
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_in = max(0.0, self.cooldown - (self._clock() - self._opened_at)) if state == OPEN else 0.0
+            return {
+                'state': state,
+                'consecutive_failures': self.consecutive_failures,
+                'successes': self.successes,
+                'failures': self.failures,
+                'skipped': self.skipped,
+                'trips': self.trips,
+                'retry_in_seconds': retry_in
+            }
+
+
+class SourceHealth:
+    # One breaker per source, shared by the sync and async transports so both see the
+    # same view of an upstream.
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, source: str) -> CircuitBreaker:
+        with self._lock:
+            if source not in self._breakers:
+                self._breakers[source] = CircuitBreaker(source, self.failure_threshold, self.cooldown)
+            return self._breakers[source]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {source: breaker.snapshot() for source, breaker in breakers.items()}
@@ -1,57 +1,103 @@
-import requests
-from typing import List, Dict
+from typing import List, Dict, Optional
 from bs4 import BeautifulSoup
 import os
+from .cache import ResponseCache
+from .transport import HttpTransport, AsyncHttpTransport
+
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
 
 
 class LinkedInAgent:
     
-    def __init__(self):
-        pass
+    def __init__(self, cache: Optional[ResponseCache] = None, transport: Optional[HttpTransport] = None, async_transport: Optional[AsyncHttpTransport] = None):
+        self.cache = cache
+        self.transport = transport or HttpTransport()
+        self.async_transport = async_transport or AsyncHttpTransport()
+    
+    def search_company(self, company_name: str, slug: Optional[str] = None) -> List[Dict[str, str]]:
+        if self.cache is not None:
+            return self.cache.cached("linkedin", company_name, lambda: self._fetch_company(company_name, slug), **self._cache_params(slug))
+        return self._fetch_company(company_name, slug)
+    
+    async def asearch_company(self, company_name: str, slug: Optional[str] = None) -> List[Dict[str, str]]:
+        if self.cache is not None:
+            return await self.cache.acached("linkedin", company_name, lambda: self._afetch_company(company_name, slug), **self._cache_params(slug))
+        return await self._afetch_company(company_name, slug)
+    
+    def _fetch_company(self, company_name: str, slug: Optional[str] = None) -> List[Dict[str, str]]:
+        try:
+            url = self._company_url(company_name, slug)
+            response = self.transport.get("linkedin", url, headers=HEADERS, allow_redirects=True)
+            if response.status_code == 200:
+                return self._parse_company_page(response.content, company_name, url)
+            if response.status_code == 404:
+                self._remember_missing(company_name, slug)
+            return []
+        except Exception as e:
+            return []
     
-    def search_company(self, company_name: str) -> List[Dict[str, str]]:
+    async def _afetch_company(self, company_name: str, slug: Optional[str] = None) -> List[Dict[str, str]]:
         try:
-            url = f"https://www.linkedin.com/company/{company_name.lower().replace(' ', '-')}"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-            
+            url = self._company_url(company_name, slug)
+            response = await self.async_transport.get("linkedin", url, headers=HEADERS, allow_redirects=True)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                description = ""
-                desc_elem = soup.find('meta', {'property': 'og:description'})
-                if desc_elem:
-                    description = desc_elem.get('content', '')
-                
-                title = company_name
-                title_elem = soup.find('title')
-                if title_elem:
-                    title = title_elem.text.strip()
-                
-                if description or title != company_name:
-                    return [{
-                        "title": title,
-                        "description": description[:500] if description else "Company information from LinkedIn",
-                        "url": url,
-                        "source": "LinkedIn"
-                    }]
-            
+                return self._parse_company_page(response.content, company_name, url)
+            if response.status_code == 404:
+                self._remember_missing(company_name, slug)
             return []
         except Exception as e:
             return []
     
-    def get_company_info(self, company_name: str) -> Dict[str, str]:
-        results = self.search_company(company_name)
+    def _cache_params(self, slug: Optional[str]) -> Dict[str, str]:
+        return {'slug': slug} if slug else {}
+    
+    def _remember_missing(self, company_name: str, slug: Optional[str]):
+        # no such company page: don't fetch the same dead slug again on the next query
+        if self.cache is not None:
+            self.cache.remember_missing("linkedin", company_name, **self._cache_params(slug))
+    
+    def _company_url(self, company_name: str, slug: Optional[str] = None) -> str:
+        # a known slug from the company index beats guessing one from the name
+        return f"https://www.linkedin.com/company/{slug or company_name.lower().replace(' ', '-')}"
+    
+    def _parse_company_page(self, content: bytes, company_name: str, url: str) -> List[Dict[str, str]]:
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        description = ""
+        desc_elem = soup.find('meta', {'property': 'og:description'})
+        if desc_elem:
+            description = desc_elem.get('content', '')
+        
+        title = company_name
+        title_elem = soup.find('title')
+        if title_elem:
+            title = title_elem.text.strip()
+        
+        if description or title != company_name:
+            return [{
+                "title": title,
+                "description": description[:500] if description else "Company information from LinkedIn",
+                "url": url,
+                "source": "LinkedIn"
+            }]
+        return []
+    
+    def get_company_info(self, company_name: str, slug: Optional[str] = None) -> Dict[str, str]:
+        return self._company_info(company_name, self.search_company(company_name, slug), slug)
+    
+    async def aget_company_info(self, company_name: str, slug: Optional[str] = None) -> Dict[str, str]:
+        return self._company_info(company_name, await self.asearch_company(company_name, slug), slug)
+    
+    def _company_info(self, company_name: str, results: List[Dict[str, str]], slug: Optional[str] = None) -> Dict[str, str]:
         if results:
             return results[0]
         return {
             "title": company_name,
             "description": "",
-            "url": f"https://www.linkedin.com/company/{company_name.lower().replace(' ', '-')}",
+            "url": self._company_url(company_name, slug),
             "source": "LinkedIn"
         }
 
@@ -0,0 +1,243 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from .cache import ResponseCache
+
+
+LLM_CACHE_MODES = ("all", "deterministic", "off")
+
+# transport-level options that don't change what the model returns; a streamed and a
+# plain call for the same prompt share an entry
+_IGNORED_PARAMS = ("timeout", "extra_headers", "extra_query", "extra_body", "stream", "stream_options")
+
+
+def prompt_fingerprint(params: Dict[str, Any]) -> str:
+    keyed = {name: value for name, value in params.items() if name not in _IGNORED_PARAMS}
+    payload = json.dumps(keyed, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def mark_replayed(response: Any) -> Any:
+    # answers served from the cache are flagged so their usage isn't counted as spend
+    response._replayed = True
+    return response
+
+
+def is_replayed(response: Any) -> bool:
+    return getattr(response, "_replayed", False)
+
+
+def replay_chunks(completion: ChatCompletion, include_usage: bool = False) -> List[ChatCompletionChunk]:
+    # a cached answer handed to a streaming caller: the content, the finish reason and,
+    # when asked for, a final usage chunk, as the API sends them
+    base = {"id": completion.id, "object": "chat.completion.chunk", "created": completion.created, "model": completion.model}
+    choice = completion.choices[0]
+    chunks = [
+        {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": choice.message.content or ""}, "finish_reason": None}]},
+        {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": choice.finish_reason}]}
+    ]
+    if include_usage and completion.usage is not None:
+        chunks.append({**base, "choices": [], "usage": completion.usage.model_dump(mode="json")})
+    return [ChatCompletionChunk.model_validate(chunk) for chunk in chunks]
+
+
+class _StreamRecorder:
+    # Assembles streamed chunks into the ChatCompletion a non-streaming call would have
+    # returned; complete() is None unless the stream reached its finish reason.
+
+    def __init__(self):
+        self.parts = []
+        self.finish_reason = None
+        self.usage = None
+        self.header = None
+
+    def add(self, chunk: Any):
+        if self.header is None:
+            self.header = {"id": chunk.id, "created": chunk.created, "model": chunk.model}
+        if chunk.choices:
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                self.parts.append(choice.delta.content)
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+        if getattr(chunk, "usage", None):
+            self.usage = chunk.usage.model_dump(mode="json")
+
+    def complete(self) -> Optional[ChatCompletion]:
+        if self.header is None or self.finish_reason is None:
+            return None
+        return ChatCompletion.model_validate({
+            **self.header,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(self.parts)}, "finish_reason": self.finish_reason}],
+            "usage": self.usage
+        })
+
+
+class CachingStream:
+    # Passes a streaming response through chunk by chunk and caches the assembled
+    # completion once it finishes. A stream closed early is not cached.
+
+    def __init__(self, stream, store):
+        self._stream = stream
+        self._store = store
+        self._recorder = _StreamRecorder()
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._recorder.add(chunk)
+            yield chunk
+        self._finish()
+
+    def _finish(self):
+        completion = self._recorder.complete()
+        if completion is not None:
+            self._store(completion)
+
+    def close(self):
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncCachingStream(CachingStream):
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._recorder.add(chunk)
+            yield chunk
+        self._finish()
+
+    async def close(self):
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            await close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class _ReplayStream:
+
+    def __init__(self, chunks: List[ChatCompletionChunk]):
+        self._chunks = chunks
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield chunk
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class CachedChatCompletions:
+
+    def __init__(self, completions, cache: ResponseCache, mode: str = "all", ttl: Optional[float] = None, seed: int = 0):
+        if mode not in LLM_CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}'. Choose from: {', '.join(LLM_CACHE_MODES)}")
+        self._completions = completions
+        self.cache = cache
+        self.mode = mode
+        self.ttl = ttl
+        self.seed = seed
+
+    def create(self, **params) -> Any:
+        if not self._cacheable(params):
+            return self._completions.create(**params)
+
+        key, cached = self._lookup(params)
+        if params.get("stream"):
+            if cached is not None:
+                return self._replay(cached, params)
+            return CachingStream(self._completions.create(**params), lambda completion: self._store(key, completion))
+        if cached is not None:
+            return cached
+        response = self._completions.create(**params)
+        self._store(key, response)
+        return response
+
+    def _cacheable(self, params: Dict[str, Any]) -> bool:
+        if self.mode == "deterministic":
+            # only calls that already ask for greedy sampling are cached; a sampled call
+            # goes through untouched
+            return not params.get("temperature")
+        return self.mode != "off"
+
+    def _lookup(self, params: Dict[str, Any]):
+        if self.mode == "deterministic":
+            # pin the seed too, so the fingerprint fully determines the answer being
+            # replayed; a seed the caller gave is kept
+            params.setdefault("seed", self.seed)
+
+        key = prompt_fingerprint(params)
+        cached = self.cache.get("llm", key)
+        if cached is not None:
+            return key, mark_replayed(ChatCompletion.model_validate(cached))
+        return key, None
+
+    def _store(self, key: str, response: Any):
+        self.cache.set("llm", key, response.model_dump(mode="json"), ttl=self.ttl)
+
+    def _replay(self, cached: ChatCompletion, params: Dict[str, Any]) -> _ReplayStream:
+        include_usage = bool((params.get("stream_options") or {}).get("include_usage"))
+        return _ReplayStream([mark_replayed(chunk) for chunk in replay_chunks(cached, include_usage)])
+
+
+class CachedAsyncChatCompletions(CachedChatCompletions):
+
+    async def create(self, **params) -> Any:
+        if not self._cacheable(params):
+            return await self._completions.create(**params)
+
+        key, cached = self._lookup(params)
+        if params.get("stream"):
+            if cached is not None:
+                return self._replay(cached, params)
+            return AsyncCachingStream(await self._completions.create(**params), lambda completion: self._store(key, completion))
+        if cached is not None:
+            return cached
+        response = await self._completions.create(**params)
+        self._store(key, response)
+        return response
+
+
+class _CachedChat:
+
+    def __init__(self, completions: CachedChatCompletions):
+        self.completions = completions
+
+
+class CachingOpenAIClient:
+
+    def __init__(self, client, cache: ResponseCache, mode: str = "all", ttl: Optional[float] = None):
+        self._client = client
+        self.chat = _CachedChat(CachedChatCompletions(client.chat.completions, cache, mode=mode, ttl=ttl))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class AsyncCachingOpenAIClient(CachingOpenAIClient):
+
+    def __init__(self, client, cache: ResponseCache, mode: str = "all", ttl: Optional[float] = None):
+        self._client = client
+        self.chat = _CachedChat(CachedAsyncChatCompletions(client.chat.completions, cache, mode=mode, ttl=ttl))
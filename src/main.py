@@ -1,12 +1,25 @@
 import os
 import sys
+from typing import Optional
 from .research_agent import CompanyResearchAgent
-from .account_plan import AccountPlanGenerator
+from .account_plan import AccountPlanGenerator, SECTION_TITLES, downstream_sections
+from .memory import ConversationMemory
+from .batch import BatchRunner, read_companies
+from .server import serve
+from .transport import HttpTransport
+from .speech import SpeechPipeline, TTSEngine, GTTSEngine, AudioPlayer, PygamePlayer
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+def print_answer_header():
+    print("\n" + "=" * 60)
+    print("Here's what I found:")
+    print("=" * 60)
+    print()
+
+
 def chat_mode(agent: CompanyResearchAgent):
     print("=" * 60)
     print("👋 Hello there! I am a Company Research Assistant, how may i help you ?")
@@ -16,7 +29,9 @@ def chat_mode(agent: CompanyResearchAgent):
     print()
     
     current_plan = None
-    conversation_context = []
+    conversation_context = ConversationMemory(counter=agent.context_builder.counter)
+    # one generator for the session, so a structured output fallback sticks
+    plan_generator = AccountPlanGenerator(agent.client, model=agent.model)
     
     while True:
         try:
@@ -71,6 +86,16 @@ def chat_mode(agent: CompanyResearchAgent):
                         if new_text:
                             current_plan.update_section(section_key, new_text)
                             print("✓ Section updated!")
+                            
+                            dependents = downstream_sections(section_key)
+                            if dependents:
+                                titles = ", ".join(SECTION_TITLES[key] for key in dependents)
+                                print(f"\n💡 Refresh the sections that build on it ({titles})? (yes/no)")
+                                if input("Your answer: ").strip().lower() in ['yes', 'y']:
+                                    refreshed = plan_generator.regenerate_downstream(current_plan, section_key)
+                                    for key in refreshed:
+                                        print(f"\n## {SECTION_TITLES[key]}\n\n{current_plan.get_section(key)}")
+                                    print(f"\n✓ Refreshed {len(refreshed)} section(s)!")
                     else:
                         print("❌ Section not found!")
                 continue
@@ -80,20 +105,27 @@ def chat_mode(agent: CompanyResearchAgent):
             print("\n🔍 Let me get that information for you...")
             
             if is_followup:
-                result = agent.handle_followup(query, conversation_context)
+                stream = agent.stream_followup(query, conversation_context)
             else:
                 def ask_user(question):
                     print(f"\n{question}")
                     return input("Your answer: ").strip().lower()
                 
-                result = agent.research_company(query, ask_user_callback=ask_user)
+                stream = agent.stream_research_company(query, ask_user_callback=ask_user)
+            
+            answer_started = False
+            for chunk in stream:
+                if not answer_started:
+                    print_answer_header()
+                    answer_started = True
+                print(chunk, end='', flush=True)
+            result = stream.result
             
             if result['success']:
-                print("\n" + "=" * 60)
-                print("Here's what I found:")
-                print("=" * 60)
+                if not answer_started:
+                    print_answer_header()
+                    print(result['response'], end='')
                 print()
-                print(result['response'])
                 print()
                 
                 if result.get('wikipedia_sources') or result.get('news_sources') or result.get('linkedin_source') or result.get('web_sources'):
@@ -121,14 +153,13 @@ def chat_mode(agent: CompanyResearchAgent):
                 
                 print("=" * 60)
                 
-                conversation_context.append(result)
+                conversation_context.add(result)
                 
                 print("\n💡 Would you like me to create an account plan for this company? (yes/no)")
                 response = input("Your answer: ").strip().lower()
                 
                 if response in ['yes', 'y']:
                     print("\nGreat! Let me create a comprehensive account plan for you...")
-                    plan_generator = AccountPlanGenerator(agent.client)
                     plan = plan_generator.generate_plan(
                         company_name=result.get('company_name', 'Unknown'),
                         research_context=result.get('response', ''),
@@ -150,7 +181,7 @@ def chat_mode(agent: CompanyResearchAgent):
                         filename = f"{result.get('company_name', 'plan').replace(' ', '_')}_account_plan.md"
                         try:
                             with open(filename, 'w') as f:
-                                f.write(plan.to_markdown())
+                                plan.write_markdown(f)
                             print(f"✓ Saved to {filename}")
                         except Exception as e:
                             print(f"❌ Error saving: {e}")
@@ -166,12 +197,11 @@ def chat_mode(agent: CompanyResearchAgent):
             print(f"❌ An error occurred: {str(e)}\n")
 
 
-def voice_mode(agent: CompanyResearchAgent):
+def voice_mode(agent: CompanyResearchAgent, tts_engine: Optional[TTSEngine] = None, player: Optional[AudioPlayer] = None):
     try:
         import speech_recognition as sr 
         from gtts import gTTS
         import pygame
-        import io
     except ImportError:
         print("❌ Voice mode needs: pip install SpeechRecognition gtts pygame")
         print("Switching to chat mode...")
@@ -186,7 +216,7 @@ def voice_mode(agent: CompanyResearchAgent):
     
     recognizer = sr.Recognizer()
     microphone = sr.Microphone()
-    pygame.mixer.init()
+    speech = SpeechPipeline(tts_engine or GTTSEngine(), player or PygamePlayer())
     
     print("Setting up microphone...")
     with microphone as source:
@@ -208,25 +238,24 @@ def voice_mode(agent: CompanyResearchAgent):
                     break
                 
                 print("🔍 Let me find that information for you...")
-                result = agent.research_company(query, ask_user_callback=None, voice_mode=True)
+                stream = agent.stream_research_company(query, ask_user_callback=None, voice_mode=True)
                 
-                if result['success']:
-                    response_text = result['response']
-                    print("\nThis is what I found:")
-                    print(f"{response_text}\n")
-                    
-                    spoken_text = f"Here's what I found. {response_text}"
-                    tts = gTTS(text=spoken_text, lang='en', slow=False)
-                    audio_buffer = io.BytesIO()
-                    tts.write_to_fp(audio_buffer)
-                    audio_buffer.seek(0)
-                    
-                    pygame.mixer.music.load(audio_buffer)
-                    pygame.mixer.music.play()
-                    
-                    while pygame.mixer.music.get_busy():
-                        pygame.time.wait(100)
-                else:
+                def spoken_answer():
+                    answer_started = False
+                    for chunk in stream:
+                        if not answer_started:
+                            print("\nThis is what I found:")
+                            answer_started = True
+                            yield "Here's what I found. "
+                        print(chunk, end='', flush=True)
+                        yield chunk
+                    if answer_started:
+                        print("\n")
+                
+                speech.speak(spoken_answer())
+                result = stream.result
+                
+                if not result['success']:
                     print(f"Oops! {result.get('error')}")
                     print("Try asking about the company in a different way!")
                 
@@ -246,14 +275,61 @@ def voice_mode(agent: CompanyResearchAgent):
             print(f"Oops! Something went wrong: {str(e)}\n")
 
 
+def batch_mode(agent: CompanyResearchAgent, args):
+    if not args.input:
+        print("❌ Error: batch mode needs --input (a CSV or JSONL file of company names)")
+        sys.exit(1)
+    
+    try:
+        companies = read_companies(args.input)
+    except Exception as e:
+        print(f"❌ Error reading {args.input}: {str(e)}")
+        sys.exit(1)
+    
+    print(f"Researching {len(companies)} companies with concurrency {args.concurrency}...")
+    runner = BatchRunner(agent, args.output_dir, concurrency=args.concurrency,
+                         rate_per_minute=args.rate, generate_plans=args.plans, plan_format=args.plan_format)
+    summary = runner.run(companies)
+    print(f"\nDone: {summary['succeeded']} succeeded, {summary['failed']} failed, {summary['skipped']} skipped "
+          f"({summary['companies_per_minute']:.1f} companies/min). Results in {args.output_dir}")
+    for source, health in agent.health_stats().items():
+        if health['trips']:
+            print(f"⚠️  {source} was unhealthy: circuit opened {health['trips']} time(s), "
+                  f"{health['skipped']} requests skipped, now {health['state']}")
+
+
 def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="Company Research Agent")
-    parser.add_argument('--mode', choices=['chat', 'voice'], default='chat',
-                       help='Mode: chat (default) or voice')
+    parser.add_argument('--mode', choices=['chat', 'voice', 'batch', 'serve'], default='chat',
+                       help='Mode: chat (default), voice, batch or serve (HTTP API)')
     parser.add_argument('--api-key', type=str,
                        help='OpenAI API key (or set OPENAI_API_KEY env variable)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Disable the on-disk source response cache')
+    parser.add_argument('--conflict-mode', choices=['serial', 'attach', 'regenerate'],
+                       help='When no one is asked about conflicts (voice, batch): check them before answering (serial), '
+                            'alongside the answer and attach a note (attach), or alongside and re-answer only if found (regenerate)')
+    parser.add_argument('--input', type=str,
+                       help='Batch mode: CSV or JSONL file of company names')
+    parser.add_argument('--output-dir', type=str, default='batch_output',
+                       help='Batch mode: directory for results.jsonl, Markdown reports and the checkpoint')
+    parser.add_argument('--concurrency', type=int, default=4,
+                       help='Batch mode: companies researched at once (default 4)')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                       help='Serve mode: address to listen on (default 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000,
+                       help='Serve mode: port to listen on (default 8000)')
+    parser.add_argument('--max-concurrent', type=int,
+                       help='Serve mode: requests processed at once; more wait briefly or get 503 '
+                            '(default SERVER_MAX_CONCURRENT or 8)')
+    parser.add_argument('--rate', type=float,
+                       help='Batch mode: maximum companies started per minute')
+    parser.add_argument('--plans', action='store_true',
+                       help='Batch mode: also generate an account plan for each company')
+    parser.add_argument('--plan-format', choices=['markdown', 'json', 'html'], default='markdown',
+                       help='Batch mode: markdown (appended to each report, default), json or html (a separate <company>_plan file)')
     
     args = parser.parse_args()
     
@@ -267,12 +343,24 @@ def main():
         sys.exit(1)
     
     try:
-        agent = CompanyResearchAgent(openai_api_key=api_key)
+        transport = HttpTransport(pool_maxsize=max(20, args.concurrency, args.max_concurrent or 0))
+        # one speculative conflict check per in-flight request in batch and serve mode
+        background_workers = None
+        if args.mode == 'batch':
+            background_workers = args.concurrency
+        elif args.mode == 'serve':
+            background_workers = args.max_concurrent or int(os.getenv("SERVER_MAX_CONCURRENT", "8"))
+        agent = CompanyResearchAgent(openai_api_key=api_key, use_cache=not args.no_cache, transport=transport,
+                                     conflict_mode=args.conflict_mode, background_workers=background_workers)
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         sys.exit(1)
     
-    if args.mode == 'voice':
+    if args.mode == 'batch':
+        batch_mode(agent, args)
+    elif args.mode == 'serve':
+        serve(agent, args.host, args.port, max_concurrent=args.max_concurrent)
+    elif args.mode == 'voice':
         voice_mode(agent)
     else:
         chat_mode(agent)
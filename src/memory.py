@@ -0,0 +1,149 @@
+import re
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from .context_builder import TokenCounter, _STOPWORDS, _words
+
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+class Turn:
+    # What is kept of one research or follow-up result: the question, a capped copy of
+    # the answer and references to its sources, without the source payloads.
+
+    def __init__(self, query: str, company_name: str, response: str, sources: List[Dict[str, str]], conflicts: List[str]):
+        self.query = query
+        self.company_name = company_name
+        self.response = response
+        self.sources = sources
+        self.conflicts = conflicts
+        self.terms = frozenset(word for word in _words(f"{query} {response}") if word not in _STOPWORDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'query': self.query,
+            'company_name': self.company_name,
+            'response': self.response,
+            'sources': self.sources,
+            'conflicts': self.conflicts
+        }
+
+    def render(self) -> str:
+        lines = [f"Q: {self.query}", f"A: {self.response}"]
+        titles = [source['title'] for source in self.sources if source.get('title')]
+        if titles:
+            lines.append("Sources: " + "; ".join(titles))
+        return "\n".join(lines)
+
+
+def lead_sentence(text: str, max_chars: int = 200) -> str:
+    text = " ".join((text or "").split())
+    first = _SENTENCE_END_RE.split(text, 1)[0]
+    if len(first) > max_chars:
+        first = first[:max_chars].rsplit(" ", 1)[0] + "…"
+    return first
+
+
+def extractive_summary(summary: str, turn: Turn) -> str:
+    line = f"- {turn.company_name or 'General'}: \"{turn.query}\" -> {lead_sentence(turn.response)}"
+    return f"{summary}\n{line}" if summary else line
+
+
+class ConversationMemory:
+    # Bounded replacement for an ever-growing list of result dicts. Only the last
+    # max_turns compact turns are kept; a rolling summary, itself capped at
+    # summary_tokens, is updated after every turn so older turns are still represented
+    # once they fall out. context() hands back the summary plus the recent and
+    # query-relevant turns that fit a token budget.
+
+    def __init__(self, max_turns: int = 6, max_response_tokens: int = 2000, max_sources: int = 8, summary_tokens: int = 300, context_tokens: int = 1200, counter: Optional[TokenCounter] = None, summarizer: Optional[Callable[[str, Turn], str]] = None):
+        self.turns: deque = deque(maxlen=max_turns)
+        self.max_response_tokens = max_response_tokens
+        self.max_sources = max_sources
+        self.summary_tokens = summary_tokens
+        self.context_tokens = context_tokens
+        self.counter = counter or TokenCounter()
+        self.summarizer = summarizer or extractive_summary
+        self.summary = ""
+        self.total_turns = 0
+
+    @classmethod
+    def from_results(cls, results: List[Dict[str, Any]], **kwargs) -> 'ConversationMemory':
+        memory = cls(**kwargs)
+        for result in results[-memory.turns.maxlen:]:
+            memory.add(result)
+        return memory
+
+    def add(self, result: Dict[str, Any]) -> Turn:
+        sources = []
+        for source in (result.get('sources') or [])[:self.max_sources]:
+            sources.append({key: source[key] for key in ('title', 'url', 'source') if source.get(key)})
+        turn = Turn(
+            result.get('query', ''),
+            result.get('company_name', ''),
+            self.counter.truncate(result.get('response') or '', self.max_response_tokens),
+            sources,
+            list(result.get('conflicts') or [])
+        )
+        self.turns.append(turn)
+        self.total_turns += 1
+        self.summary = self._trim_summary(self.summarizer(self.summary, turn))
+        return turn
+
+    def _trim_summary(self, summary: str) -> str:
+        # the oldest lines go first
+        lines = summary.split("\n")
+        while len(lines) > 1 and self.counter.count("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        return self.counter.truncate("\n".join(lines), self.summary_tokens)
+
+    @property
+    def company_name(self) -> str:
+        return self.turns[-1].company_name if self.turns else ""
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self.turns[-1].to_dict() if self.turns else None
+
+    def context(self, query: str, max_tokens: Optional[int] = None) -> str:
+        budget = self.context_tokens if max_tokens is None else max_tokens
+        if not self.turns:
+            return ""
+
+        parts = []
+        if self.summary and len(self.turns) < self.total_turns:
+            # only worth sending once some turns exist solely in the summary
+            parts.append("Summary of the conversation so far:\n" + self.summary)
+        budget -= self.counter.count("\n\n".join(parts))
+
+        turns = list(self.turns)
+        latest = len(turns) - 1
+        query_terms = frozenset(word for word in _words(query) if word not in _STOPWORDS)
+        # the latest turn always, then earlier turns that share terms with the query
+        scored = [(float("inf"), latest)]
+        for i in range(latest):
+            overlap = len(query_terms & turns[i].terms) / len(query_terms) if query_terms else 0.0
+            if overlap > 0:
+                scored.append((overlap + i / len(turns) * 0.1, i))
+
+        # no single turn may take more than half, so a long latest answer still leaves
+        # room for an earlier turn the question refers back to
+        turn_cap = max(budget // 2, 50)
+        chosen = {}
+        for _, i in sorted(scored, reverse=True):
+            allowed = min(turn_cap, budget - 1)
+            if allowed < 50:
+                break
+            text = self.counter.truncate(turns[i].render(), allowed)
+            chosen[i] = text
+            budget -= self.counter.count(text) + 1
+
+        parts.extend(chosen[i] for i in sorted(chosen))
+        return "\n\n".join(parts)
+
+    def clear(self):
+        self.turns.clear()
+        self.summary = ""
+        self.total_turns = 0
+
+    def __len__(self) -> int:
+        return len(self.turns)
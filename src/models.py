@@ -0,0 +1,275 @@
+import json
+import threading
+import weakref
+from collections.abc import Mapping, MutableMapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from .dedup import canonicalize_url
+
+
+# dict key -> attribute, in the order the agents have always produced them
+SOURCE_FIELDS = (
+    ("title", "title"),
+    ("description", "description"),
+    ("summary", "summary"),
+    ("content", "content"),
+    ("url", "url"),
+    ("source", "source"),
+    ("publishedAt", "published_at")
+)
+_SOURCE_ATTRIBUTES = dict(SOURCE_FIELDS)
+
+
+class Source(Mapping):
+    # One search hit, news article or profile. Read-only and shared between results
+    # once interned, so it must not be modified; the Mapping interface keeps code
+    # written for the old plain dicts (source['title'], source.get('url')) working.
+
+    __slots__ = tuple(attribute for _, attribute in SOURCE_FIELDS) + ("__weakref__",)
+
+    def __init__(self, title: Optional[str] = None, description: Optional[str] = None, summary: Optional[str] = None, content: Optional[str] = None, url: Optional[str] = None, source: Optional[str] = None, published_at: Optional[str] = None):
+        self.title = title
+        self.description = description
+        self.summary = summary
+        self.content = content
+        self.url = url
+        self.source = source
+        self.published_at = published_at
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> 'Source':
+        if isinstance(data, Source):
+            return data
+        return cls(**{attribute: data.get(key) for key, attribute in SOURCE_FIELDS})
+
+    def __getitem__(self, key: str) -> Any:
+        attribute = _SOURCE_ATTRIBUTES.get(key)
+        value = getattr(self, attribute) if attribute else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, attribute in SOURCE_FIELDS if getattr(self, attribute) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, attribute) for key, attribute in SOURCE_FIELDS if getattr(self, attribute) is not None}
+
+    def __repr__(self) -> str:
+        return f"Source(title={self.title!r}, url={self.url!r})"
+
+
+class SourceRegistry:
+    # Interns sources by canonical URL: every result that mentions a page holds the
+    # same Source object, however the link was written. Entries are weak, so a page
+    # nobody references any more is dropped.
+
+    def __init__(self):
+        self._by_url: 'weakref.WeakValueDictionary[str, Source]' = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def intern(self, data: Mapping) -> Source:
+        source = Source.from_dict(data)
+        if not source.url:
+            return source
+        key = canonicalize_url(source.url)
+        with self._lock:
+            existing = self._by_url.get(key)
+            # the link may be spelled differently (www., a redirect); the rest must match
+            if existing is source or (existing is not None and all(getattr(existing, attribute) == getattr(source, attribute) for attribute in _SOURCE_ATTRIBUTES.values() if attribute != "url")):
+                return existing
+            # same page with new content (e.g. an updated article): newer results get it
+            self._by_url[key] = source
+            return source
+
+    def intern_all(self, items: Optional[Iterable[Mapping]]) -> List[Source]:
+        interned = []
+        seen = set()
+        for item in items or ():
+            source = self.intern(item)
+            if id(source) not in seen:
+                seen.add(id(source))
+                interned.append(source)
+        return interned
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_url)
+
+
+default_registry = SourceRegistry()
+
+
+class SourcesView(Sequence):
+    # All of a result's sources in one sequence without copying them into a new list;
+    # a source that appears in several groups is listed once.
+
+    __slots__ = ("_groups",)
+
+    def __init__(self, *groups: Optional[Iterable[Source]]):
+        self._groups = groups
+
+    def __iter__(self) -> Iterator[Source]:
+        seen = set()
+        for group in self._groups:
+            for source in group or ():
+                if id(source) not in seen:
+                    seen.add(id(source))
+                    yield source
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __getitem__(self, index):
+        return list(self)[index]
+
+    def __eq__(self, other) -> bool:
+        # equal to a list holding the same sources, as the old 'sources' list was
+        if isinstance(other, (SourcesView, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"SourcesView({list(self)!r})"
+
+
+# stored fields in the order the result dict has always listed its keys; "sources"
+# and "sources_count" are derived from the source groups unless a caller sets them
+RESULT_KEYS = (
+    "success", "error", "query", "company_name", "company_id", "wikipedia_sources", "news_sources",
+    "linkedin_source", "web_sources", "sources", "response", "sources_count", "conflicts",
+    "deeper_research", "context_tokens", "is_followup", "timings", "token_usage"
+)
+_DERIVED_KEYS = frozenset({"sources", "sources_count"})
+RESULT_FIELDS = tuple(key for key in RESULT_KEYS if key not in _DERIVED_KEYS)
+_SOURCE_GROUPS = ("wikipedia_sources", "news_sources", "web_sources")
+_UNSET = object()
+
+
+class ResearchResult(MutableMapping):
+    # Outcome of a research or follow-up call. Behaves like the dict it replaces
+    # (result['response'], result.get('sources'), dict(result), == against a dict);
+    # unknown keys set by callers, and values they assign to the derived keys, go into
+    # a small overflow dict. It is not a dict subclass: serialize it with to_json() or
+    # json.dumps(..., default=to_jsonable).
+
+    __slots__ = RESULT_FIELDS + ("other_sources", "_extra")
+
+    def __init__(self, **fields):
+        self.other_sources = None
+        self._extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @property
+    def sources(self) -> SourcesView:
+        deeper = getattr(self, "deeper_research", None)
+        linkedin = getattr(self, "linkedin_source", None)
+        return SourcesView(
+            getattr(self, "wikipedia_sources", None),
+            getattr(self, "news_sources", None),
+            getattr(self, "web_sources", None),
+            (linkedin,) if linkedin else None,
+            deeper.get("sources") if deeper else None,
+            self.other_sources
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _DERIVED_KEYS:
+            if self._extra and key in self._extra:
+                return self._extra[key]
+            return self.sources if key == "sources" else len(self["sources"])
+        if key in RESULT_FIELDS:
+            value = getattr(self, key, _UNSET)
+            if value is not _UNSET:
+                return value
+        elif self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        # a value set for a derived key overrides it until deleted again
+        if key in RESULT_FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in RESULT_FIELDS and getattr(self, key, _UNSET) is not _UNSET:
+            delattr(self, key)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in RESULT_KEYS:
+            if key in _DERIVED_KEYS or getattr(self, key, _UNSET) is not _UNSET:
+                yield key
+        if self._extra:
+            yield from (key for key in self._extra if key not in _DERIVED_KEYS)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: _plain(self[key]) for key in self}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    @classmethod
+    def from_dict(cls, data: Mapping, registry: Optional[SourceRegistry] = None) -> 'ResearchResult':
+        registry = registry or default_registry
+        result = cls()
+        for key, value in data.items():
+            if key in _DERIVED_KEYS:
+                continue
+            if key in _SOURCE_GROUPS:
+                value = registry.intern_all(value)
+            elif key == "linkedin_source" and value:
+                value = registry.intern(value)
+            elif key == "deeper_research" and value and value.get("sources"):
+                value = dict(value, sources=registry.intern_all(value["sources"]))
+            result[key] = value
+        if data.get("sources") and not any(result.get(key) for key in _SOURCE_GROUPS + ("linkedin_source",)):
+            # a result saved without its source groups
+            result.other_sources = registry.intern_all(data["sources"])
+        return result
+
+    @classmethod
+    def from_json(cls, text: str, registry: Optional[SourceRegistry] = None) -> 'ResearchResult':
+        return cls.from_dict(json.loads(text), registry)
+
+    def __repr__(self) -> str:
+        return f"ResearchResult(success={self.get('success')!r}, company_name={self.get('company_name')!r}, sources={len(self.sources)})"
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (Source, ResearchResult)):
+        return value.to_dict()
+    if isinstance(value, Mapping):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, SourcesView)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def to_jsonable(value: Any) -> Any:
+    # for json.dumps(..., default=to_jsonable) on structures holding results or sources
+    if isinstance(value, (Source, ResearchResult, SourcesView)):
+        return _plain(value)
+    return str(value)
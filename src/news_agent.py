@@ -1,12 +1,22 @@
-import requests
-from typing import List, Dict
+from typing import List, Dict, Optional, Any
 import os
+from .cache import ResponseCache
+from .health import SourceUnavailable
+from .transport import HttpTransport, AsyncHttpTransport
+
+
+NEWS_API_URL = "https://newsapi.org/v2/everything"
 
 
 class NewsAgent:
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None, transport: Optional[HttpTransport] = None, async_transport: Optional[AsyncHttpTransport] = None):
         self.api_key = os.getenv("NEWS_API_KEY")
+        self.cache = cache
+        self.transport = transport or HttpTransport()
+        self.async_transport = async_transport or AsyncHttpTransport()
+        # whether the last request was short-circuited by the open breaker
+        self._skipping = False
     
     def is_available(self) -> bool:
         return self.api_key is not None
@@ -15,34 +25,82 @@ class NewsAgent:
         if not self.is_available():
             return []
         
+        if self.cache is not None:
+            return self.cache.cached("news", company_name, lambda: self._fetch_company_news(company_name, max_results), max_results=max_results)
+        return self._fetch_company_news(company_name, max_results)
+    
+    async def asearch_company_news(self, company_name: str, max_results: int = 3) -> List[Dict[str, str]]:
+        if not self.is_available():
+            return []
+        
+        if self.cache is not None:
+            return await self.cache.acached("news", company_name, lambda: self._afetch_company_news(company_name, max_results), max_results=max_results)
+        return await self._afetch_company_news(company_name, max_results)
+    
+    def _fetch_company_news(self, company_name: str, max_results: int) -> List[Dict[str, str]]:
+        try:
+            response = self.transport.get("news", NEWS_API_URL, params=self._request_params(company_name, max_results))
+            response.raise_for_status()
+            self._note_reachable()
+            return self._remember_if_empty(company_name, max_results, self._parse_articles(response.json(), max_results))
+        except SourceUnavailable:
+            self._note_skipped()
+            return []
+        except Exception as e:
+            print(f"Error fetching news: {e}")
+            return []
+    
+    async def _afetch_company_news(self, company_name: str, max_results: int) -> List[Dict[str, str]]:
         try:
-            url = "https://newsapi.org/v2/everything"
-            params = {
-                "q": company_name,
-                "sortBy": "relevancy",
-                "pageSize": max_results,
-                "apiKey": self.api_key,
-                "language": "en"
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.async_transport.get("news", NEWS_API_URL, params=self._request_params(company_name, max_results))
             response.raise_for_status()
-            
-            data = response.json()
-            articles = []
-            
-            for article in data.get("articles", [])[:max_results]:
-                articles.append({
-                    "title": article.get("title", ""),
-                    "description": article.get("description", ""),
-                    "content": article.get("content", "")[:500] if article.get("content") else "",
-                    "url": article.get("url", ""),
-                    "source": article.get("source", {}).get("name", "Unknown"),
-                    "publishedAt": article.get("publishedAt", "")
-                })
-            
-            return articles
+            self._note_reachable()
+            return self._remember_if_empty(company_name, max_results, self._parse_articles(response.json(), max_results))
+        except SourceUnavailable:
+            self._note_skipped()
+            return []
         except Exception as e:
             print(f"Error fetching news: {e}")
             return []
+    
+    def _note_skipped(self):
+        # every query is short-circuited while the breaker is open; say so once
+        if not self._skipping:
+            self._skipping = True
+            print("News is skipped for now: NewsAPI keeps failing (circuit open)")
+    
+    def _note_reachable(self):
+        if self._skipping:
+            self._skipping = False
+            print("News is back: NewsAPI answered again")
+    
+    def _remember_if_empty(self, company_name: str, max_results: int, articles: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        # a successful search with no articles is a real answer, unlike a failed request
+        if not articles and self.cache is not None:
+            self.cache.remember_missing("news", company_name, max_results=max_results)
+        return articles
+    
+    def _request_params(self, company_name: str, max_results: int) -> Dict[str, Any]:
+        return {
+            "q": company_name,
+            "sortBy": "relevancy",
+            "pageSize": max_results,
+            "apiKey": self.api_key,
+            "language": "en"
+        }
+    
+    def _parse_articles(self, data: Dict[str, Any], max_results: int) -> List[Dict[str, str]]:
+        articles = []
+        
+        for article in data.get("articles", [])[:max_results]:
+            articles.append({
+                "title": article.get("title", ""),
+                "description": article.get("description", ""),
+                "content": article.get("content", "")[:500] if article.get("content") else "",
+                "url": article.get("url", ""),
+                "source": article.get("source", {}).get("name", "Unknown"),
+                "publishedAt": article.get("publishedAt", "")
+            })
+        
+        return articles
 
@@ -1,15 +1,69 @@
+import asyncio
+import contextvars
 import os
-from typing import Optional, Dict, List, Callable
-from openai import OpenAI
-from .wikipedia_agent import WikipediaAgent
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Optional, Dict, List, Callable, Any, Iterator, Tuple, Union
+from openai import OpenAI, AsyncOpenAI
+from .wikipedia_agent import create_wikipedia_agent
 from .news_agent import NewsAgent
 from .linkedin_agent import LinkedInAgent
 from .web_search_agent import WebSearchAgent
+from .cache import ResponseCache, create_default_cache
+from .llm_cache import CachingOpenAIClient, AsyncCachingOpenAIClient
+from .transport import HttpTransport, AsyncHttpTransport, running_loop
+from .context_builder import ContextBuilder
+from .memory import ConversationMemory
+from .models import ResearchResult, SourceRegistry, default_registry
+from .dedup import SourceDeduplicator
+from .conflict_filter import ConflictPrefilter
+from .company_index import CompanyIndex, CompanyRecord
+from .telemetry import Telemetry, activate, create_sinks, current_trace, record_usage, span
+
+
+CONFLICT_MODES = ("serial", "attach", "regenerate")
+
+
+class ResearchStream:
+    
+    def __init__(self, generate: Optional[Callable[[], Iterator[str]]], finalize: Optional[Callable[[str], Dict[str, Any]]], on_error: Optional[Callable[[Exception], Dict[str, Any]]], error_result: Optional[Dict[str, Any]] = None, on_abort: Optional[Callable[[], None]] = None):
+        self._generate = generate
+        self._finalize = finalize
+        self._on_error = on_error
+        self._on_abort = on_abort
+        self.result = error_result
+    
+    def __iter__(self) -> Iterator[str]:
+        if self._generate is None:
+            return
+        parts = []
+        generator = self._generate()
+        ended = False
+        try:
+            for chunk in generator:
+                parts.append(chunk)
+                yield chunk
+            ended = True
+        except Exception as e:
+            ended = True
+            self.result = self._on_error(e)
+            return
+        finally:
+            # also reached when the consumer stops early (a client disconnecting mid-SSE)
+            generator.close()
+            if not ended and self._on_abort is not None:
+                self._on_abort()
+        self.result = self._finalize("".join(parts))
+    
+    def collect(self) -> Dict[str, Any]:
+        for _ in self:
+            pass
+        return self.result
 
 
 class CompanyResearchAgent:
     
-    def __init__(self, openai_api_key: Optional[str] = None):
+    def __init__(self, openai_api_key: Optional[str] = None, research_timeout: float = 15.0, wikipedia_backend: Optional[str] = None, cache: Optional[ResponseCache] = None, use_cache: bool = True, llm_cache: Optional[ResponseCache] = None, llm_cache_mode: Optional[str] = None, transport: Optional[HttpTransport] = None, async_transport: Optional[AsyncHttpTransport] = None, conflict_mode: Optional[str] = None, context_builder: Optional[ContextBuilder] = None, conflict_prefilter: Optional[ConflictPrefilter] = None, company_index: Optional[CompanyIndex] = None, telemetry: Optional[Telemetry] = None, source_registry: Optional[SourceRegistry] = None, deduplicator: Optional[SourceDeduplicator] = None, background_workers: Optional[int] = None):
         if openai_api_key:
             self.api_key = openai_api_key
         else:
@@ -18,56 +72,138 @@ class CompanyResearchAgent:
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set it in .env file, environment variable, or pass as argument.")
         
+        if cache is None and use_cache:
+            cache = create_default_cache()
+        self.cache = cache
+        
         self.client = OpenAI(api_key=self.api_key)
-        self.wikipedia_agent = WikipediaAgent()
-        self.news_agent = NewsAgent()
-        self.linkedin_agent = LinkedInAgent()
-        self.web_search_agent = WebSearchAgent()
+        llm_cache_mode = llm_cache_mode or os.getenv("LLM_CACHE_MODE", "all")
+        llm_cache = llm_cache or self.cache
+        if llm_cache is None or llm_cache_mode == "off":
+            llm_cache = None
+        self.llm_cache = llm_cache
+        self.llm_cache_mode = llm_cache_mode
+        if llm_cache is not None:
+            self.client = CachingOpenAIClient(self.client, llm_cache, mode=llm_cache_mode)
+        self._async_client = None
+        self._async_client_loop = None
+        self.transport = transport or HttpTransport()
+        # one set of circuit breakers for the sync and async paths
+        self.health = self.transport.health
+        self.async_transport = async_transport or AsyncHttpTransport(health=self.health)
+        self.wikipedia_agent = create_wikipedia_agent(wikipedia_backend or os.getenv("WIKIPEDIA_BACKEND", "page"), cache=self.cache, transport=self.transport, async_transport=self.async_transport, health=self.health)
+        self.news_agent = NewsAgent(cache=self.cache, transport=self.transport, async_transport=self.async_transport)
+        self.linkedin_agent = LinkedInAgent(cache=self.cache, transport=self.transport, async_transport=self.async_transport)
+        self.web_search_agent = WebSearchAgent(cache=self.cache, transport=self.transport, async_transport=self.async_transport)
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.context_builder = context_builder or ContextBuilder(model=self.model)
+        self.research_timeout = research_timeout
+        self.conflict_mode = conflict_mode or os.getenv("CONFLICT_MODE", "serial")
+        if self.conflict_mode not in CONFLICT_MODES:
+            raise ValueError(f"Unknown conflict mode '{self.conflict_mode}'. Choose from: {', '.join(CONFLICT_MODES)}")
+        if conflict_prefilter is None and os.getenv("CONFLICT_PREFILTER_THRESHOLD", "").lower() != "off":
+            conflict_prefilter = ConflictPrefilter()
+        self.conflict_prefilter = conflict_prefilter
+        self.company_index = company_index or CompanyIndex.load()
+        self.source_registry = source_registry or default_registry
+        self.deduplicator = deduplicator or SourceDeduplicator()
+        self.telemetry = telemetry or Telemetry(create_sinks(os.getenv("TELEMETRY_SINKS", ""), os.getenv("TELEMETRY_LOG_PATH")))
+        # speculative conflict checks run here, one per in-flight research call, so size it
+        # to the server or batch concurrency
+        self.background_workers = background_workers or int(os.getenv("BACKGROUND_WORKERS", "4"))
+        self._background = None
+        self._background_lock = threading.Lock()
+    
+    def _submit_background(self, fn: Callable, *args) -> Future:
+        with self._background_lock:
+            if self._background is None:
+                self._background = ThreadPoolExecutor(max_workers=self.background_workers, thread_name_prefix="conflicts")
+            return self._background.submit(contextvars.copy_context().run, fn, *args)
+    
+    def close(self):
+        # the pool is created again if the agent is used after closing
+        with self._background_lock:
+            background, self._background = self._background, None
+        if background is not None:
+            background.shutdown(wait=False, cancel_futures=True)
+    
+    @property
+    def async_client(self):
+        # AsyncOpenAI pools connections on the loop that first used it, so every
+        # asyncio.run() gets its own client (and one closed by aclose() is replaced)
+        loop = running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            client = AsyncOpenAI(api_key=self.api_key)
+            if self.llm_cache is not None:
+                client = AsyncCachingOpenAIClient(client, self.llm_cache, mode=self.llm_cache_mode)
+            self._async_client = client
+            self._async_client_loop = loop
+        return self._async_client
+    
+    async def aclose(self):
+        self.close()
+        await self.async_transport.aclose()
+        client, self._async_client = self._async_client, None
+        # one left on an earlier, finished loop can't be closed from this one
+        if client is not None and self._async_client_loop is running_loop():
+            await client.close()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        if self.cache is None:
+            return {}
+        return self.cache.stats()
+    
+    def health_stats(self) -> Dict[str, Dict[str, Any]]:
+        return self.health.snapshot()
+    
+    def prometheus_metrics(self) -> str:
+        sink = self.telemetry.prometheus()
+        if sink is None:
+            return ""
+        return sink.render(self.health_stats())
     
     def format_sources_context(self, wikipedia_sources: List[Dict[str, str]], news_sources: List[Dict[str, str]] = None, linkedin_source: Dict[str, str] = None, web_sources: List[Dict[str, str]] = None) -> str:
-        context_parts = []
+        return self.context_builder.render(wikipedia_sources, news_sources, linkedin_source, web_sources).text
+    
+    def detect_conflicts(self, wikipedia_sources: List[Dict[str, str]], news_sources: List[Dict[str, str]] = None, linkedin_source: Dict[str, str] = None) -> List[str]:
+        conflicts, messages = self._conflict_check(wikipedia_sources, news_sources, linkedin_source)
         
-        if wikipedia_sources:
-            context_parts.append("=== WIKIPEDIA SOURCES ===")
-            for i, source in enumerate(wikipedia_sources, 1):
-                title = source.get('title', 'Unknown')
-                summary = source.get('summary', 'No summary available')
-                url = source.get('url', 'N/A')
-                context_parts.append(f"Wikipedia Source {i}: {title}")
-                context_parts.append(f"Summary: {summary}")
-                context_parts.append(f"URL: {url}")
-                context_parts.append("")
+        if messages:
+            try:
+                with span("llm.conflict_check"):
+                    conflict_check = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.3,
+                        max_tokens=150
+                    )
+                record_usage(conflict_check)
+                conflicts.extend(self._parse_conflict_reply(conflict_check.choices[0].message.content))
+            except:
+                pass
         
-        if news_sources:
-            context_parts.append("=== NEWS SOURCES ===")
-            for i, article in enumerate(news_sources, 1):
-                context_parts.append(f"News Article {i}: {article.get('title', 'Unknown')}")
-                context_parts.append(f"Source: {article.get('source', 'Unknown')}")
-                context_parts.append(f"Description: {article.get('description', 'No description')}")
-                if article.get('content'):
-                    context_parts.append(f"Content: {article.get('content', '')}")
-                context_parts.append(f"URL: {article.get('url', 'N/A')}")
-                context_parts.append("")
-        
-        if linkedin_source:
-            context_parts.append("=== LINKEDIN SOURCE ===")
-            context_parts.append(f"Company: {linkedin_source.get('title', 'Unknown')}")
-            context_parts.append(f"Description: {linkedin_source.get('description', 'No description')}")
-            context_parts.append(f"URL: {linkedin_source.get('url', 'N/A')}")
-            context_parts.append("")
-        
-        if web_sources:
-            context_parts.append("=== WEB SEARCH RESULTS ===")
-            for i, result in enumerate(web_sources, 1):
-                context_parts.append(f"Web Result {i}: {result.get('title', 'Unknown')}")
-                context_parts.append(f"Description: {result.get('description', 'No description')}")
-                context_parts.append(f"URL: {result.get('url', 'N/A')}")
-                context_parts.append("")
-        
-        return "\n".join(context_parts)
+        return conflicts
     
-    def detect_conflicts(self, wikipedia_sources: List[Dict[str, str]], news_sources: List[Dict[str, str]] = None, linkedin_source: Dict[str, str] = None) -> List[str]:
+    async def adetect_conflicts(self, wikipedia_sources: List[Dict[str, str]], news_sources: List[Dict[str, str]] = None, linkedin_source: Dict[str, str] = None) -> List[str]:
+        conflicts, messages = self._conflict_check(wikipedia_sources, news_sources, linkedin_source)
+        
+        if messages:
+            try:
+                with span("llm.conflict_check"):
+                    conflict_check = await self.async_client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.3,
+                        max_tokens=150
+                    )
+                record_usage(conflict_check)
+                conflicts.extend(self._parse_conflict_reply(conflict_check.choices[0].message.content))
+            except:
+                pass
+        
+        return conflicts
+    
+    def _conflict_check(self, wikipedia_sources: List[Dict[str, str]], news_sources: List[Dict[str, str]] = None, linkedin_source: Dict[str, str] = None) -> Tuple[List[str], Optional[List[Dict[str, str]]]]:
         conflicts = []
         
         if len(wikipedia_sources) > 1:
@@ -83,47 +219,47 @@ class CompanyResearchAgent:
         if linkedin_source and linkedin_source.get('description'):
             all_texts.append(('LinkedIn', linkedin_source.get('description', '')[:200]))
         
-        if len(all_texts) >= 2:
-            try:
-                sources_text = '\n'.join([f"{name}: {text}" for name, text in all_texts if text])
-                conflict_check = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "Check if sources conflict. Reply 'CONFLICT: [what conflicts]' or 'NO_CONFLICT'."},
-                        {"role": "user", "content": f"{sources_text}\n\nAny conflicts?"}
-                    ],
-                    temperature=0.3,
-                    max_tokens=150
-                )
-                result = conflict_check.choices[0].message.content
-                if "CONFLICT:" in result:
-                    conflict_desc = result.replace("CONFLICT:", "").strip()
-                    conflicts.append(conflict_desc)
-            except:
-                pass
-        
-        return conflicts
+        if len(all_texts) < 2:
+            return conflicts, None
+        
+        # most source sets agree; only ask the LLM when the local screen sees a likely disagreement
+        if self.conflict_prefilter is not None:
+            with span("conflict.prefilter") as prefilter_span:
+                escalate = self.conflict_prefilter.should_escalate(dict(all_texts))
+                if prefilter_span is not None:
+                    prefilter_span.attributes['escalated'] = escalate
+            if not escalate:
+                return conflicts, None
+        
+        sources_text = '\n'.join([f"{name}: {text}" for name, text in all_texts if text])
+        return conflicts, [
+            {"role": "system", "content": "Check if sources conflict. Reply 'CONFLICT: [what conflicts]' or 'NO_CONFLICT'."},
+            {"role": "user", "content": f"{sources_text}\n\nAny conflicts?"}
+        ]
+    
+    def _parse_conflict_reply(self, reply: str) -> List[str]:
+        if "CONFLICT:" in reply:
+            return [reply.replace("CONFLICT:", "").strip()]
+        return []
     
     def dig_deeper(self, company_name: str, conflict_topic: str) -> Dict[str, str]:
         print(f"\n🔍 Digging deeper into: {conflict_topic}")
         
-        additional_wiki = self.wikipedia_agent.get_multiple_sources(f"{company_name} {conflict_topic}", limit=2)
-        additional_news = []
-        if self.news_agent.is_available():
-            additional_news = self.news_agent.search_company_news(f"{company_name} {conflict_topic}", max_results=2)
-        
-        context = self.format_sources_context(additional_wiki, additional_news)
+        with span("dig_deeper.sources"):
+            additional_wiki = self.wikipedia_agent.get_multiple_sources(f"{company_name} {conflict_topic}", limit=2)
+            additional_news = []
+            if self.news_agent.is_available():
+                additional_news = self.news_agent.search_company_news(f"{company_name} {conflict_topic}", max_results=2)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You're a friendly research assistant helping clarify conflicting information. Be helpful, clear, and reassuring. Explain the situation in a friendly, easy-to-understand way."},
-                    {"role": "user", "content": f"Company: {company_name}\nThere's some conflicting information about: {conflict_topic}\n\nI found additional research:\n{context}\n\nPlease help clarify this in a friendly, helpful way."}
-                ],
-                temperature=0.7,
-                max_tokens=800
-            )
+            with span("llm.dig_deeper"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._dig_deeper_messages(company_name, conflict_topic, additional_wiki, additional_news),
+                    temperature=0.7,
+                    max_tokens=800
+                )
+            record_usage(response)
             
             return {
                 'success': True,
@@ -136,60 +272,409 @@ class CompanyResearchAgent:
                 'error': str(e)
             }
     
-    def research_company(self, query: str, use_multiple_sources: bool = True, ask_user_callback=None, voice_mode: bool = False) -> Dict[str, any]:
-        company_name = self._extract_company_name(query)
-        
-        if use_multiple_sources:
-            wikipedia_sources = self.wikipedia_agent.get_multiple_sources(company_name, limit=3)
-        else:
-            results = self.wikipedia_agent.get_multiple_sources(company_name, limit=1)
-            wikipedia_sources = results if results else []
+    async def adig_deeper(self, company_name: str, conflict_topic: str) -> Dict[str, str]:
+        print(f"\n🔍 Digging deeper into: {conflict_topic}")
         
-        news_sources = []
-        if self.news_agent.is_available():
-            news_sources = self.news_agent.search_company_news(company_name, max_results=3)
+        topic_query = f"{company_name} {conflict_topic}"
+        with span("dig_deeper.sources"):
+            if self.news_agent.is_available():
+                additional_wiki, additional_news = await asyncio.gather(
+                    self.wikipedia_agent.aget_multiple_sources(topic_query, limit=2),
+                    self.news_agent.asearch_company_news(topic_query, max_results=2)
+                )
+            else:
+                additional_wiki = await self.wikipedia_agent.aget_multiple_sources(topic_query, limit=2)
+                additional_news = []
         
-        linkedin_source = None
         try:
-            linkedin_info = self.linkedin_agent.get_company_info(company_name)
-            if linkedin_info.get('description'):
-                linkedin_source = linkedin_info
-        except:
-            pass
-        
-        web_sources = self.web_search_agent.search_company(company_name, max_results=5)
-        
-        if not wikipedia_sources and not news_sources and not linkedin_source and not web_sources:
+            with span("llm.dig_deeper"):
+                response = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=self._dig_deeper_messages(company_name, conflict_topic, additional_wiki, additional_news),
+                    temperature=0.7,
+                    max_tokens=800
+                )
+            record_usage(response)
+            
+            return {
+                'success': True,
+                'clarification': response.choices[0].message.content,
+                'sources': additional_wiki + additional_news
+            }
+        except Exception as e:
             return {
                 'success': False,
-                'error': f"Could not find information about '{company_name}' from any source.",
-                'response': None,
-                'sources': []
+                'error': str(e)
             }
+    
+    def _dig_deeper_messages(self, company_name: str, conflict_topic: str, additional_wiki: List[Dict[str, str]], additional_news: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        context = self.format_sources_context(additional_wiki, additional_news)
+        return [
+            {"role": "system", "content": "You're a friendly research assistant helping clarify conflicting information. Be helpful, clear, and reassuring. Explain the situation in a friendly, easy-to-understand way."},
+            {"role": "user", "content": f"Company: {company_name}\nThere's some conflicting information about: {conflict_topic}\n\nI found additional research:\n{context}\n\nPlease help clarify this in a friendly, helpful way."}
+        ]
+    
+    def _gather_sources(self, company_name: str, use_multiple_sources: bool = True, linkedin_slug: Optional[str] = None) -> Dict[str, Any]:
+        wikipedia_limit = 3 if use_multiple_sources else 1
+        tasks = {
+            'wikipedia': lambda: self.wikipedia_agent.get_multiple_sources(company_name, limit=wikipedia_limit),
+            'news': lambda: self.news_agent.search_company_news(company_name, max_results=3) if self.news_agent.is_available() else [],
+            'linkedin': lambda: self._fetch_linkedin_source(company_name, linkedin_slug),
+            'web': lambda: self.web_search_agent.search_company(company_name, max_results=5)
+        }
+        
+        with span("sources") as sources_span:
+            executor = ThreadPoolExecutor(max_workers=len(tasks))
+            # each worker gets a copy of the caller's context so its span lands in this query's trace
+            futures = {name: executor.submit(contextvars.copy_context().run, self._timed_source, name, task) for name, task in tasks.items()}
+            wait(futures.values(), timeout=self.research_timeout)
+            executor.shutdown(wait=False, cancel_futures=True)
+            
+            gathered = {}
+            for name, future in futures.items():
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    gathered[name] = future.result()
+                else:
+                    gathered[name] = None
+            self._note_timed_out(sources_span, futures)
+        return self._dedupe_sources(self._fill_missing_sources(gathered))
+    
+    async def _agather_sources(self, company_name: str, use_multiple_sources: bool = True, linkedin_slug: Optional[str] = None) -> Dict[str, Any]:
+        wikipedia_limit = 3 if use_multiple_sources else 1
+        with span("sources") as sources_span:
+            tasks = {
+                'wikipedia': asyncio.ensure_future(self._atimed_source('wikipedia', self.wikipedia_agent.aget_multiple_sources(company_name, limit=wikipedia_limit))),
+                'linkedin': asyncio.ensure_future(self._atimed_source('linkedin', self._afetch_linkedin_source(company_name, linkedin_slug))),
+                'web': asyncio.ensure_future(self._atimed_source('web', self.web_search_agent.asearch_company(company_name, max_results=5)))
+            }
+            if self.news_agent.is_available():
+                tasks['news'] = asyncio.ensure_future(self._atimed_source('news', self.news_agent.asearch_company_news(company_name, max_results=3)))
+            
+            await asyncio.wait(tasks.values(), timeout=self.research_timeout)
+            self._note_timed_out(sources_span, tasks)
+            
+            gathered = {}
+            for name, task in tasks.items():
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    gathered[name] = task.result()
+                else:
+                    task.cancel()
+                    gathered[name] = None
+        return self._dedupe_sources(self._fill_missing_sources(gathered))
+    
+    def _timed_source(self, name: str, task: Callable[[], Any]) -> Any:
+        with span(f"source.{name}"):
+            return task()
+    
+    async def _atimed_source(self, name: str, coroutine) -> Any:
+        with span(f"source.{name}"):
+            return await coroutine
+    
+    def _note_timed_out(self, sources_span, pending: Dict[str, Any]):
+        if sources_span is not None:
+            sources_span.attributes['timed_out'] = ",".join(name for name, future in pending.items() if not future.done())
+    
+    def _fill_missing_sources(self, gathered: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'wikipedia': gathered.get('wikipedia') or [],
+            'news': gathered.get('news') or [],
+            'linkedin': gathered.get('linkedin'),
+            'web': gathered.get('web') or []
+        }
+    
+    def _dedupe_sources(self, sources: Dict[str, Any]) -> Dict[str, Any]:
+        # in priority order: a page that several agents found is kept from the first
+        with span("sources.dedupe") as dedupe_span:
+            sources, merged = self.deduplicator.dedupe(sources)
+            if dedupe_span is not None:
+                dedupe_span.attributes['merged'] = merged
+        return sources
+    
+    def _fetch_linkedin_source(self, company_name: str, slug: Optional[str] = None) -> Optional[Dict[str, str]]:
+        linkedin_info = self.linkedin_agent.get_company_info(company_name, slug)
+        if linkedin_info.get('description'):
+            return linkedin_info
+        return None
+    
+    async def _afetch_linkedin_source(self, company_name: str, slug: Optional[str] = None) -> Optional[Dict[str, str]]:
+        linkedin_info = await self.linkedin_agent.aget_company_info(company_name, slug)
+        if linkedin_info.get('description'):
+            return linkedin_info
+        return None
+    
+    def research_company(self, query: str, use_multiple_sources: bool = True, ask_user_callback=None, voice_mode: bool = False) -> Dict[str, any]:
+        return self._traced("research_company", query, lambda: self._research_company(query, use_multiple_sources, ask_user_callback, voice_mode))
+    
+    async def aresearch_company(self, query: str, use_multiple_sources: bool = True, ask_user_callback=None, voice_mode: bool = False) -> Dict[str, any]:
+        return await self._atraced("research_company", query, lambda: self._aresearch_company(query, use_multiple_sources, ask_user_callback, voice_mode))
+    
+    def stream_research_company(self, query: str, use_multiple_sources: bool = True, ask_user_callback=None, voice_mode: bool = False) -> 'ResearchStream':
+        return self._traced_stream("research_company", query, lambda: self._stream_research_company(query, use_multiple_sources, ask_user_callback, voice_mode))
+    
+    def _research_company(self, query: str, use_multiple_sources: bool, ask_user_callback, voice_mode: bool) -> Dict[str, any]:
+        speculative = self._speculative_conflicts(ask_user_callback)
+        prepared, error_result = self._prepare_research(query, use_multiple_sources, ask_user_callback, voice_mode, speculative)
+        if error_result:
+            return error_result
+        
+        try:
+            answer = self._complete_answer(prepared['messages'])
+            if speculative:
+                answer = self._resolve_speculative_conflicts(prepared, answer, prepared['pending_conflicts'].result())
+            return self._research_result(prepared, answer)
+        except Exception as e:
+            return self._research_error(e)
+        finally:
+            self._abandon_conflicts(prepared)
+    
+    async def _aresearch_company(self, query: str, use_multiple_sources: bool, ask_user_callback, voice_mode: bool) -> Dict[str, any]:
+        company_name, search_name, company = self._resolve_company(query)
+        gathered = await self._agather_sources(search_name, use_multiple_sources, company.linkedin if company else None)
+        error_result = self._no_sources_error(company_name, gathered)
+        if error_result:
+            return error_result
+        
+        if self._speculative_conflicts(ask_user_callback):
+            prepared = self._build_research_prompt(query, company_name, gathered, [], None, voice_mode)
+            try:
+                conflicts, answer = await asyncio.gather(
+                    self.adetect_conflicts(gathered['wikipedia'], gathered['news'], gathered['linkedin']),
+                    self._acomplete_answer(prepared['messages'])
+                )
+                if conflicts and self.conflict_mode == "regenerate":
+                    prepared = self._build_research_prompt(query, company_name, gathered, conflicts, None, voice_mode)
+                    answer = await self._acomplete_answer(prepared['messages'])
+                elif conflicts:
+                    answer = self._attach_conflicts(prepared, answer, conflicts)
+                return self._research_result(prepared, answer)
+            except Exception as e:
+                return self._research_error(e)
+        
+        conflicts = await self.adetect_conflicts(gathered['wikipedia'], gathered['news'], gathered['linkedin'])
+        deeper_research = None
+        conflict_topic = self._choose_conflict(conflicts, ask_user_callback)
+        if conflict_topic:
+            deeper_research = await self.adig_deeper(search_name, conflict_topic)
+        prepared = self._build_research_prompt(query, company_name, gathered, conflicts, deeper_research, voice_mode)
         
-        conflicts = self.detect_conflicts(wikipedia_sources, news_sources, linkedin_source)
+        try:
+            return self._research_result(prepared, await self._acomplete_answer(prepared['messages']))
+        except Exception as e:
+            return self._research_error(e)
+    
+    def _stream_research_company(self, query: str, use_multiple_sources: bool, ask_user_callback, voice_mode: bool) -> 'ResearchStream':
+        speculative = self._speculative_conflicts(ask_user_callback)
+        prepared, error_result = self._prepare_research(query, use_multiple_sources, ask_user_callback, voice_mode, speculative)
+        if error_result:
+            return ResearchStream(None, None, None, error_result=error_result)
         
+        def generate():
+            try:
+                yield from self._stream_completion(prepared['messages'], temperature=0.7, max_tokens=2000)
+                if speculative:
+                    # the answer is already on screen, so conflicts can only be attached, never regenerated
+                    conflicts = prepared['pending_conflicts'].result()
+                    if conflicts:
+                        yield self._attach_conflicts(prepared, "", conflicts)
+            finally:
+                # a failed answer or a consumer that stopped reading
+                self._abandon_conflicts(prepared)
+        
+        return ResearchStream(
+            generate,
+            lambda answer: self._research_result(prepared, answer),
+            self._research_error
+        )
+    
+    def _traced(self, operation: str, query: str, run: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        # nested calls (a follow-up with no history falls back to research) join the outer trace
+        if current_trace() is not None:
+            return run()
+        with self.telemetry.trace(operation, query=query) as trace:
+            result = run()
+            trace.attributes['success'] = bool(result.get('success'))
+        return self._with_timings(result, trace)
+    
+    async def _atraced(self, operation: str, query: str, run: Callable[[], Any]) -> Dict[str, Any]:
+        if current_trace() is not None:
+            return await run()
+        with self.telemetry.trace(operation, query=query) as trace:
+            result = await run()
+            trace.attributes['success'] = bool(result.get('success'))
+        return self._with_timings(result, trace)
+    
+    def _traced_stream(self, operation: str, query: str, build: Callable[[], 'ResearchStream']) -> 'ResearchStream':
+        if current_trace() is not None:
+            return build()
+        trace = self.telemetry.start_trace(operation, query=query)
+        with activate(trace):
+            stream = build()
+        if stream._generate is None:
+            stream.result = self._finish_trace(trace, stream.result)
+            return stream
+        
+        def generate():
+            with activate(trace):
+                yield from stream._generate()
+        
+        return ResearchStream(
+            generate,
+            lambda answer: self._finish_trace(trace, stream._finalize(answer)),
+            lambda e: self._finish_trace(trace, stream._on_error(e)),
+            on_abort=lambda: self._abort_trace(trace)
+        )
+    
+    def _finish_trace(self, trace, result: Dict[str, Any]) -> Dict[str, Any]:
+        trace.attributes['success'] = bool(result.get('success'))
+        self.telemetry.finish(trace)
+        return self._with_timings(result, trace)
+    
+    def _abort_trace(self, trace):
+        # the stream was abandoned before it finished; export what was measured
+        trace.attributes['success'] = False
+        trace.attributes['aborted'] = True
+        self.telemetry.finish(trace)
+    
+    def _with_timings(self, result: Dict[str, Any], trace) -> Dict[str, Any]:
+        result['timings'] = trace.timings()
+        result['token_usage'] = dict(trace.usage)
+        return result
+    
+    def _speculative_conflicts(self, ask_user_callback) -> bool:
+        # with a callback the user may ask to dig deeper, which has to happen before answering
+        return self.conflict_mode != "serial" and ask_user_callback is None
+    
+    def _resolve_speculative_conflicts(self, prepared: Dict[str, Any], answer: str, conflicts: List[str]) -> str:
+        if not conflicts:
+            return answer
+        if self.conflict_mode == "regenerate":
+            prepared.update(self._build_research_prompt(prepared['query'], prepared['company_name'], prepared['gathered'], conflicts, None, prepared['voice_mode']))
+            return self._complete_answer(prepared['messages'])
+        return self._attach_conflicts(prepared, answer, conflicts)
+    
+    def _abandon_conflicts(self, prepared: Dict[str, Any]):
+        # a check nobody will wait for any more: drop it if it hasn't started, and retrieve
+        # its outcome when it finishes so errors don't go unobserved
+        future = prepared.pop('pending_conflicts', None)
+        if future is not None and not future.cancel():
+            future.add_done_callback(lambda done: done.cancelled() or done.exception())
+    
+    def _attach_conflicts(self, prepared: Dict[str, Any], answer: str, conflicts: List[str]) -> str:
+        prepared['conflicts'] = conflicts
+        return f"{answer}\n\nJust a heads-up: my sources don't completely agree here. {'; '.join(conflicts)}"
+    
+    def _complete_answer(self, messages: List[Dict[str, str]]) -> str:
+        with span("llm.generation"):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=2000
+            )
+        record_usage(response)
+        return response.choices[0].message.content
+    
+    async def _acomplete_answer(self, messages: List[Dict[str, str]]) -> str:
+        with span("llm.generation"):
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=2000
+            )
+        record_usage(response)
+        return response.choices[0].message.content
+    
+    def _stream_completion(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int, stage: str = "llm.generation") -> Iterator[str]:
+        with span(stage, stream=True) as stage_span:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                # the final chunk then carries the token usage for the whole answer
+                stream_options={"include_usage": True}
+            )
+            try:
+                for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if stage_span is not None and 'first_token_ms' not in stage_span.attributes:
+                            stage_span.attributes['first_token_ms'] = round((current_trace().elapsed() - stage_span.start) * 1000, 2)
+                        yield chunk.choices[0].delta.content
+                    if getattr(chunk, 'usage', None):
+                        record_usage(chunk)
+            finally:
+                # releases the HTTP connection when the consumer stops reading early
+                response.close()
+    
+    def _prepare_research(self, query: str, use_multiple_sources: bool, ask_user_callback, voice_mode: bool, speculative: bool = False) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        company_name, search_name, company = self._resolve_company(query)
+        gathered = self._gather_sources(search_name, use_multiple_sources, company.linkedin if company else None)
+        error_result = self._no_sources_error(company_name, gathered)
+        if error_result:
+            return None, error_result
+        
+        if speculative:
+            prepared = self._build_research_prompt(query, company_name, gathered, [], None, voice_mode)
+            prepared['pending_conflicts'] = self._submit_background(self.detect_conflicts, gathered['wikipedia'], gathered['news'], gathered['linkedin'])
+            return prepared, None
+        
+        conflicts = self.detect_conflicts(gathered['wikipedia'], gathered['news'], gathered['linkedin'])
         deeper_research = None
-        if conflicts and ask_user_callback:
-            print("\nHmm, I noticed some conflicting information while researching:")
-            for i, conflict in enumerate(conflicts, 1):
-                print(f"   {i}. {conflict}")
-            print("\nWould you like me to dig a bit deeper to clarify this? (yes/no)")
-            response = ask_user_callback("Your answer: ").strip().lower()
-            if response in ['yes', 'y']:
-                if len(conflicts) == 1:
-                    deeper_research = self.dig_deeper(company_name, conflicts[0])
-                else:
-                    print("\nWhich one would you like me to look into? (enter the number)")
-                    choice = ask_user_callback("Your choice: ").strip()
-                    try:
-                        idx = int(choice) - 1
-                        if 0 <= idx < len(conflicts):
-                            deeper_research = self.dig_deeper(company_name, conflicts[idx])
-                    except:
-                        deeper_research = self.dig_deeper(company_name, conflicts[0])
+        conflict_topic = self._choose_conflict(conflicts, ask_user_callback)
+        if conflict_topic:
+            deeper_research = self.dig_deeper(search_name, conflict_topic)
+        return self._build_research_prompt(query, company_name, gathered, conflicts, deeper_research, voice_mode), None
+    
+    def _no_sources_error(self, company_name: str, gathered: Dict[str, Any]) -> Optional[ResearchResult]:
+        if gathered['wikipedia'] or gathered['news'] or gathered['linkedin'] or gathered['web']:
+            return None
+        return ResearchResult(
+            success=False,
+            error=f"Could not find information about '{company_name}' from any source.",
+            response=None
+        )
+    
+    def _choose_conflict(self, conflicts: List[str], ask_user_callback) -> Optional[str]:
+        if not conflicts or not ask_user_callback:
+            return None
         
-        context = self.format_sources_context(wikipedia_sources, news_sources, linkedin_source, web_sources)
+        # time spent waiting on the user shows up as its own stage, not as research latency
+        with span("user.conflict_prompt"):
+            return self._ask_about_conflicts(conflicts, ask_user_callback)
+    
+    def _ask_about_conflicts(self, conflicts: List[str], ask_user_callback) -> Optional[str]:
+        print("\nHmm, I noticed some conflicting information while researching:")
+        for i, conflict in enumerate(conflicts, 1):
+            print(f"   {i}. {conflict}")
+        print("\nWould you like me to dig a bit deeper to clarify this? (yes/no)")
+        response = ask_user_callback("Your answer: ").strip().lower()
+        if response not in ['yes', 'y']:
+            return None
+        if len(conflicts) == 1:
+            return conflicts[0]
+        
+        print("\nWhich one would you like me to look into? (enter the number)")
+        choice = ask_user_callback("Your choice: ").strip()
+        try:
+            idx = int(choice) - 1
+            if 0 <= idx < len(conflicts):
+                return conflicts[idx]
+            return None
+        except:
+            return conflicts[0]
+    
+    def _build_research_prompt(self, query: str, company_name: str, gathered: Dict[str, Any], conflicts: List[str], deeper_research: Optional[Dict[str, Any]], voice_mode: bool) -> Dict[str, Any]:
+        # from here on every source is the shared, interned Source for its URL
+        wikipedia_sources = self.source_registry.intern_all(gathered['wikipedia'])
+        news_sources = self.source_registry.intern_all(gathered['news'])
+        linkedin_source = self.source_registry.intern(gathered['linkedin']) if gathered['linkedin'] else None
+        web_sources = self.source_registry.intern_all(gathered['web'])
+        
+        with span("context.build"):
+            built_context = self.context_builder.build(query, wikipedia_sources, news_sources, linkedin_source, web_sources)
+        context = built_context.text
         
         if deeper_research and deeper_research.get('success'):
             context += f"\n\n=== ADDITIONAL RESEARCH (Digging Deeper) ===\n{deeper_research.get('clarification', '')}\n"
@@ -243,63 +728,134 @@ Please provide a friendly, conversational answer that:
 - Feels like a natural conversation
 - Makes the information easy to understand and engaging"""
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            answer = response.choices[0].message.content
-            
-            all_sources = wikipedia_sources + news_sources + web_sources
-            if linkedin_source:
-                all_sources.append(linkedin_source)
-            if deeper_research and deeper_research.get('sources'):
-                all_sources.extend(deeper_research.get('sources', []))
-            
-            return {
-                'success': True,
-                'query': query,
-                'company_name': company_name,
-                'wikipedia_sources': wikipedia_sources,
-                'news_sources': news_sources,
-                'linkedin_source': linkedin_source,
-                'web_sources': web_sources,
-                'sources': all_sources,
-                'response': answer,
-                'sources_count': len(all_sources),
-                'conflicts': conflicts,
-                'deeper_research': deeper_research
-            }
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "quota" in error_msg.lower() or "insufficient_quota" in error_msg.lower():
-                detailed_error = "OpenAI API quota exceeded. Please check:\n"
-            else:
-                detailed_error = f"OpenAI API Error: {error_msg}"
-            
-            return {
-                'success': False,
-                'error': detailed_error,
-                'response': None,
-                'sources': []
-            }
+        return {
+            'query': query,
+            'company_name': company_name,
+            'gathered': gathered,
+            'voice_mode': voice_mode,
+            'wikipedia_sources': wikipedia_sources,
+            'news_sources': news_sources,
+            'linkedin_source': linkedin_source,
+            'web_sources': web_sources,
+            'conflicts': conflicts,
+            'deeper_research': deeper_research,
+            'context_tokens': built_context.usage(),
+            'messages': [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        }
     
-    def handle_followup(self, query: str, previous_context: List[Dict]) -> Dict[str, any]:
+    def _research_result(self, prepared: Dict[str, Any], answer: str) -> ResearchResult:
+        deeper_research = prepared['deeper_research']
+        if deeper_research and deeper_research.get('sources'):
+            deeper_research = dict(deeper_research, sources=self.source_registry.intern_all(deeper_research['sources']))
+        
+        return ResearchResult(
+            success=True,
+            query=prepared['query'],
+            company_name=prepared['company_name'],
+            company_id=self.company_index.canonical_id(prepared['company_name']),
+            wikipedia_sources=prepared['wikipedia_sources'],
+            news_sources=prepared['news_sources'],
+            linkedin_source=prepared['linkedin_source'],
+            web_sources=prepared['web_sources'],
+            response=answer,
+            conflicts=prepared['conflicts'],
+            deeper_research=deeper_research,
+            context_tokens=prepared['context_tokens']
+        )
+    
+    def _research_error(self, e: Exception) -> ResearchResult:
+        error_msg = str(e)
+        if "429" in error_msg or "quota" in error_msg.lower() or "insufficient_quota" in error_msg.lower():
+            detailed_error = "OpenAI API quota exceeded. Please check:\n"
+        else:
+            detailed_error = f"OpenAI API Error: {error_msg}"
+        
+        return ResearchResult(
+            success=False,
+            error=detailed_error,
+            response=None
+        )
+    
+    def handle_followup(self, query: str, previous_context: Union[List[Dict], ConversationMemory]) -> Dict[str, any]:
+        return self._traced("followup", query, lambda: self._handle_followup(query, previous_context))
+    
+    async def ahandle_followup(self, query: str, previous_context: Union[List[Dict], ConversationMemory]) -> Dict[str, any]:
+        return await self._atraced("followup", query, lambda: self._ahandle_followup(query, previous_context))
+    
+    def stream_followup(self, query: str, previous_context: Union[List[Dict], ConversationMemory]) -> 'ResearchStream':
+        return self._traced_stream("followup", query, lambda: self._stream_followup(query, previous_context))
+    
+    def _handle_followup(self, query: str, previous_context: Union[List[Dict], ConversationMemory]) -> Dict[str, any]:
         if not previous_context:
             return self.research_company(query, voice_mode=False)
         
-        last_result = previous_context[-1]
-        company_name = last_result.get('company_name', '')
+        prepared = self._prepare_followup(query, previous_context)
+        try:
+            with span("llm.followup"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=prepared['messages'],
+                    temperature=0.7,
+                    max_tokens=1500
+                )
+            record_usage(response)
+            return self._followup_result(prepared, response.choices[0].message.content)
+        except Exception as e:
+            return self._followup_error(e)
+    
+    async def _ahandle_followup(self, query: str, previous_context: Union[List[Dict], ConversationMemory]) -> Dict[str, any]:
+        if not previous_context:
+            return await self.aresearch_company(query, voice_mode=False)
         
-        web_results = self.web_search_agent.search_with_query(f"{company_name} {query}", max_results=3)
+        memory = self._as_memory(previous_context)
+        with span("source.web"):
+            web_results = await self.web_search_agent.asearch_with_query(f"{memory.company_name} {query}", max_results=3)
+        web_results = self.deduplicator.dedupe({'web': web_results})[0]['web']
+        prepared = self._build_followup_prompt(query, memory, web_results)
+        try:
+            with span("llm.followup"):
+                response = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=prepared['messages'],
+                    temperature=0.7,
+                    max_tokens=1500
+                )
+            record_usage(response)
+            return self._followup_result(prepared, response.choices[0].message.content)
+        except Exception as e:
+            return self._followup_error(e)
+    
+    def _stream_followup(self, query: str, previous_context: Union[List[Dict], ConversationMemory]) -> 'ResearchStream':
+        if not previous_context:
+            return self.stream_research_company(query, voice_mode=False)
+        
+        prepared = self._prepare_followup(query, previous_context)
+        return ResearchStream(
+            lambda: self._stream_completion(prepared['messages'], temperature=0.7, max_tokens=1500, stage="llm.followup"),
+            lambda answer: self._followup_result(prepared, answer),
+            self._followup_error
+        )
+    
+    def _prepare_followup(self, query: str, previous_context: Union[List[Dict], ConversationMemory]) -> Dict[str, Any]:
+        memory = self._as_memory(previous_context)
+        with span("source.web"):
+            web_results = self.web_search_agent.search_with_query(f"{memory.company_name} {query}", max_results=3)
+        web_results = self.deduplicator.dedupe({'web': web_results})[0]['web']
+        return self._build_followup_prompt(query, memory, web_results)
+    
+    def _as_memory(self, previous_context: Union[List[Dict], ConversationMemory]) -> ConversationMemory:
+        # plain lists of result dicts are still accepted
+        if isinstance(previous_context, ConversationMemory):
+            return previous_context
+        return ConversationMemory.from_results(previous_context, counter=self.context_builder.counter)
+    
+    def _build_followup_prompt(self, query: str, memory: ConversationMemory, web_results: List[Dict[str, str]]) -> Dict[str, Any]:
+        company_name = memory.company_name
         
-        context_summary = "\n".join([ctx.get('response', '')[:300] for ctx in previous_context[-2:]])
+        context_summary = memory.context(query)
         
         system_prompt = """You are a friendly and knowledgeable company research assistant. You're having a natural conversation with someone who wants to learn more about a company. Be warm, conversational, and helpful. Answer their follow-up question in a friendly, engaging way."""
         
@@ -307,39 +863,49 @@ Please provide a friendly, conversational answer that:
 {context_summary}
 
 I also found some new information:
-{self.format_sources_context([], [], None, web_results)}
+{self.context_builder.build(query, [], [], None, web_results).text}
 
 They're now asking: {query}
 
 Please answer their follow-up question in a friendly, conversational way that feels natural and engaging."""
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1500
-            )
-            
-            return {
-                'success': True,
-                'query': query,
-                'company_name': company_name,
-                'response': response.choices[0].message.content,
-                'sources': web_results,
-                'sources_count': len(web_results),
-                'is_followup': True
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f"Error: {str(e)}",
-                'response': None,
-                'sources': []
-            }
+        return {
+            'query': query,
+            'company_name': company_name,
+            'web_results': web_results,
+            'messages': [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+    
+    def _followup_result(self, prepared: Dict[str, Any], answer: str) -> ResearchResult:
+        return ResearchResult(
+            success=True,
+            query=prepared['query'],
+            company_name=prepared['company_name'],
+            web_sources=self.source_registry.intern_all(prepared['web_results']),
+            response=answer,
+            is_followup=True
+        )
+    
+    def _followup_error(self, e: Exception) -> ResearchResult:
+        return ResearchResult(
+            success=False,
+            error=f"Error: {str(e)}",
+            response=None
+        )
+    
+    def _resolve_company(self, query: str) -> Tuple[str, str, Optional[CompanyRecord]]:
+        # returns (display name, search name, record). Known companies are always searched
+        # under the record's short name, so "Amazon.com", "AMZN" and "amazon" all fetch (and
+        # share cache entries under) "Amazon"; the spelling that was matched is only shown
+        # to the user. The LinkedIn slug comes from the index; record.id is the stable key
+        company_name = self._extract_company_name(query)
+        match = self.company_index.resolve(company_name)
+        if match:
+            return match.name, match.record.short_name, match.record
+        return company_name, company_name, None
     
     def _extract_company_name(self, query: str) -> str:
         query_lower = query.lower()
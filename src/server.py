@@ -0,0 +1,317 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from .account_plan import AccountPlanGenerator
+from .context_builder import TokenCounter
+from .memory import ConversationMemory
+from .models import to_jsonable
+
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class Session:
+
+    def __init__(self, session_id: str, memory: Optional[ConversationMemory] = None):
+        self.id = session_id
+        self.memory = memory or ConversationMemory()
+        self.plan = None
+        self.last_used = time.monotonic()
+        # one request at a time per session, so follow-ups see the previous answer
+        self.lock = threading.Lock()
+
+
+class SessionStore:
+    # Conversation memory per client. Idle sessions expire, and the least recently
+    # used one is evicted when the store is full.
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800.0, counter: Optional[TokenCounter] = None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # loading a tokenizer per session would be wasteful
+        self.counter = counter or TokenCounter()
+        self._sessions: 'OrderedDict[str, Session]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str]) -> Session:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = Session(session_id or uuid.uuid4().hex, ConversationMemory(counter=self.counter))
+                self._sessions[session.id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session.id)
+            session.last_used = now
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self, now: float):
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+class AdmissionControl:
+    # At most max_concurrent requests do work at once. Up to max_waiting more queue for
+    # a slot for at most queue_timeout seconds; anything beyond that is refused straight
+    # away so the caller can back off instead of piling onto a saturated process.
+
+    def __init__(self, max_concurrent: int = 8, max_waiting: int = 32, queue_timeout: float = 10.0):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> bool:
+        with self._condition:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    return False
+                self.waiting += 1
+                try:
+                    admitted = self._condition.wait_for(lambda: self.active < self.max_concurrent, self.queue_timeout)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self.rejected += 1
+                    return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'rejected': self.rejected,
+                'max_concurrent': self.max_concurrent,
+                'max_waiting': self.max_waiting
+            }
+
+
+class ResearchServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, agent, host: str = "127.0.0.1", port: int = 8000, max_concurrent: Optional[int] = None, max_waiting: Optional[int] = None, queue_timeout: float = 10.0, retry_after: int = 2, sessions: Optional[SessionStore] = None):
+        self.agent = agent
+        if max_concurrent is None:
+            max_concurrent = int(os.getenv("SERVER_MAX_CONCURRENT", "8"))
+        if max_waiting is None:
+            max_waiting = int(os.getenv("SERVER_MAX_WAITING", str(max_concurrent * 4)))
+        self.admission = AdmissionControl(max_concurrent, max_waiting, queue_timeout)
+        self.retry_after = retry_after
+        self.sessions = sessions or SessionStore(counter=agent.context_builder.counter)
+        self.plan_generator = AccountPlanGenerator(agent.client, model=agent.model)
+        super().__init__((host, port), ResearchRequestHandler)
+
+
+class ResearchRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: ResearchServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/health":
+            self._send_json(200, {
+                'status': 'ok',
+                'sources': self.server.agent.health_stats(),
+                'requests': self.server.admission.snapshot(),
+                'sessions': len(self.server.sessions)
+            })
+        elif path == "/metrics":
+            body = self.server.agent.prometheus_metrics().encode("utf-8")
+            self._send(200, body, "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint {path}"})
+
+    def do_DELETE(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.startswith("/sessions/") and self.server.sessions.delete(path[len("/sessions/"):]):
+            self._send_json(200, {'deleted': True})
+        else:
+            self._send_json(404, {'error': "Unknown session"})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        handlers = {
+            "/research": self._research,
+            "/followup": self._followup,
+            "/plan": self._plan
+        }
+        if path not in handlers:
+            self._send_json(404, {'error': f"Unknown endpoint {path}"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            # the unread body would be taken for the next request on this connection
+            self.close_connection = True
+            self._send_json(413, {'error': "Request body too large"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self._send_json(400, {'error': f"Invalid JSON body: {e}"})
+            return
+
+        # wait for the session before taking a slot, so a queued follow-up doesn't hold
+        # one of max_concurrent while the previous request in its session finishes
+        session = self.server.sessions.get(body.get('session_id'))
+        if not session.lock.acquire(timeout=self.server.admission.queue_timeout):
+            self._send_json(409, {'error': "Another request in this session is still running", 'session_id': session.id})
+            return
+        try:
+            if not self.server.admission.acquire():
+                self._send_json(503, {'error': "Server busy, retry later"}, {"Retry-After": str(self.server.retry_after)})
+                return
+            self._stream_started = False
+            try:
+                handlers[path](body, session)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            except Exception as e:
+                if self._stream_started:
+                    # the 200 and event-stream headers are already out
+                    self._send_error_event(str(e))
+                else:
+                    self._send_json(500, {'error': str(e)})
+            finally:
+                self.server.admission.release()
+        finally:
+            session.lock.release()
+
+    def _research(self, body: Dict[str, Any], session: Session):
+        query = (body.get('query') or "").strip()
+        if not query:
+            self._send_json(400, {'error': "'query' is required"})
+            return
+        if body.get('stream'):
+            self._send_stream(session, self.server.agent.stream_research_company(query))
+        else:
+            self._send_result(session, self.server.agent.research_company(query))
+
+    def _followup(self, body: Dict[str, Any], session: Session):
+        query = (body.get('query') or "").strip()
+        if not query:
+            self._send_json(400, {'error': "'query' is required"})
+            return
+        if body.get('stream'):
+            self._send_stream(session, self.server.agent.stream_followup(query, session.memory))
+        else:
+            self._send_result(session, self.server.agent.handle_followup(query, session.memory))
+
+    def _plan(self, body: Dict[str, Any], session: Session):
+        result = session.memory.last()
+        if result is None:
+            self._send_json(409, {'error': "Research a company in this session before generating a plan", 'session_id': session.id})
+            return
+        plan = self.server.plan_generator.generate_plan(
+            company_name=result.get('company_name', 'Unknown'),
+            research_context=result.get('response', ''),
+            conflicts=result.get('conflicts', [])
+        )
+        for source in result.get('sources', []):
+            plan.add_source(source)
+        session.plan = plan
+        self._send_json(200, {
+            'session_id': session.id,
+            'company_name': plan.company_name,
+            'sections': plan.sections,
+            'markdown': plan.to_markdown()
+        })
+
+    def _send_result(self, session: Session, result: Dict[str, Any]):
+        if result.get('success'):
+            session.memory.add(result)
+        self._send_json(200, dict(result, session_id=session.id))
+
+    def _send_stream(self, session: Session, stream):
+        # server-sent events: "chunk" events with answer text, then one "result" event
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.send_header("X-Session-Id", session.id)
+        self.end_headers()
+        self.close_connection = True
+        self._stream_started = True
+
+        chunks = iter(stream)
+        try:
+            for chunk in chunks:
+                self._send_event("chunk", {'text': chunk})
+        except (BrokenPipeError, ConnectionResetError):
+            # client went away; stop generating
+            chunks.close()
+            return
+        result = stream.result
+        if result.get('success'):
+            session.memory.add(result)
+        self._send_event("result", dict(result, session_id=session.id))
+
+    def _send_event(self, event: str, data: Dict[str, Any]):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data, default=to_jsonable)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_error_event(self, message: str):
+        try:
+            self._send_event("error", {'error': message})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_json(self, status: int, data: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(data, default=to_jsonable).encode("utf-8"), "application/json", headers)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(agent, host: str = "127.0.0.1", port: int = 8000, max_concurrent: Optional[int] = None):
+    server = ResearchServer(agent, host, port, max_concurrent=max_concurrent)
+    print(f"Serving research API on http://{host}:{server.server_address[1]} "
+          f"(max {server.admission.max_concurrent} concurrent requests)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+        agent.close()
@@ -0,0 +1,168 @@
+import io
+import queue
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional
+
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+class SentenceSplitter:
+
+    def __init__(self, min_chars: int = 20):
+        # short fragments ("Inc.", "Hi!") get merged into the next sentence so playback isn't choppy
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        parts = _SENTENCE_BOUNDARY.split(self._buffer)
+        self._buffer = parts.pop()
+        sentences = []
+        pending = ""
+        for part in parts:
+            pending = f"{pending} {part}".strip() if pending else part.strip()
+            if len(pending) >= self.min_chars:
+                sentences.append(pending)
+                pending = ""
+        if pending:
+            self._buffer = f"{pending} {self._buffer}"
+        return sentences
+
+    def flush(self) -> List[str]:
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return [remainder] if remainder else []
+
+
+class TTSEngine(ABC):
+
+    @abstractmethod
+    def synthesize(self, text: str) -> io.BytesIO:
+        pass
+
+
+class GTTSEngine(TTSEngine):
+
+    def __init__(self, lang: str = 'en', slow: bool = False):
+        self.lang = lang
+        self.slow = slow
+
+    def synthesize(self, text: str) -> io.BytesIO:
+        from gtts import gTTS
+        audio_buffer = io.BytesIO()
+        gTTS(text=text, lang=self.lang, slow=self.slow).write_to_fp(audio_buffer)
+        audio_buffer.seek(0)
+        return audio_buffer
+
+
+class SilentTTSEngine(TTSEngine):
+    # Offline stand-in: returns empty audio after an optional simulated synthesis delay.
+
+    def __init__(self, seconds_per_char: float = 0.0):
+        self.seconds_per_char = seconds_per_char
+        self.spoken: List[str] = []
+
+    def synthesize(self, text: str) -> io.BytesIO:
+        if self.seconds_per_char:
+            time.sleep(len(text) * self.seconds_per_char)
+        self.spoken.append(text)
+        return io.BytesIO()
+
+
+class AudioPlayer(ABC):
+
+    @abstractmethod
+    def play(self, audio: io.BytesIO):
+        pass
+
+
+class PygamePlayer(AudioPlayer):
+
+    def __init__(self):
+        import pygame
+        self._pygame = pygame
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
+    def play(self, audio: io.BytesIO):
+        self._pygame.mixer.music.load(audio)
+        self._pygame.mixer.music.play()
+        while self._pygame.mixer.music.get_busy():
+            self._pygame.time.wait(50)
+
+
+class NullPlayer(AudioPlayer):
+
+    def __init__(self, seconds_per_clip: float = 0.0):
+        self.seconds_per_clip = seconds_per_clip
+        self.played = 0
+
+    def play(self, audio: io.BytesIO):
+        if self.seconds_per_clip:
+            time.sleep(self.seconds_per_clip)
+        self.played += 1
+
+
+_DONE = object()
+
+
+class SpeechPipeline:
+
+    def __init__(self, engine: TTSEngine, player: AudioPlayer, max_buffered: int = 2, min_sentence_chars: int = 20):
+        self.engine = engine
+        self.player = player
+        self.max_buffered = max_buffered
+        self.min_sentence_chars = min_sentence_chars
+        self.first_audio_at: Optional[float] = None
+
+    def speak(self, chunks: Iterable[str]) -> str:
+        # Three stages: split the text stream into sentences, synthesize them on a worker,
+        # and play on the calling thread, so sentence N+1 is synthesized while N plays.
+        sentences: "queue.Queue" = queue.Queue()
+        clips: "queue.Queue" = queue.Queue(maxsize=self.max_buffered)
+        spoken_parts = []
+
+        def split():
+            splitter = SentenceSplitter(self.min_sentence_chars)
+            try:
+                for chunk in chunks:
+                    spoken_parts.append(chunk)
+                    for sentence in splitter.feed(chunk):
+                        sentences.put(sentence)
+            finally:
+                for sentence in splitter.flush():
+                    sentences.put(sentence)
+                sentences.put(_DONE)
+
+        def synthesize():
+            while True:
+                sentence = sentences.get()
+                if sentence is _DONE:
+                    break
+                try:
+                    clips.put(self.engine.synthesize(sentence))
+                except Exception as e:
+                    print(f"Error synthesizing speech: {e}")
+            clips.put(_DONE)
+
+        splitter_thread = threading.Thread(target=split, daemon=True)
+        synth_thread = threading.Thread(target=synthesize, daemon=True)
+        splitter_thread.start()
+        synth_thread.start()
+
+        self.first_audio_at = None
+        while True:
+            clip = clips.get()
+            if clip is _DONE:
+                break
+            if self.first_audio_at is None:
+                self.first_audio_at = time.perf_counter()
+            self.player.play(clip)
+
+        splitter_thread.join()
+        synth_thread.join()
+        return "".join(spoken_parts)
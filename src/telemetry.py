@@ -0,0 +1,322 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from .llm_cache import is_replayed
+
+
+TELEMETRY_SINKS = ("json", "prometheus", "otel")
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+_current_trace: ContextVar[Optional['Trace']] = ContextVar("current_trace", default=None)
+
+
+class Span:
+
+    def __init__(self, name: str, start: float, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.start = start
+        self.end = start
+        self.attributes = attributes or {}
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'start_ms': round(self.start * 1000, 2),
+            'duration_ms': round(self.duration * 1000, 2),
+            'attributes': self.attributes
+        }
+
+
+class Trace:
+    # Everything measured for one research query. Span times are seconds relative to
+    # the start of the trace; spans may be recorded from several threads at once.
+
+    def __init__(self, name: str, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.spans: List[Span] = []
+        self.usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0, 'llm_calls': 0, 'cache_hits': 0}
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = Span(name, self.elapsed(), attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes['error'] = type(e).__name__
+            raise
+        finally:
+            span.end = self.elapsed()
+            with self._lock:
+                # a source still running past the research deadline ends after the trace
+                if not self._finished:
+                    self.spans.append(span)
+
+    def record_usage(self, usage: Any, cached: bool = False):
+        if usage is None:
+            return
+        with self._lock:
+            if cached:
+                # a cached answer's usage was paid for when it was first generated
+                self.usage['cache_hits'] += 1
+                return
+            self.usage['llm_calls'] += 1
+            for field in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+                self.usage[field] += getattr(usage, field, 0) or 0
+
+    def finish(self):
+        with self._lock:
+            self.duration = self.elapsed()
+            self._finished = True
+
+    def timings(self) -> Dict[str, Any]:
+        stages = {}
+        for span in self.spans:
+            stages[span.name] = round(stages.get(span.name, 0.0) + span.duration * 1000, 2)
+        return {
+            'total_ms': round(self.duration * 1000, 2),
+            'stages': stages,
+            'spans': [span.to_dict() for span in sorted(self.spans, key=lambda s: s.start)]
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'attributes': self.attributes,
+            'token_usage': dict(self.usage),
+            **self.timings()
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def activate(trace: Trace) -> Iterator[Trace]:
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    # no-op outside a trace, so instrumented code works the same when called directly
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attributes) as active:
+        yield active
+
+
+def record_usage(response: Any):
+    # takes the completion (or the streamed chunk carrying the usage), so answers
+    # replayed from the LLM cache are counted as cache hits rather than spend
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record_usage(getattr(response, 'usage', None), cached=is_replayed(response))
+
+
+class TelemetrySink(ABC):
+
+    @abstractmethod
+    def export(self, trace: Trace):
+        pass
+
+
+class JsonLogSink(TelemetrySink):
+    # One JSON object per trace, appended to a file or sent to the
+    # "company_research_assistant.telemetry" logger.
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.logger = logging.getLogger("company_research_assistant.telemetry")
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        line = json.dumps(trace.to_dict(), default=str)
+        if self.path is None:
+            self.logger.info(line)
+            return
+        with self._lock:
+            with open(self.path, 'a', encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class PrometheusSink(TelemetrySink):
+    # Aggregates traces into counters and histograms and renders them in the
+    # Prometheus text exposition format.
+
+    def __init__(self, buckets: tuple = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests: Dict[tuple, int] = {}
+        self._tokens: Dict[str, int] = {'prompt': 0, 'completion': 0}
+        self._cache_hits = 0
+        self._histograms: Dict[str, Dict[tuple, List[float]]] = {
+            'research_request_duration_seconds': {},
+            'research_stage_duration_seconds': {}
+        }
+
+    def export(self, trace: Trace):
+        with self._lock:
+            key = (('operation', trace.name), ('success', str(bool(trace.attributes.get('success'))).lower()))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._tokens['prompt'] += trace.usage['prompt_tokens']
+            self._tokens['completion'] += trace.usage['completion_tokens']
+            self._cache_hits += trace.usage['cache_hits']
+            self._observe('research_request_duration_seconds', (('operation', trace.name),), trace.duration)
+            for span in trace.spans:
+                self._observe('research_stage_duration_seconds', (('stage', span.name),), span.duration)
+
+    def _observe(self, metric: str, labels: tuple, value: float):
+        # bucket counts, then sum and count
+        series = self._histograms[metric].setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self, health: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        lines = [
+            "# HELP research_requests_total Research operations by outcome.",
+            "# TYPE research_requests_total counter"
+        ]
+        with self._lock:
+            for labels, count in sorted(self._requests.items()):
+                lines.append(f"research_requests_total{_labels(labels)} {count}")
+
+            lines.append("# HELP research_llm_tokens_total OpenAI tokens used.")
+            lines.append("# TYPE research_llm_tokens_total counter")
+            for kind, count in self._tokens.items():
+                lines.append(f'research_llm_tokens_total{{type="{kind}"}} {count}')
+            lines.append("# HELP research_llm_cache_hits_total OpenAI calls answered from the LLM cache.")
+            lines.append("# TYPE research_llm_cache_hits_total counter")
+            lines.append(f"research_llm_cache_hits_total {self._cache_hits}")
+
+            for metric, series in self._histograms.items():
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, values in sorted(series.items()):
+                    for bound, count in zip(self.buckets, values):
+                        lines.append(f"{metric}_bucket{_labels(labels + (('le', repr(bound)),))} {count}")
+                    lines.append(f"{metric}_bucket{_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+                    lines.append(f"{metric}_sum{_labels(labels)} {values[-2]}")
+                    lines.append(f"{metric}_count{_labels(labels)} {values[-1]}")
+
+        if health:
+            lines.append("# HELP research_source_circuit_state Circuit breaker state per source (0 closed, 1 half open, 2 open).")
+            lines.append("# TYPE research_source_circuit_state gauge")
+            for source, state in sorted(health.items()):
+                lines.append(f'research_source_circuit_state{{source="{source}"}} {CIRCUIT_STATES.get(state["state"], 0)}')
+            lines.append("# TYPE research_source_skipped_total counter")
+            for source, state in sorted(health.items()):
+                lines.append(f'research_source_skipped_total{{source="{source}"}} {state["skipped"]}')
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple) -> str:
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+class OpenTelemetrySink(TelemetrySink):
+    # Replays a finished trace as OpenTelemetry spans (one root, one child per stage)
+    # with their original timestamps. Needs the opentelemetry-api package; the exporter
+    # is whatever tracer provider the application has configured.
+
+    def __init__(self, tracer: Any = None):
+        try:
+            from opentelemetry import trace as otel_trace
+        except ImportError:
+            raise ValueError("The OpenTelemetry sink needs the 'opentelemetry-api' package installed")
+        self._otel_trace = otel_trace
+        self.tracer = tracer or otel_trace.get_tracer("company_research_assistant")
+
+    def export(self, trace: Trace):
+        start_ns = int(trace.started_at * 1e9)
+        attributes = _otel_attributes(trace.attributes)
+        attributes.update({f"llm.{name}": value for name, value in trace.usage.items()})
+        root = self.tracer.start_span(trace.name, start_time=start_ns, attributes=attributes)
+        context = self._otel_trace.set_span_in_context(root)
+        for span in trace.spans:
+            child = self.tracer.start_span(span.name, context=context, start_time=start_ns + int(span.start * 1e9), attributes=_otel_attributes(span.attributes))
+            child.end(end_time=start_ns + int(span.end * 1e9))
+        root.end(end_time=start_ns + int(trace.duration * 1e9))
+
+
+def _otel_attributes(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: value if isinstance(value, (str, bool, int, float)) else str(value) for name, value in attributes.items()}
+
+
+class Telemetry:
+
+    def __init__(self, sinks: Optional[List[TelemetrySink]] = None):
+        self.sinks = list(sinks or [])
+
+    def start_trace(self, name: str, **attributes) -> Trace:
+        return Trace(name, **attributes)
+
+    def finish(self, trace: Trace):
+        trace.finish()
+        for sink in self.sinks:
+            try:
+                sink.export(trace)
+            except Exception:
+                # telemetry must never break a research query
+                pass
+
+    @contextmanager
+    def trace(self, name: str, **attributes) -> Iterator[Trace]:
+        trace = self.start_trace(name, **attributes)
+        try:
+            with activate(trace):
+                yield trace
+        finally:
+            self.finish(trace)
+
+    def prometheus(self) -> Optional[PrometheusSink]:
+        for sink in self.sinks:
+            if isinstance(sink, PrometheusSink):
+                return sink
+        return None
+
+
+def create_sinks(spec: str, log_path: Optional[str] = None) -> List[TelemetrySink]:
+    sinks = []
+    for name in (part.strip().lower() for part in spec.split(",")):
+        if not name:
+            continue
+        if name not in TELEMETRY_SINKS:
+            raise ValueError(f"Unknown telemetry sink '{name}'. Choose from: {', '.join(TELEMETRY_SINKS)}")
+        if name == "json":
+            sinks.append(JsonLogSink(log_path))
+        elif name == "prometheus":
+            sinks.append(PrometheusSink())
+        else:
+            sinks.append(OpenTelemetrySink())
+    return sinks
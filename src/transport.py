@@ -0,0 +1,184 @@
+import asyncio
+import inspect
+from typing import Dict, Optional
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .health import SourceHealth, SourceUnavailable, is_failure_status
+
+
+DEFAULT_TIMEOUTS = {
+    "wikipedia": 10,
+    "news": 10,
+    "linkedin": 10,
+    "web": 10
+}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# longest wait between retries, whatever a Retry-After header asks for; a source has
+# to answer within its timeout and the research deadline anyway
+DEFAULT_MAX_BACKOFF = 2.0
+
+
+# backoff_max is a Retry argument only since urllib3 2.0; 1.26 reads a class constant
+_RETRY_TAKES_BACKOFF_MAX = "backoff_max" in inspect.signature(Retry.__init__).parameters
+
+
+class CappedRetry(Retry):
+    # urllib3 sleeps for as long as Retry-After says (up to hours); cap it like the backoff
+
+    def __init__(self, *args, backoff_max: float = DEFAULT_MAX_BACKOFF, **kwargs):
+        if _RETRY_TAKES_BACKOFF_MAX:
+            kwargs["backoff_max"] = backoff_max
+        super().__init__(*args, **kwargs)
+        if not _RETRY_TAKES_BACKOFF_MAX:
+            self.backoff_max = backoff_max
+            # 1.26.9+ caps the exponential backoff with DEFAULT_BACKOFF_MAX, earlier 1.26 with BACKOFF_MAX
+            self.DEFAULT_BACKOFF_MAX = self.BACKOFF_MAX = backoff_max
+
+    def new(self, **kwargs):
+        # urllib3 1.26 doesn't carry backoff_max over to the copy it makes per retry
+        kwargs.setdefault("backoff_max", self.backoff_max)
+        return super().new(**kwargs)
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.backoff_max)
+
+
+class HttpTransport:
+    # One keep-alive session shared by all source agents, so repeat requests to the
+    # same host reuse pooled connections instead of paying DNS/TCP/TLS setup each time.
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 20, max_retries: int = 2,
+                 backoff_factor: float = 0.5, timeouts: Optional[Dict[str, float]] = None,
+                 session: Optional[requests.Session] = None, health: Optional[SourceHealth] = None,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF):
+        self.session = session or requests.Session()
+        self.health = health or SourceHealth()
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        retry = CappedRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_max=max_backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, source: str, url: str, **kwargs) -> requests.Response:
+        # a tripped source fails fast instead of waiting out its timeout on every query
+        breaker = self.health.breaker(source)
+        if not breaker.allow_request():
+            raise SourceUnavailable(source)
+        kwargs.setdefault("timeout", self.timeouts.get(source, 10))
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception:
+            breaker.record_failure()
+            raise
+        if is_failure_status(source, response.status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+def running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class AsyncHttpTransport:
+    # httpx counterpart of HttpTransport for the async API. The client is created on
+    # first use so it binds to the event loop that actually runs the requests, and is
+    # created again when a later asyncio.run() brings a new loop, or after aclose().
+    # A client passed in is used as is; pass http_transport instead to keep a custom
+    # transport (e.g. httpx.MockTransport) across loops.
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20, max_retries: int = 2,
+                 backoff_factor: float = 0.5, timeouts: Optional[Dict[str, float]] = None,
+                 client: Optional[httpx.AsyncClient] = None, health: Optional[SourceHealth] = None,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF, http_transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.health = health or SourceHealth()
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.http_transport = http_transport
+        self._client = client
+        self._owns_client = client is None
+        self._client_loop = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if not self._owns_client:
+            return self._client
+        loop = running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # a client left on a finished loop can't be closed from this one; drop it
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive_connections)
+            transport = self.http_transport or httpx.AsyncHTTPTransport(retries=self.max_retries, limits=limits)
+            self._client = httpx.AsyncClient(transport=transport)
+            self._client_loop = loop
+        return self._client
+
+    async def get(self, source: str, url: str, allow_redirects: bool = True, **kwargs) -> httpx.Response:
+        breaker = self.health.breaker(source)
+        if not breaker.allow_request():
+            raise SourceUnavailable(source)
+        kwargs.setdefault("timeout", self.timeouts.get(source, 10))
+        try:
+            response = await self._get_with_retries(url, allow_redirects, **kwargs)
+        except asyncio.CancelledError:
+            # abandoned at the research deadline: says nothing about the upstream
+            breaker.release_trial()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        if is_failure_status(source, response.status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def _get_with_retries(self, url: str, allow_redirects: bool, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            response = await self.client.get(url, follow_redirects=allow_redirects, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return response
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else self.backoff_factor * (2 ** attempt)
+            delay = min(delay, self.max_backoff)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        if not self._owns_client:
+            await self._client.aclose()
+            return
+        client, self._client = self._client, None
+        if client is not None and self._client_loop is running_loop():
+            await client.aclose()
+            self._client = None
@@ -1,94 +1,144 @@
-import requests
-from typing import List, Dict
-from bs4 import BeautifulSoup
+from typing import List, Dict, Optional
+from bs4 import BeautifulSoup, SoupStrainer
 import urllib.parse
+from .cache import ResponseCache
+from .transport import HttpTransport, AsyncHttpTransport
+
+
+RESULT_LINK_CLASS = "result__a"
+RESULT_SNIPPET_CLASS = "result__snippet"
+PARSER_BACKENDS = ("selectolax", "lxml", "html.parser")
+SEARCH_URL = "https://html.duckduckgo.com/html/?q={query}"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+def _available_backends() -> List[str]:
+    backends = []
+    try:
+        import selectolax.lexbor
+        backends.append("selectolax")
+    except ImportError:
+        pass
+    try:
+        import lxml
+        backends.append("lxml")
+    except ImportError:
+        pass
+    backends.append("html.parser")
+    return backends
+
+
+class DuckDuckGoResultParser:
+    # Pulls only the result title anchors and their snippets out of a DuckDuckGo HTML
+    # results page. selectolax and lxml are optional; html.parser always works.
+    
+    def __init__(self, backend: Optional[str] = None):
+        available = _available_backends()
+        if backend is None:
+            backend = available[0]
+        elif backend not in PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend '{backend}'. Choose from: {', '.join(PARSER_BACKENDS)}")
+        elif backend not in available:
+            raise ValueError(f"Parser backend '{backend}' is not installed")
+        self.backend = backend
+        self._strainer = SoupStrainer('a', class_=[RESULT_LINK_CLASS, RESULT_SNIPPET_CLASS])
+    
+    def parse(self, html: bytes, max_results: int) -> List[Dict[str, str]]:
+        if self.backend == "selectolax":
+            pairs = self._extract_selectolax(html, max_results)
+        else:
+            pairs = self._extract_soup(html, max_results)
+        
+        results = []
+        for title, url, snippet in pairs:
+            if title and url:
+                results.append({
+                    "title": title,
+                    "description": snippet[:300] if snippet else "",
+                    "url": url,
+                    "source": "Web Search"
+                })
+        return results
+    
+    def _extract_selectolax(self, html: bytes, max_results: int) -> List[tuple]:
+        from selectolax.lexbor import LexborHTMLParser
+        pairs = []
+        for result in LexborHTMLParser(html).css('div.result'):
+            link = result.css_first(f'a.{RESULT_LINK_CLASS}')
+            if link is None:
+                continue
+            snippet = result.css_first(f'a.{RESULT_SNIPPET_CLASS}')
+            pairs.append((
+                link.text().strip(),
+                link.attributes.get('href') or '',
+                snippet.text().strip() if snippet is not None else ""
+            ))
+            if len(pairs) >= max_results:
+                break
+        return pairs
+    
+    def _extract_soup(self, html: bytes, max_results: int) -> List[tuple]:
+        # Only the two anchor kinds are built into the tree; in document order each
+        # result's snippet follows its title link, so they can be paired sequentially.
+        soup = BeautifulSoup(html, self.backend, parse_only=self._strainer)
+        pairs = []
+        for anchor in soup.find_all('a'):
+            classes = anchor.get('class') or []
+            if RESULT_LINK_CLASS in classes:
+                if len(pairs) >= max_results:
+                    break
+                pairs.append([anchor.text.strip(), anchor.get('href', ''), ""])
+            elif RESULT_SNIPPET_CLASS in classes and pairs and not pairs[-1][2]:
+                pairs[-1][2] = anchor.text.strip()
+        return [tuple(pair) for pair in pairs]
 
 
 class WebSearchAgent:
     
-    def __init__(self):
-        pass
+    def __init__(self, cache: Optional[ResponseCache] = None, transport: Optional[HttpTransport] = None, parser: Optional[DuckDuckGoResultParser] = None, async_transport: Optional[AsyncHttpTransport] = None):
+        self.cache = cache
+        self.transport = transport or HttpTransport()
+        self.async_transport = async_transport or AsyncHttpTransport()
+        self.parser = parser or DuckDuckGoResultParser()
     
     def search_company(self, company_name: str, max_results: int = 5) -> List[Dict[str, str]]:
+        if self.cache is not None:
+            return self.cache.cached("web", company_name, lambda: self._search(f"{company_name} company", max_results), kind="company", max_results=max_results)
+        return self._search(f"{company_name} company", max_results)
+    
+    def search_with_query(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
+        if self.cache is not None:
+            return self.cache.cached("web", query, lambda: self._search(query, max_results), kind="query", max_results=max_results)
+        return self._search(query, max_results)
+    
+    async def asearch_company(self, company_name: str, max_results: int = 5) -> List[Dict[str, str]]:
+        if self.cache is not None:
+            return await self.cache.acached("web", company_name, lambda: self._asearch(f"{company_name} company", max_results), kind="company", max_results=max_results)
+        return await self._asearch(f"{company_name} company", max_results)
+    
+    async def asearch_with_query(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
+        if self.cache is not None:
+            return await self.cache.acached("web", query, lambda: self._asearch(query, max_results), kind="query", max_results=max_results)
+        return await self._asearch(query, max_results)
+    
+    def _search(self, query: str, max_results: int) -> List[Dict[str, str]]:
         try:
-            query = f"{company_name} company"
-            search_url = f"https://html.duckduckgo.com/html/?q={urllib.parse.quote(query)}"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(search_url, headers=headers, timeout=10)
-            
+            response = self.transport.get("web", SEARCH_URL.format(query=urllib.parse.quote(query)), headers=HEADERS)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                result_links = soup.find_all('a', class_='result__a', limit=max_results)
-                
-                for link in result_links:
-                    title = link.text.strip()
-                    url = link.get('href', '')
-                    
-                    snippet = ""
-                    result_div = link.find_parent('div', class_='result')
-                    if result_div:
-                        snippet_elem = result_div.find('a', class_='result__snippet')
-                        if snippet_elem:
-                            snippet = snippet_elem.text.strip()
-                    
-                    if title and url:
-                        results.append({
-                            "title": title,
-                            "description": snippet[:300] if snippet else "",
-                            "url": url,
-                            "source": "Web Search"
-                        })
-                
-                return results
+                return self.parser.parse(response.content, max_results)
         except Exception as e:
             pass
         
         return []
     
-    def search_with_query(self, query: str, max_results: int = 3) -> List[Dict[str, str]]:
+    async def _asearch(self, query: str, max_results: int) -> List[Dict[str, str]]:
         try:
-            search_url = f"https://html.duckduckgo.com/html/?q={urllib.parse.quote(query)}"
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(search_url, headers=headers, timeout=10)
-            
+            response = await self.async_transport.get("web", SEARCH_URL.format(query=urllib.parse.quote(query)), headers=HEADERS)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                results = []
-                
-                result_links = soup.find_all('a', class_='result__a', limit=max_results)
-                
-                for link in result_links:
-                    title = link.text.strip()
-                    url = link.get('href', '')
-                    
-                    snippet = ""
-                    result_div = link.find_parent('div', class_='result')
-                    if result_div:
-                        snippet_elem = result_div.find('a', class_='result__snippet')
-                        if snippet_elem:
-                            snippet = snippet_elem.text.strip()
-                    
-                    if title and url:
-                        results.append({
-                            "title": title,
-                            "description": snippet[:300] if snippet else "",
-                            "url": url,
-                            "source": "Web Search"
-                        })
-                
-                return results
+                return self.parser.parse(response.content, max_results)
         except Exception as e:
             pass
         
         return []
-
@@ -1,41 +1,99 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from .cache import ResponseCache
+from .transport import HttpTransport, AsyncHttpTransport
+from .health import SourceHealth
 
 class WikipediaAgentInterface(ABC):
+    cache: Optional[ResponseCache] = None
 
     @abstractmethod
-    def query(self, query: str) -> List[Dict[str, Any]]:
+    def query(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         pass
 
     @abstractmethod
     def parse_results(self, raw_results: Any) -> List[Dict[str, Any]]:
         pass
 
+    def get_multiple_sources(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        if self.cache is not None:
+            return self.cache.cached("wikipedia", query, lambda: self._get_multiple_sources(query, limit), limit=limit)
+        return self._get_multiple_sources(query, limit)
+
+    def _get_multiple_sources(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        try:
+            results = self.query(query, limit=limit)
+            return results[:limit]
+        except Exception:
+            return []
+
+    async def aquery(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        # backends without a native async client run the blocking query on a worker thread
+        return await asyncio.to_thread(self.query, query, limit)
+
+    async def aget_multiple_sources(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        if self.cache is not None:
+            return await self.cache.acached("wikipedia", query, lambda: self._aget_multiple_sources(query, limit), limit=limit)
+        return await self._aget_multiple_sources(query, limit)
+
+    async def _aget_multiple_sources(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        try:
+            results = await self.aquery(query, limit=limit)
+            return results[:limit]
+        except Exception:
+            return []
+
 class WikipediaAgent(WikipediaAgentInterface):
-    def __init__(self):
-        pass
+    def __init__(self, max_workers: int = 5, cache: Optional[ResponseCache] = None, health: Optional[SourceHealth] = None):
+        self.max_workers = max_workers
+        self.cache = cache
+        self.health = health or SourceHealth()
 
-    def query(self, query: str) -> List[Dict[str, Any]]:
+    def query(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         import wikipedia
+        # the wikipedia package bypasses our transport, so its search call is guarded here
+        breaker = self.health.breaker("wikipedia")
+        if not breaker.allow_request():
+            return []
         try:
             page_titles = wikipedia.search(query, results=5)
-            raw_results = []
-            for title in page_titles:
-                try:
-                    page = wikipedia.page(title)
-                    raw_results.append(page)
-                except wikipedia.exceptions.DisambiguationError as e:
-                    try:
-                        page = wikipedia.page(e.options[0])
-                        raw_results.append(page)
-                    except:
-                        continue
-                except Exception:
-                    continue
+            breaker.record_success()
         except Exception:
-            raw_results = []
+            breaker.record_failure()
+            page_titles = []
+
+        raw_results = []
+        remaining = list(page_titles)
+        if remaining and limit > 0:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, limit)) as executor:
+                while remaining and len(raw_results) < limit:
+                    batch = remaining[:limit - len(raw_results)]
+                    remaining = remaining[len(batch):]
+                    for page in executor.map(self._fetch_page, batch):
+                        if page is not None:
+                            raw_results.append(page)
         return self.parse_results(raw_results)
 
+    def _fetch_page(self, title: str) -> Optional[Any]:
+        import wikipedia
+        try:
+            page = wikipedia.page(title)
+        except wikipedia.exceptions.DisambiguationError as e:
+            try:
+                page = wikipedia.page(e.options[0])
+            except Exception:
+                return None
+        except Exception:
+            return None
+        try:
+            # summary is loaded lazily; pull it here so it happens on the worker thread
+            page.summary
+        except Exception:
+            pass
+        return page
+
     def parse_results(self, raw_results: Any) -> List[Dict[str, Any]]:
         results = []
         for page in raw_results:
@@ -44,11 +102,79 @@ class WikipediaAgent(WikipediaAgentInterface):
                 "url": getattr(page, "url", None),
                 "summary": getattr(page, "summary", None)
             })
-        return results 
-    
-    def get_multiple_sources(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        return results
+
+SUMMARY_HEADERS = {
+    'User-Agent': 'CompanyResearchAssistant/1.0 (https://github.com/SpandanaRay07/Company_Research_Assistant)'
+}
+
+class WikipediaSummaryAgent(WikipediaAgentInterface):
+    # Search and lead-section extracts in a single MediaWiki API round-trip,
+    # instead of one full page download (plus a summary call) per hit.
+    def __init__(self, language: str = "en", cache: Optional[ResponseCache] = None, transport: Optional[HttpTransport] = None, async_transport: Optional[AsyncHttpTransport] = None):
+        self.api_url = f"https://{language}.wikipedia.org/w/api.php"
+        self.cache = cache
+        self.transport = transport or HttpTransport()
+        self.async_transport = async_transport or AsyncHttpTransport()
+
+    def query(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         try:
-            results = self.query(query)
-            return results[:limit]
+            response = self.transport.get("wikipedia", self.api_url, params=self._request_params(query, limit), headers=SUMMARY_HEADERS)
+            response.raise_for_status()
+            raw_results = response.json()
         except Exception:
-            return []
+            raw_results = {}
+        return self.parse_results(raw_results)[:limit]
+
+    async def aquery(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        try:
+            response = await self.async_transport.get("wikipedia", self.api_url, params=self._request_params(query, limit), headers=SUMMARY_HEADERS)
+            response.raise_for_status()
+            raw_results = response.json()
+        except Exception:
+            raw_results = {}
+        return self.parse_results(raw_results)[:limit]
+
+    def _request_params(self, query: str, limit: int) -> Dict[str, Any]:
+        return {
+            "action": "query",
+            "format": "json",
+            "formatversion": 2,
+            "generator": "search",
+            "gsrsearch": query,
+            # a little slack for disambiguation pages, which are dropped
+            "gsrlimit": limit + 2,
+            "prop": "extracts|info|pageprops",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": "max",
+            "inprop": "url",
+            "ppprop": "disambiguation",
+            "redirects": 1
+        }
+
+    def parse_results(self, raw_results: Any) -> List[Dict[str, Any]]:
+        pages = raw_results.get("query", {}).get("pages", []) if raw_results else []
+        results = []
+        for page in sorted(pages, key=lambda p: p.get("index", 0)):
+            if page.get("missing") or "disambiguation" in page.get("pageprops", {}):
+                continue
+            results.append({
+                "title": page.get("title"),
+                "url": page.get("fullurl"),
+                "summary": page.get("extract")
+            })
+        return results
+
+WIKIPEDIA_BACKENDS = {
+    "page": WikipediaAgent,
+    "summary": WikipediaSummaryAgent
+}
+
+def create_wikipedia_agent(backend: str = "page", cache: Optional[ResponseCache] = None, transport: Optional[HttpTransport] = None, async_transport: Optional[AsyncHttpTransport] = None, health: Optional[SourceHealth] = None) -> WikipediaAgentInterface:
+    if backend not in WIKIPEDIA_BACKENDS:
+        raise ValueError(f"Unknown Wikipedia backend '{backend}'. Choose from: {', '.join(WIKIPEDIA_BACKENDS)}")
+    if backend == "summary":
+        # the page backend goes through the wikipedia package, which manages its own HTTP calls
+        return WikipediaSummaryAgent(cache=cache, transport=transport, async_transport=async_transport)
+    return WIKIPEDIA_BACKENDS[backend](cache=cache, health=health)
@@ -0,0 +1,221 @@
+import re
+import threading
+import time
+import httpx
+import pytest
+from openai import BadRequestError
+from src.account_plan import SECTION_TITLES, AccountPlan, AccountPlanGenerator
+from src.batch import BatchRunner
+
+
+class FakeMessage:
+
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeChoice:
+
+    def __init__(self, content):
+        self.message = FakeMessage(content)
+
+
+class FakeResponse:
+
+    def __init__(self, content):
+        self.choices = [FakeChoice(content)]
+
+
+class FakeClient:
+    # rejects structured output like a model without json_schema support
+
+    def __init__(self, content="## Company Overview\nMakes phones.", error="response_format is not supported"):
+        self.content = content
+        self.error = error
+        self.structured_calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        if 'response_format' in kwargs:
+            self.structured_calls += 1
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            raise BadRequestError(self.error, response=httpx.Response(400, request=request), body=None)
+        return FakeResponse(self.content)
+
+
+class RecordingClient:
+    # writes each section as "<title> v<n>" and logs when every call starts and ends;
+    # the sections the recommendations build on are the slowest to come back
+
+    def __init__(self):
+        self.events = []
+        self.prompts = {}
+        self.versions = {}
+        self.lock = threading.Lock()
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        prompt = kwargs['messages'][-1]['content']
+        title = re.search(r"Write the (.+) section", prompt).group(1)
+        with self.lock:
+            self.events.append(("start", title))
+            self.prompts[title] = prompt
+            self.versions[title] = self.versions.get(title, 0) + 1
+            content = f"{title} v{self.versions[title]}"
+        time.sleep(0.05 if title in ("Opportunities", "Challenges") else 0.01)
+        with self.lock:
+            self.events.append(("end", title))
+        return FakeResponse(content)
+
+    def started(self):
+        return [title for event, title in self.events if event == "start"]
+
+    def position(self, event, title):
+        return self.events.index((event, title))
+
+
+class FakeAgent:
+
+    def __init__(self):
+        self.client = FakeClient()
+        self.model = "test-model"
+
+    def research_company(self, company, ask_user_callback=None):
+        return {'success': True, 'company_name': company, 'response': f"{company} makes phones.", 'sources': []}
+
+    def close(self):
+        pass
+
+
+def parse(content):
+    plan = AccountPlan("Apple")
+    AccountPlanGenerator(FakeClient(), model="test-model", structured_output=False)._parse_plan_content(plan, content)
+    return plan.sections
+
+
+def test_parse_splits_markdown_numbered_and_bold_headers():
+    sections = parse(
+        "## Company Overview\nApple makes phones.\n\n"
+        "2. Business Model\nHardware and services.\n\n"
+        "**Opportunities:** Services growth."
+    )
+    assert sections['company_overview'] == "Apple makes phones."
+    assert sections['business_model'] == "Hardware and services."
+    assert sections['opportunities'] == "Services growth."
+    assert sections['challenges'] == ""
+
+
+@pytest.mark.parametrize("header, section", [
+    ("**1. Company Overview**", 'company_overview'),
+    ("## **1. Company Overview**", 'company_overview'),
+    ("**1) Business Model**", 'business_model'),
+    ("- **Opportunities**", 'opportunities'),
+    ("## Financial Performance", 'financial_highlights'),
+    ("### 5. Financial Summary", 'financial_highlights')
+])
+def test_parse_recognizes_header_shapes(header, section):
+    sections = parse(f"{header}\nSection text.\n\n## Challenges\nSupply chain.")
+    assert sections[section] == "Section text."
+    assert sections['challenges'] == "Supply chain."
+
+
+def test_parse_keeps_plain_bullets_as_content():
+    sections = parse("## Opportunities\n- Opportunities in services\n- Wearables")
+    assert sections['opportunities'] == "- Opportunities in services\n- Wearables"
+
+
+def test_parse_keeps_inline_label_of_a_filled_section_in_the_current_one():
+    sections = parse(
+        "## Key Products & Services\nHardware lines.\n"
+        "## Market Position\nA leader in smartphones.\n"
+        "Products: iPhone and Mac lead their segments.\nMore detail."
+    )
+    assert sections['key_products_services'] == "Hardware lines."
+    assert sections['market_position'] == (
+        "A leader in smartphones.\nProducts: iPhone and Mac lead their segments.\nMore detail."
+    )
+
+
+def test_parse_without_headers_keeps_everything_as_overview():
+    assert parse("Just a paragraph.")['company_overview'] == "Just a paragraph."
+
+
+def test_structured_output_fallback_is_shared_across_a_batch(tmp_path):
+    agent = FakeAgent()
+    runner = BatchRunner(agent, str(tmp_path), concurrency=1, generate_plans=True)
+    summary = runner.run(["Apple", "Microsoft", "Google"])
+    assert summary['succeeded'] == 3
+    assert agent.client.structured_calls == 1
+
+
+def test_structured_output_survives_unrelated_bad_requests():
+    client = FakeClient(error="This model's maximum context length is 128000 tokens")
+    generator = AccountPlanGenerator(client, model="test-model", structured_output=True)
+    plan = generator.generate_plan("Apple", "Apple makes phones.")
+    assert generator.structured_output is True
+    assert not any(plan.sections.values())
+    generator.generate_plan("Apple", "Apple makes phones.")
+    assert client.structured_calls == 2
+
+
+def test_add_source_skips_other_spellings_of_a_listed_url():
+    plan = AccountPlan("Apple")
+    plan.add_source({'title': "Apple", 'url': "https://www.apple.com/"})
+    plan.add_source({'title': "Apple (again)", 'url': "https://apple.com?utm_source=news"})
+    plan.add_source({'title': "Apple Inc.", 'url': "https://en.wikipedia.org/wiki/Apple_Inc."})
+    assert [source['title'] for source in plan.sources] == ["Apple", "Apple Inc."]
+
+
+def test_markdown_follows_direct_changes_to_sources():
+    plan = AccountPlan("Apple")
+    plan.update_section("company_overview", "Makes phones.")
+    plan.add_source({'title': "Apple Inc.", 'url': "https://en.wikipedia.org/wiki/Apple_Inc."})
+    plan.add_source({'title': "Apple", 'url': "https://www.apple.com/"})
+    assert "2. Apple\n" in plan.to_markdown()
+
+    plan.sources[1] = {'title': "Apple Newsroom", 'url': "https://www.apple.com/newsroom/"}
+    assert "2. Apple Newsroom\n" in plan.to_markdown()
+    plan.sources[0]['title'] = "Apple (Wikipedia)"
+    assert "1. Apple (Wikipedia)\n" in plan.to_markdown()
+    del plan.sources[1]
+    assert "Newsroom" not in plan.to_markdown()
+
+    # a URL dropped from the list can be added again
+    plan.add_source({'title': "Apple Newsroom", 'url': "https://www.apple.com/newsroom/"})
+    assert [source['title'] for source in plan.sources] == ["Apple (Wikipedia)", "Apple Newsroom"]
+
+
+def test_dependent_sections_wait_for_the_sections_they_build_on():
+    client = RecordingClient()
+    generator = AccountPlanGenerator(client, model="test-model", section_mode="parallel")
+    plan = generator.generate_plan("Apple", "Apple makes phones.")
+
+    assert sorted(client.started()) == sorted(SECTION_TITLES.values())
+    assert client.position("start", "Recommendations") > client.position("end", "Opportunities")
+    assert client.position("start", "Recommendations") > client.position("end", "Challenges")
+    assert client.position("start", "Next Steps") > client.position("end", "Recommendations")
+    # the independent sections don't wait for each other
+    assert client.position("start", "Challenges") < client.position("end", "Opportunities")
+    assert "Opportunities (already in the plan):\nOpportunities v1" in client.prompts["Recommendations"]
+    assert plan.sections['next_steps'] == "Next Steps v1"
+
+
+def test_regenerate_downstream_only_reruns_dependent_sections():
+    client = RecordingClient()
+    generator = AccountPlanGenerator(client, model="test-model", section_mode="parallel")
+    plan = generator.generate_plan("Apple", "Apple makes phones.")
+    client.events.clear()
+
+    plan.update_section("challenges", "Supply chain concentration.")
+    assert generator.regenerate_downstream(plan, "challenges") == ["recommendations", "next_steps"]
+    assert client.started() == ["Recommendations", "Next Steps"]
+    assert "Challenges (already in the plan):\nSupply chain concentration." in client.prompts["Recommendations"]
+    assert plan.sections['recommendations'] == "Recommendations v2"
+    assert plan.sections['next_steps'] == "Next Steps v2"
+    assert plan.sections['opportunities'] == "Opportunities v1"
+
+    client.events.clear()
+    assert generator.regenerate_downstream(plan, "company_overview") == []
+    assert client.events == []
@@ -0,0 +1,59 @@
+import json
+from src.batch import BatchRunner
+
+
+class FakeAgent:
+
+    def __init__(self, failing=()):
+        self.client = None
+        self.model = "test-model"
+        self.failing = set(failing)
+
+    def research_company(self, company, ask_user_callback=None):
+        if company in self.failing:
+            self.failing.discard(company)
+            return {'success': False, 'error': "source timeout"}
+        return {'success': True, 'company_name': company, 'response': f"About {company}.", 'sources': []}
+
+    def close(self):
+        pass
+
+
+def read_records(path):
+    with open(path / "results.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rerun_keeps_one_record_per_company(tmp_path):
+    # a crash after Apple's record was written but before it was checkpointed
+    (tmp_path / "results.jsonl").write_text(
+        json.dumps({'company': "Intel", 'success': True}) + "\n" +
+        json.dumps({'company': "Apple", 'success': True}) + "\n" +
+        '{"company": "Micro', encoding="utf-8")
+    (tmp_path / "checkpoint.txt").write_text("intel\n", encoding="utf-8")
+
+    summary = BatchRunner(FakeAgent(), str(tmp_path), concurrency=1).run(["Intel", "Apple", "Microsoft"])
+
+    assert summary['skipped'] == 1
+    assert sorted(record['company'] for record in read_records(tmp_path)) == ["Apple", "Intel", "Microsoft"]
+
+
+def test_retried_failure_replaces_its_record(tmp_path):
+    agent = FakeAgent(failing=["Apple"])
+    BatchRunner(agent, str(tmp_path), concurrency=1).run(["Apple"])
+    BatchRunner(agent, str(tmp_path), concurrency=1).run(["Apple"])
+
+    records = read_records(tmp_path)
+    assert len(records) == 1
+    assert records[0]['success'] is True
+
+
+def test_slugs_keep_colliding_names_apart(tmp_path):
+    runner = BatchRunner(FakeAgent(), str(tmp_path))
+    assert runner._slug("Apple") == "apple"
+    assert runner._slug("AT&T") != runner._slug("AT T")
+    assert runner._slug("AT&T").startswith("at_t_")
+    assert runner._slug("AT&T") == runner._slug("at&t")
+
+    runner.run(["AT&T", "AT T"])
+    assert len(list(tmp_path.glob("at_t_*.md"))) == 2
@@ -0,0 +1,83 @@
+import pytest
+from src import cache as cache_module
+from src.cache import MemoryResponseCache, SQLiteResponseCache
+
+
+class Clock:
+    # advances a little on every read so LRU order is never a tie
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        if request.param == "memory":
+            cache = MemoryResponseCache(**kwargs)
+        else:
+            cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite3"), **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        if isinstance(cache, SQLiteResponseCache):
+            cache.close()
+
+
+def test_entries_expire_after_their_source_ttl(make_cache, clock):
+    cache = make_cache(ttls={'news': 60})
+    cache.set("news", "Apple", [{'title': "iPhone"}])
+    cache.set("wikipedia", "Apple", [{'title': "Apple Inc."}])
+
+    clock.now += 30
+    assert cache.get("news", "apple") == [{'title': "iPhone"}]
+    clock.now += 31
+    assert cache.get("news", "Apple") is None
+    assert cache.get("wikipedia", "Apple") == [{'title': "Apple Inc."}]
+
+
+def test_least_recently_used_entry_is_evicted(make_cache, clock):
+    cache = make_cache(max_entries=2)
+    cache.set("web", "Apple", ["a"])
+    cache.set("web", "Intel", ["i"])
+    # reading Apple makes Intel the least recently used
+    assert cache.get("web", "Apple") == ["a"]
+    cache.set("web", "Nvidia", ["n"])
+
+    assert cache.get("web", "Intel") is None
+    assert cache.get("web", "Apple") == ["a"]
+    assert cache.get("web", "Nvidia") == ["n"]
+
+
+def test_confirmed_miss_is_remembered_briefly(make_cache, clock):
+    cache = make_cache()
+    fetches = []
+    cache.remember_missing("linkedin", "Acme")
+
+    assert cache.cached("linkedin", "Acme", lambda: fetches.append(1) or ["page"]) == []
+    assert fetches == []
+    clock.now += cache.negative_ttls["linkedin"] + 1
+    assert cache.cached("linkedin", "Acme", lambda: fetches.append(1) or ["page"]) == ["page"]
+    assert fetches == [1]
+
+
+def test_empty_fetch_is_not_cached(make_cache, clock):
+    cache = make_cache()
+    cache.cached("news", "Apple", lambda: [])
+    assert cache.get("news", "Apple") is None
+    assert cache.stats()['by_source']['news'] == {'hits': 0, 'misses': 2}
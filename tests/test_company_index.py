@@ -0,0 +1,48 @@
+from src.company_index import CompanyIndex, CompanyRecord, normalize_company_name
+
+
+def make_index():
+    return CompanyIndex([
+        CompanyRecord("apple", "Apple Inc.", aliases=["Apple", "Apple Computer"], tickers=["AAPL"], linkedin="apple"),
+        CompanyRecord("alphabet", "Alphabet Inc.", aliases=["Alphabet", "Google"], tickers=["GOOGL"]),
+        CompanyRecord("spotify", "Spotify Technology S.A.", aliases=["Spotify"], tickers=["SPOT"]),
+        CompanyRecord("ibm", "IBM", aliases=["International Business Machines"], tickers=["IBM"])
+    ])
+
+
+def test_normalize_strips_legal_suffixes_and_articles():
+    assert normalize_company_name("The Apple, Inc.") == "apple"
+    assert normalize_company_name("AT&T Corp") == "at and t"
+
+
+def test_names_and_aliases_resolve_to_the_short_spelling():
+    index = make_index()
+    for name in ("apple", "Apple Inc", "APPLE INC."):
+        match = index.resolve(name)
+        assert match.record.id == "apple"
+        assert match.name == "Apple"
+    assert index.resolve("Google").name == "Google"
+    assert index.resolve("ibm").name == "IBM"
+
+
+def test_tickers_need_ticker_spelling():
+    index = make_index()
+    assert index.resolve("AAPL").name == "Apple"
+    assert index.resolve("$aapl").record.id == "apple"
+    assert index.resolve("SPOT").record.id == "spotify"
+    assert index.resolve("spot") is None
+    assert index.resolve("aapl") is None
+
+
+def test_typos_resolve_through_trigrams():
+    index = make_index()
+    match = index.resolve("Spotifyy")
+    assert match.record.id == "spotify"
+    assert match.score < 1.0
+    assert index.resolve("Banana Republic") is None
+
+
+def test_canonical_id_falls_back_to_a_slug():
+    index = make_index()
+    assert index.canonical_id("Apple Inc") == "apple"
+    assert index.canonical_id("Acme Widgets Ltd") == "acme-widgets"
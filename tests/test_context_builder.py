@@ -0,0 +1,27 @@
+from src.context_builder import ContextBuilder
+
+
+APPLE_INC = "Apple Inc. is an American multinational technology company headquartered in Cupertino, California. " * 8
+APPLE_HISTORY = "Apple was founded in 1976 by Steve Jobs, Steve Wozniak and Ronald Wayne to sell the Apple I computer. " * 8
+APPLE_FRUIT = "An apple is a round, edible fruit produced by an apple tree. Apple trees are cultivated worldwide."
+
+
+def test_top_passage_is_kept_under_a_small_budget():
+    builder = ContextBuilder(token_budget=100)
+    context = builder.build("Apple Inc.", [
+        {'title': "Apple Inc.", 'summary': APPLE_INC, 'url': "https://en.wikipedia.org/wiki/Apple_Inc."},
+        {'title': "Apple (fruit)", 'summary': APPLE_FRUIT, 'url': "https://en.wikipedia.org/wiki/Apple"}
+    ])
+
+    assert "Wikipedia Source 1: Apple Inc." in context.text
+    assert context.total_tokens <= 100
+
+
+def test_later_passages_still_need_the_minimum_size():
+    builder = ContextBuilder(token_budget=100)
+    context = builder.build("Apple Inc.", [
+        {'title': "Apple Inc.", 'summary': APPLE_INC, 'url': "https://en.wikipedia.org/wiki/Apple_Inc."},
+        {'title': "History of Apple Inc.", 'summary': APPLE_HISTORY, 'url': "https://en.wikipedia.org/wiki/History_of_Apple_Inc."}
+    ])
+
+    assert context.text.count("Wikipedia Source") == 1
@@ -0,0 +1,83 @@
+from src.dedup import MinHasher, SourceDeduplicator, canonicalize_url
+
+
+ARTICLE = (
+    "Apple Inc. is an American multinational technology company headquartered in Cupertino, California. "
+    "It designs, develops, and sells consumer electronics, computer software, and online services."
+)
+
+
+def test_canonical_url_ignores_scheme_aliases_tracking_and_fragments():
+    assert canonicalize_url("http://www.apple.com/iphone/?utm_source=news&b=2&a=1#specs") == "https://apple.com/iphone?a=1&b=2"
+    assert canonicalize_url("https://en.m.wikipedia.org/wiki/Apple_Inc.") == canonicalize_url("https://en.wikipedia.org/wiki/Apple_Inc.")
+    assert canonicalize_url("https://example.com/news/index.html") == canonicalize_url("https://example.com/news/")
+    assert canonicalize_url("https://example.com:8443/a") == "https://example.com:8443/a"
+    assert canonicalize_url("") == ""
+
+
+def test_canonical_url_unwraps_duckduckgo_redirects():
+    redirect = "//duckduckgo.com/l/?uddg=https%3A%2F%2Fwww.apple.com%2F&rut=abc"
+    assert canonicalize_url(redirect) == "https://apple.com/"
+
+
+def test_canonical_url_keeps_registrable_domain_under_country_suffixes():
+    assert canonicalize_url("https://m.example.co.uk/a") == "https://example.co.uk/a"
+    assert canonicalize_url("https://www.m.co.uk/") == "https://m.co.uk/"
+    assert canonicalize_url("https://m.com/") == "https://m.com/"
+
+
+def test_minhash_estimates_similarity():
+    hasher = MinHasher()
+    same = hasher.similarity(hasher.signature(ARTICLE), hasher.signature(ARTICLE + " Read more."))
+    different = hasher.similarity(hasher.signature(ARTICLE), hasher.signature("Bananas are a tropical fruit grown in many warm countries around the world."))
+    assert same > 0.8
+    assert different < 0.2
+    assert hasher.signature("") is None
+
+
+def test_minhash_signatures_are_reproducible():
+    assert (MinHasher(seed=3).signature(ARTICLE) == MinHasher(seed=3).signature(ARTICLE)).all()
+
+
+def test_dedupe_merges_same_url_and_drops_near_duplicates_in_priority_order():
+    deduplicator = SourceDeduplicator(near_duplicate_threshold=0.8)
+    sources, merged = deduplicator.dedupe({
+        'wikipedia': [{'title': "Apple Inc.", 'url': "https://en.wikipedia.org/wiki/Apple_Inc.", 'summary': ARTICLE}],
+        'news': [{'title': "Apple results", 'url': "https://news.example.com/apple", 'description': "", 'source': "Example News"}],
+        'linkedin': None,
+        'web': [
+            {'title': "Apple Inc. - Wikipedia", 'url': "https://en.m.wikipedia.org/wiki/Apple_Inc.", 'description': "Snippet"},
+            {'title': "Apple results", 'url': "https://news.example.com/apple/", 'description': "Record quarter.", 'source': "Web Search"},
+            {'title': "Apple mirror", 'url': "https://mirror.example.com/apple", 'description': ARTICLE},
+            {'title': "Apple", 'url': "https://www.apple.com/"}
+        ]
+    })
+    assert merged == 3
+    assert sources['linkedin'] is None
+    assert sources['news'][0] == {'title': "Apple results", 'url': "https://news.example.com/apple", 'description': "Record quarter.", 'source': "Example News"}
+    assert [source['url'] for source in sources['web']] == ["https://www.apple.com/"]
+
+
+def test_merged_copy_keeps_its_provenance():
+    wikipedia = {'title': "Apple Inc.", 'url': "https://en.wikipedia.org/wiki/Apple_Inc.", 'summary': ARTICLE}
+    sources, merged = SourceDeduplicator().dedupe({
+        'wikipedia': [dict(wikipedia)],
+        'web': [{
+            'title': "Apple Inc. - Wikipedia",
+            'url': "//duckduckgo.com/l/?uddg=https%3A%2F%2Fen.wikipedia.org%2Fwiki%2FApple_Inc.&rut=abc",
+            'description': "Apple Inc. is an American multinational technology company...",
+            'source': "Web Search"
+        }]
+    })
+    assert merged == 1
+    assert sources['wikipedia'] == [wikipedia]
+    assert sources['web'] == []
+
+
+def test_near_duplicate_detection_can_be_switched_off(monkeypatch):
+    monkeypatch.setenv("SOURCE_DEDUP_THRESHOLD", "off")
+    sources, merged = SourceDeduplicator().dedupe({
+        'web': [{'url': "https://a.example.com", 'description': ARTICLE}, {'url': "https://b.example.com", 'description': ARTICLE}]
+    })
+    assert merged == 0
+    assert len(sources['web']) == 2
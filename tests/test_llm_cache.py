@@ -0,0 +1,115 @@
+import asyncio
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from src.cache import MemoryResponseCache
+from src.llm_cache import AsyncCachingOpenAIClient, CachingOpenAIClient
+
+
+def completion(text):
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13}
+    })
+
+
+def chunks(words):
+    base = {"id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o-mini"}
+    items = [dict(base, choices=[{"index": 0, "delta": {"content": word}, "finish_reason": None}]) for word in words]
+    items.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+    items.append(dict(base, choices=[], usage={"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13}))
+    return [ChatCompletionChunk.model_validate(item) for item in items]
+
+
+class FakeCompletions:
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **params):
+        self.calls.append(params)
+        if params.get("stream"):
+            return iter(chunks(["Apple ", "makes ", "phones."]))
+        return completion("Apple makes phones.")
+
+
+class FakeClient:
+
+    def __init__(self, completions):
+        self.chat = type("Chat", (), {"completions": completions})()
+
+
+def streamed_text(stream):
+    return "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+
+
+PARAMS = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Apple?"}], "temperature": 0.7}
+
+
+def test_finished_stream_is_cached_and_replayed_as_chunks():
+    completions = FakeCompletions()
+    client = CachingOpenAIClient(FakeClient(completions), MemoryResponseCache())
+    assert streamed_text(client.chat.completions.create(**PARAMS, stream=True)) == "Apple makes phones."
+    replayed = list(client.chat.completions.create(**PARAMS, stream=True, stream_options={"include_usage": True}))
+    assert len(completions.calls) == 1
+    assert streamed_text(replayed) == "Apple makes phones."
+    assert replayed[-1].usage.total_tokens == 13
+    # the plain call for the same prompt is served from the same entry
+    assert client.chat.completions.create(**PARAMS).choices[0].message.content == "Apple makes phones."
+    assert len(completions.calls) == 1
+
+
+def test_stream_stopped_early_is_not_cached():
+    completions = FakeCompletions()
+    client = CachingOpenAIClient(FakeClient(completions), MemoryResponseCache())
+    stream = client.chat.completions.create(**PARAMS, stream=True)
+    next(iter(stream))
+    stream.close()
+    client.chat.completions.create(**PARAMS, stream=True)
+    assert len(completions.calls) == 2
+
+
+def test_deterministic_mode_keeps_an_explicit_seed():
+    completions = FakeCompletions()
+    client = CachingOpenAIClient(FakeClient(completions), MemoryResponseCache(), mode="deterministic")
+    client.chat.completions.create(**dict(PARAMS, temperature=0), seed=42)
+    assert completions.calls[0]["temperature"] == 0
+    assert completions.calls[0]["seed"] == 42
+
+
+def test_deterministic_mode_passes_sampled_calls_through():
+    completions = FakeCompletions()
+    client = CachingOpenAIClient(FakeClient(completions), MemoryResponseCache(), mode="deterministic")
+    client.chat.completions.create(**PARAMS)
+    client.chat.completions.create(**PARAMS)
+    assert len(completions.calls) == 2
+    assert completions.calls[0] == PARAMS
+
+    greedy = {name: value for name, value in PARAMS.items() if name != "temperature"}
+    client.chat.completions.create(**greedy)
+    client.chat.completions.create(**greedy)
+    assert len(completions.calls) == 3
+    assert completions.calls[2] == dict(greedy, seed=0)
+
+
+def test_async_stream_is_cached():
+    class AsyncCompletions(FakeCompletions):
+        async def create(self, **params):
+            result = super().create(**params)
+            if not params.get("stream"):
+                return result
+
+            async def agen():
+                for chunk in result:
+                    yield chunk
+            return agen()
+
+    async def run():
+        completions = AsyncCompletions()
+        client = AsyncCachingOpenAIClient(FakeClient(completions), MemoryResponseCache())
+        first = [chunk async for chunk in await client.chat.completions.create(**PARAMS, stream=True)]
+        second = [chunk async for chunk in await client.chat.completions.create(**PARAMS, stream=True)]
+        return completions, streamed_text(first), streamed_text(second)
+
+    completions, first, second = asyncio.run(run())
+    assert first == second == "Apple makes phones."
+    assert len(completions.calls) == 1
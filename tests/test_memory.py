@@ -0,0 +1,78 @@
+import pytest
+from src.context_builder import TokenCounter
+from src.memory import ConversationMemory
+
+
+@pytest.fixture
+def counter():
+    # the ~4 characters per token estimate, so the limits don't depend on tiktoken
+    counter = TokenCounter()
+    counter.encoding = None
+    return counter
+
+
+def result(query, response, company="Apple", sources=None):
+    return {'query': query, 'company_name': company, 'response': response, 'sources': sources or [], 'conflicts': []}
+
+
+def test_oldest_turns_are_evicted_but_stay_in_the_summary(counter):
+    memory = ConversationMemory(max_turns=3, counter=counter)
+    for company in ("Apple", "Microsoft", "Google", "Amazon", "Meta"):
+        memory.add(result(f"Tell me about {company}", f"{company} is a technology company.", company))
+
+    assert len(memory) == 3
+    assert [turn.company_name for turn in memory.turns] == ["Google", "Amazon", "Meta"]
+    assert memory.total_turns == 5
+    assert memory.company_name == "Meta"
+    assert '- Apple: "Tell me about Apple" -> Apple is a technology company.' in memory.summary
+    assert memory.context("Tell me about Meta").startswith("Summary of the conversation so far:")
+
+
+def test_each_turn_is_capped(counter):
+    memory = ConversationMemory(max_response_tokens=20, max_sources=2, counter=counter)
+    sources = [{'title': f"Source {i}", 'url': f"https://example.com/{i}", 'summary': "x" * 5000} for i in range(5)]
+    turn = memory.add(result("Tell me about Apple", "Apple makes phones. " * 200, sources=sources))
+    assert counter.count(turn.response) <= 20
+    assert turn.sources == [{'title': "Source 0", 'url': "https://example.com/0"}, {'title': "Source 1", 'url': "https://example.com/1"}]
+
+
+def test_summary_drops_its_oldest_lines_at_the_token_limit(counter):
+    memory = ConversationMemory(max_turns=2, summary_tokens=40, counter=counter)
+    for i in range(20):
+        memory.add(result(f"Question {i}", f"Answer number {i}."))
+    assert counter.count(memory.summary) <= 40
+    assert "Question 19" in memory.summary
+    assert "Question 0\"" not in memory.summary
+
+
+def test_context_stays_within_its_budget(counter):
+    memory = ConversationMemory(context_tokens=200, counter=counter)
+    for i in range(6):
+        memory.add(result(f"Question {i} about revenue", "Revenue grew. " * 100))
+    assert counter.count(memory.context("revenue")) <= 200
+
+
+def test_followup_retrieves_the_earlier_turn_it_refers_to(counter):
+    memory = ConversationMemory(context_tokens=120, counter=counter)
+    memory.add(result("Who is Apple's CEO?", "Tim Cook has been chief executive since 2011."))
+    memory.add(result("What does Apple sell?", "Phones, computers, tablets and wearables."))
+    memory.add(result("Where is Apple based?", "Cupertino, California."))
+    memory.add(result("How big is Apple's services business?", "Services brought in about $85 billion last year."))
+
+    context = memory.context("When did the CEO take over?")
+    # the latest turn always comes along, plus the one about the CEO, in conversation order
+    assert "Tim Cook" in context
+    assert "Services brought in" in context
+    assert context.index("Tim Cook") < context.index("Services brought in")
+    assert "Cupertino" not in context
+    assert "wearables" not in context
+
+
+def test_clear_forgets_everything(counter):
+    memory = ConversationMemory(counter=counter)
+    memory.add(result("Tell me about Apple", "Apple makes phones."))
+    memory.clear()
+    assert len(memory) == 0
+    assert memory.summary == ""
+    assert memory.context("Apple") == ""
+    assert memory.last() is None
@@ -0,0 +1,68 @@
+import json
+from src.models import ResearchResult, Source, SourceRegistry, SourcesView, to_jsonable
+
+
+def make_result(registry):
+    return ResearchResult(
+        success=True,
+        query="Apple",
+        company_name="Apple",
+        wikipedia_sources=registry.intern_all([{'title': "Apple Inc.", 'summary': "Tech company", 'url': "https://en.wikipedia.org/wiki/Apple_Inc."}]),
+        web_sources=registry.intern_all([
+            {'title': "Apple Inc.", 'summary': "Tech company", 'url': "https://en.m.wikipedia.org/wiki/Apple_Inc."},
+            {'title': "Apple", 'description': "Official site", 'url': "https://www.apple.com/"}
+        ]),
+        response="Apple makes the iPhone."
+    )
+
+
+def test_source_behaves_like_its_dict():
+    data = {'title': "Apple", 'url': "https://www.apple.com/", 'publishedAt': "2024-01-01"}
+    source = Source.from_dict(data)
+    assert source == data
+    assert dict(source) == data
+    assert source['publishedAt'] == "2024-01-01"
+    assert source.get('description') is None
+
+
+def test_registry_interns_by_canonical_url():
+    registry = SourceRegistry()
+    first = registry.intern({'title': "Apple", 'url': "https://www.apple.com/"})
+    second = registry.intern({'title': "Apple", 'url': "http://apple.com"})
+    assert first is second
+
+
+def test_sources_is_a_deduplicated_view():
+    result = make_result(SourceRegistry())
+    assert isinstance(result['sources'], SourcesView)
+    assert [source['url'] for source in result['sources']] == ["https://en.wikipedia.org/wiki/Apple_Inc.", "https://www.apple.com/"]
+    assert result['sources_count'] == 2
+
+
+def test_result_equals_its_dict_copy():
+    result = make_result(SourceRegistry())
+    plain = dict(result)
+    assert result == plain
+    assert plain == result
+    assert result['sources'] == [source.to_dict() for source in result['sources']]
+    assert result != dict(plain, response="Something else")
+
+
+def test_derived_keys_accept_writes():
+    result = make_result(SourceRegistry())
+    result['sources'] = [{'title': "Only this", 'url': "https://example.com/"}]
+    assert result['sources_count'] == 1
+    result['sources_count'] = 5
+    assert result['sources_count'] == 5
+    del result['sources'], result['sources_count']
+    assert result['sources_count'] == 2
+    assert list(result).count('sources') == 1
+
+
+def test_json_round_trip():
+    registry = SourceRegistry()
+    result = make_result(registry)
+    restored = ResearchResult.from_json(result.to_json(), registry)
+    assert restored == result
+    assert restored['wikipedia_sources'][0] is result['wikipedia_sources'][0]
+    assert json.loads(json.dumps({'result': result}, default=to_jsonable))['result'] == result.to_dict()
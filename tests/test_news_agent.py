@@ -0,0 +1,37 @@
+from src.health import SourceUnavailable
+from src.news_agent import NewsAgent
+
+
+class FakeResponse:
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'articles': [{'title': "Apple ships a new iPhone", 'url': "https://example.com/iphone", 'source': {'name': "Example"}}]}
+
+
+class FlakyTransport:
+    # short-circuited by an open breaker for the first `skipped` requests
+
+    def __init__(self, skipped):
+        self.skipped = skipped
+
+    def get(self, source, url, **kwargs):
+        if self.skipped:
+            self.skipped -= 1
+            raise SourceUnavailable(source)
+        return FakeResponse()
+
+
+def test_open_breaker_returns_no_news_and_says_so_once(monkeypatch, capsys):
+    monkeypatch.setenv("NEWS_API_KEY", "test")
+    agent = NewsAgent(transport=FlakyTransport(skipped=3))
+
+    assert [agent.search_company_news("Apple") for _ in range(3)] == [[], [], []]
+    assert capsys.readouterr().out.count("\n") == 1
+
+    assert agent.search_company_news("Apple")[0]['title'] == "Apple ships a new iPhone"
+    assert "back" in capsys.readouterr().out
+    agent.search_company_news("Apple")
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from src.research_agent import CompanyResearchAgent
+
+
+def make_agent(**kwargs):
+    return CompanyResearchAgent(openai_api_key="test", use_cache=False, **kwargs)
+
+
+def test_background_pool_is_sized_and_recreated_after_close():
+    agent = make_agent(background_workers=3)
+    assert agent._submit_background(lambda: 1).result() == 1
+    assert agent._background._max_workers == 3
+    agent.close()
+    assert agent._background is None
+    assert agent._submit_background(lambda: 2).result() == 2
+    agent.close()
+
+
+def test_abandoned_conflict_check_is_cancelled_if_not_started():
+    agent = make_agent(background_workers=1)
+    release = threading.Event()
+    busy = agent._submit_background(release.wait)
+    queued = agent._submit_background(lambda: ["never"])
+    prepared = {'pending_conflicts': queued}
+    agent._abandon_conflicts(prepared)
+    assert queued.cancelled()
+    assert 'pending_conflicts' not in prepared
+    release.set()
+    busy.result()
+    agent.close()
+
+
+def test_missing_sources_are_filled_before_deduplication():
+    agent = make_agent()
+    copy = {'title': "Apple", 'url': "https://www.apple.com/"}
+    filled = agent._fill_missing_sources({'web': [copy, dict(copy)]})
+    assert filled == {'wikipedia': [], 'news': [], 'linkedin': None, 'web': [copy, copy]}
+    assert agent._dedupe_sources(filled)['web'] == [copy]
+    agent.close()
+
+
+def test_async_research_works_across_event_loops(monkeypatch):
+    from benchmarks.fake_openai import FakeOpenAIServer
+    from benchmarks.replay import Recordings, replay_async_transport, replay_transport
+    server = FakeOpenAIServer(ttft_ms=0)
+    monkeypatch.setenv("OPENAI_BASE_URL", server.start())
+    monkeypatch.setenv("NEWS_API_KEY", "test")
+    recordings = Recordings()
+    agent = make_agent(wikipedia_backend="summary", transport=replay_transport(recordings, 0), async_transport=replay_async_transport(recordings, 0))
+    try:
+        first = asyncio.run(agent.aresearch_company("Apple"))
+        second = asyncio.run(agent.aresearch_company("Apple"))
+
+        async def after_close():
+            await agent.aclose()
+            return await agent.aresearch_company("Apple")
+
+        third = asyncio.run(after_close())
+    finally:
+        server.stop()
+        agent.close()
+
+    for result in (first, second, third):
+        assert result['success'], result.get('error')
+        assert result['sources_count'] == first['sources_count'] > 0
+
+
+def test_aliases_of_one_company_share_source_cache_entries(monkeypatch):
+    from benchmarks.replay import Recordings, replay_transport
+    from src.cache import MemoryResponseCache
+    monkeypatch.setenv("NEWS_API_KEY", "test")
+    cache = MemoryResponseCache()
+    agent = make_agent(wikipedia_backend="summary", cache=cache, transport=replay_transport(Recordings(), 0))
+    try:
+        for query in ("Amazon.com", "AMZN"):
+            company_name, search_name, company = agent._resolve_company(query)
+            assert search_name == "Amazon" and company.id == "amazon"
+            agent._gather_sources(search_name, True, company.linkedin)
+            if query == "Amazon.com":
+                assert company_name == "Amazon.com"
+                fetched = cache.stats()['misses']
+    finally:
+        agent.close()
+
+    stats = cache.stats()
+    assert stats['misses'] == fetched > 0
+    assert stats['hits'] == fetched
@@ -0,0 +1,73 @@
+import json
+import threading
+import time
+import requests
+from src.context_builder import TokenCounter
+from src.server import ResearchServer
+
+
+class FakeStream:
+    # yields one chunk, then has no result, so the server fails after the SSE headers
+
+    def __init__(self):
+        self.result = None
+
+    def __iter__(self):
+        yield "partial"
+
+
+class FakeAgent:
+
+    def __init__(self):
+        self.client = None
+        self.model = "test-model"
+        self.context_builder = type("Builder", (), {'counter': TokenCounter()})()
+        self.release = threading.Event()
+
+    def research_company(self, query, ask_user_callback=None):
+        if query == "slow":
+            self.release.wait(5)
+        return {'success': True, 'company_name': query, 'response': "ok", 'sources': []}
+
+    def stream_research_company(self, query):
+        return FakeStream()
+
+
+def start(agent, **kwargs):
+    server = ResearchServer(agent, port=0, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_request_waiting_on_its_session_does_not_hold_a_slot():
+    agent = FakeAgent()
+    server, base = start(agent, max_concurrent=2, max_waiting=0, queue_timeout=2.0)
+    try:
+        session_id = requests.post(base + "/research", json={'query': "Apple"}).json()['session_id']
+        same_session = [threading.Thread(target=requests.post, args=(base + "/research",), kwargs={'json': {'query': "slow", 'session_id': session_id}}) for _ in range(2)]
+        for thread in same_session:
+            thread.start()
+        time.sleep(0.3)
+        # one slot is running the slow request; the second one is waiting on the session, not a slot
+        assert server.admission.snapshot()['active'] == 1
+        assert requests.post(base + "/research", json={'query': "Intel"}).status_code == 200
+        agent.release.set()
+        for thread in same_session:
+            thread.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_failure_after_stream_start_is_an_error_event():
+    server, base = start(FakeAgent())
+    try:
+        response = requests.post(base + "/research", json={'query': "Apple", 'stream': True}, stream=True)
+        assert response.status_code == 200
+        events = [line for line in response.iter_lines(decode_unicode=True) if line]
+        assert events[0] == "event: chunk"
+        assert events[-2] == "event: error"
+        assert "error" in json.loads(events[-1][len("data: "):])
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,73 @@
+import threading
+import pytest
+from src.speech import NullPlayer, SentenceSplitter, SilentTTSEngine, SpeechPipeline
+
+
+def test_splitter_joins_sentences_across_chunk_boundaries():
+    splitter = SentenceSplitter(min_chars=10)
+    sentences = []
+    for chunk in ["Apple designs pho", "nes and computers. It was fou", "nded in 1976.", " Its HQ is in Cupertino"]:
+        sentences.extend(splitter.feed(chunk))
+    sentences.extend(splitter.flush())
+    assert sentences == ["Apple designs phones and computers.", "It was founded in 1976.", "Its HQ is in Cupertino"]
+
+
+def test_splitter_merges_short_fragments_into_the_next_sentence():
+    splitter = SentenceSplitter(min_chars=20)
+    assert splitter.feed("Hi! Apple Inc. makes phones. ") == ["Hi! Apple Inc. makes phones."]
+    assert splitter.feed("Ok.") == []
+    assert splitter.flush() == ["Ok."]
+    assert splitter.flush() == []
+
+
+def test_pipeline_speaks_every_sentence_in_order():
+    # synthesis time grows with length and overlaps playback; the order still holds
+    engine = SilentTTSEngine(seconds_per_char=0.0005)
+    player = NullPlayer(seconds_per_clip=0.002)
+    text = "Apple designs phones and computers in California. It was founded in 1976. Revenue grew again last year."
+    chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+
+    assert SpeechPipeline(engine, player, max_buffered=1).speak(iter(chunks)) == text
+    assert engine.spoken == [
+        "Apple designs phones and computers in California.",
+        "It was founded in 1976.",
+        "Revenue grew again last year."
+    ]
+    assert player.played == 3
+
+
+def test_pipeline_skips_a_sentence_that_fails_to_synthesize(capsys):
+    class FlakyEngine(SilentTTSEngine):
+        def synthesize(self, text):
+            if "1976" in text:
+                raise RuntimeError("TTS unavailable")
+            return super().synthesize(text)
+
+    engine, player = FlakyEngine(), NullPlayer()
+    SpeechPipeline(engine, player).speak(["Apple designs phones and computers. It was founded in 1976. Revenue grew again last year."])
+    assert engine.spoken == ["Apple designs phones and computers.", "Revenue grew again last year."]
+    assert player.played == 2
+    assert "TTS unavailable" in capsys.readouterr().out
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_pipeline_shuts_down_when_the_text_stream_fails():
+    def chunks():
+        yield "Apple designs phones and computers. It was "
+        raise ConnectionError("stream dropped")
+
+    before = threading.active_count()
+    engine, player = SilentTTSEngine(), NullPlayer()
+    spoken = SpeechPipeline(engine, player).speak(chunks())
+    # what arrived before the failure is still spoken, and no worker is left running
+    assert spoken == "Apple designs phones and computers. It was "
+    assert engine.spoken == ["Apple designs phones and computers.", "It was"]
+    assert player.played == 2
+    assert threading.active_count() == before
+
+
+def test_pipeline_with_no_text_plays_nothing():
+    pipeline = SpeechPipeline(SilentTTSEngine(), NullPlayer())
+    assert pipeline.speak([]) == ""
+    assert pipeline.first_audio_at is None
+    assert pipeline.player.played == 0
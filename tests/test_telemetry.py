@@ -0,0 +1,92 @@
+import pytest
+from openai.types.chat import ChatCompletion
+from src.cache import MemoryResponseCache
+from src.llm_cache import CachingOpenAIClient
+from src.research_agent import CompanyResearchAgent, ResearchStream
+from src.telemetry import PrometheusSink, Telemetry, TelemetrySink, record_usage, span
+
+
+class ListSink(TelemetrySink):
+
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+def test_sink_must_implement_export():
+    class Incomplete(TelemetrySink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def traced_stream(sink, closed):
+    agent = CompanyResearchAgent(openai_api_key="test", use_cache=False, telemetry=Telemetry([sink]))
+
+    def generate():
+        try:
+            with span("llm.generation"):
+                yield "Apple "
+                yield "makes phones."
+        finally:
+            closed.append(True)
+
+    build = lambda: ResearchStream(generate, lambda answer: {'success': True, 'response': answer}, lambda e: {'success': False})
+    return agent._traced_stream("research_company", "Apple", build)
+
+
+def test_finished_stream_exports_its_trace():
+    sink, closed = ListSink(), []
+    stream = traced_stream(sink, closed)
+    assert stream.collect()['response'] == "Apple makes phones."
+    assert len(sink.traces) == 1
+    assert sink.traces[0].attributes['success'] is True
+    assert closed == [True]
+
+
+def test_abandoned_stream_still_exports_and_closes():
+    sink, closed = ListSink(), []
+    iterator = iter(traced_stream(sink, closed))
+    assert next(iterator) == "Apple "
+    iterator.close()
+    assert closed == [True]
+    assert len(sink.traces) == 1
+    trace = sink.traces[0]
+    assert trace.attributes['aborted'] is True
+    assert [s.name for s in trace.spans] == ["llm.generation"]
+
+
+class FakeCompletions:
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **params):
+        self.calls += 1
+        return ChatCompletion.model_validate({
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "Apple makes phones."}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13}
+        })
+
+
+def test_cached_answers_count_as_hits_not_spend():
+    completions = FakeCompletions()
+    client = CachingOpenAIClient(type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})(), MemoryResponseCache())
+    sink = PrometheusSink()
+    params = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "Apple?"}]}
+    with Telemetry([sink]).trace("research_company") as trace:
+        record_usage(client.chat.completions.create(**params))
+        record_usage(client.chat.completions.create(**params))
+        for chunk in client.chat.completions.create(**params, stream=True, stream_options={"include_usage": True}):
+            if chunk.usage:
+                record_usage(chunk)
+
+    assert completions.calls == 1
+    assert trace.usage == {'prompt_tokens': 10, 'completion_tokens': 3, 'total_tokens': 13, 'llm_calls': 1, 'cache_hits': 2}
+    metrics = sink.render()
+    assert 'research_llm_tokens_total{type="prompt"} 10' in metrics
+    assert "research_llm_cache_hits_total 2" in metrics
@@ -0,0 +1,69 @@
+import asyncio
+import httpx
+from src.health import HALF_OPEN, SourceHealth
+from src.transport import AsyncHttpTransport, HttpTransport
+
+
+class FakeResponse:
+
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_sync_retry_after_is_capped():
+    transport = HttpTransport(max_backoff=1.5)
+    retry = transport.session.get_adapter("https://example.com").max_retries
+    assert retry.get_retry_after(FakeResponse({"Retry-After": "3600"})) == 1.5
+    assert retry.get_retry_after(FakeResponse({"Retry-After": "1"})) == 1
+    assert retry.get_retry_after(FakeResponse({})) is None
+
+
+def test_async_retry_after_is_capped(monkeypatch):
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    responses = iter([httpx.Response(429, headers={"Retry-After": "3600"}), httpx.Response(200, text="ok")])
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses)))
+    transport = AsyncHttpTransport(client=client, max_backoff=1.5)
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    response = asyncio.run(transport.get("web", "https://example.com/"))
+    assert response.status_code == 200
+    assert delays == [1.5]
+
+
+def test_cancellation_is_not_a_source_failure():
+    clock = [0.0]
+    health = SourceHealth(failure_threshold=1, cooldown=10)
+    breaker = health.breaker("web")
+    breaker._clock = lambda: clock[0]
+    breaker.record_failure()
+    clock[0] = 11.0
+    assert breaker.state == HALF_OPEN
+
+    async def hang(request):
+        await asyncio.Event().wait()
+
+    async def run():
+        transport = AsyncHttpTransport(client=httpx.AsyncClient(transport=httpx.MockTransport(hang)), health=health)
+        task = asyncio.ensure_future(transport.get("web", "https://example.com/"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    assert breaker.failures == 1
+    # the abandoned trial does not keep the next one out
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_backoff_cap_survives_retry_copies():
+    retry = HttpTransport(max_backoff=1.5).session.get_adapter("https://example.com").max_retries
+    copy = retry.new(total=1)
+    assert copy.backoff_max == 1.5
+    assert copy.get_retry_after(FakeResponse({"Retry-After": "3600"})) == 1.5